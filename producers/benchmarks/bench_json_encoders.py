@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Speed and size of the nerds_utils JSON encoders on the output of the producers.
+
+Every installed encoder is run pretty printed and compact over documents shaped
+like what juniper_conf, nmap_services_py, raritan_snmp, nagiosxi_api and
+nunoc_cosmos write.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import fixtures  # noqa: E402
+from nerds_utils.encoders import available_encoders, get_encoder  # noqa: E402
+from parsers import RouterPaser  # noqa: E402
+
+
+def documents(interfaces):
+    router = RouterPaser().parse(
+        minidom.parseString(fixtures.junos_config(interfaces)), minidom.parseString(fixtures.junos_version()))
+    return [
+        ('juniper_conf', fixtures.nerds(router.name, 'juniper_conf', router.to_json())),
+        ('nmap_services_py', fixtures.nmap_services()),
+        ('raritan_snmp', fixtures.raritan()),
+        ('nagiosxi_api', fixtures.nagiosxi()),
+        ('nunoc_cosmos', fixtures.nunoc_cosmos()),
+    ]
+
+
+def timed(encoder, doc, number):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            out = encoder(doc)
+        seconds = (time.perf_counter() - start) / number
+        best = seconds if best is None else min(best, seconds)
+    return best, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interfaces', type=int, default=1000, help='Interfaces of the juniper_conf router.')
+    parser.add_argument('--number', type=int, default=20, help='Encodings per timing.')
+    args = parser.parse_args()
+
+    print('{:<18}{:<10}{:<9}{:>12}{:>12}{:>10}'.format('producer', 'encoder', 'mode', 'ms', 'KB', 'speedup'))
+    for producer, doc in documents(args.interfaces):
+        legacy = json.dumps(doc, indent=4, sort_keys=True).encode('utf-8')
+        if get_encoder()(doc) != legacy:
+            raise SystemExit('Default encoder output differs from json.dumps for {}'.format(producer))
+        base = None
+        for name in available_encoders():
+            for compact in [False, True]:
+                seconds, size = timed(get_encoder(name, compact), doc, args.number)
+                base = base or seconds
+                print('{:<18}{:<10}{:<9}{:>12.3f}{:>12.1f}{:>10.1f}'.format(
+                    producer, name, 'compact' if compact else 'pretty', seconds * 1e3, size / 1e3, base / seconds))
+
+
+if __name__ == '__main__':
+    main()
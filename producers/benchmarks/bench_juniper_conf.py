@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Parse time of the juniper_conf parsers on a synthetic configuration.
+
+Compares tag lookups through the TagIndex with the getElementsByTagName walks
+ElementParser used before it, and with the stream backend.
+"""
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import fixtures  # noqa: E402
+from parsers import base, bgp, chassis, interfaces, router, RouterPaser  # noqa: E402
+
+PARSER_MODULES = [base, bgp, chassis, interfaces, router]
+ElementParser = base.ElementParser
+
+
+class LinearElementParser(base.ElementParser):
+    """
+    ElementParser as it was before the tag index, every lookup walks the subtree.
+    """
+    def __init__(self, nodeTree, index=None):
+        self.nodeTree = nodeTree or base.EmptyTree()
+        self.index = None
+
+    def first(self, tag):
+        res = self.all(tag)
+        if len(res) > 0:
+            return res[0]
+        return LinearElementParser(base.EmptyTree())
+
+    def all(self, tag):
+        if isinstance(self.nodeTree, base.EmptyTree):
+            return []
+        return [LinearElementParser(n) for n in self.nodeTree.getElementsByTagName(tag)]
+
+    def children(self):
+        return [LinearElementParser(n) for n in self.nodeTree.childNodes if n.nodeType == n.ELEMENT_NODE]
+
+    def parent(self):
+        return LinearElementParser(self.nodeTree.parentNode)
+
+
+def use_element_parser(cls):
+    for module in PARSER_MODULES:
+        module.ElementParser = cls
+
+
+def best_of(repeat, setup, fn):
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        # Like timeit, keep collections of earlier documents out of the timing
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+        gc.enable()
+        del arg
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interfaces', type=int, default=10000, help='Number of synthetic interfaces.')
+    parser.add_argument('--units', type=int, default=4, help='Units per interface.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant, the best is reported.')
+    args = parser.parse_args()
+
+    xml = fixtures.junos_config(args.interfaces, args.units).encode('utf-8')
+    version = fixtures.junos_version().encode('utf-8')
+    print('Synthetic config: {} interfaces, {} units each, {:.1f} MB'.format(
+        args.interfaces, args.units, len(xml) / 1e6))
+
+    def dom():
+        return minidom.parseString(xml), minidom.parseString(version)
+
+    def parse(docs):
+        RouterPaser().parse(*docs)
+
+    use_element_parser(LinearElementParser)
+    linear = best_of(args.repeat, dom, parse)
+    use_element_parser(ElementParser)
+    indexed = best_of(args.repeat, dom, parse)
+    streamed = best_of(
+        args.repeat, lambda: (io.BytesIO(xml), io.BytesIO(version)),
+        lambda sources: RouterPaser().parse_stream(*sources))
+
+    print('{:<28}{:>10}'.format('variant', 'seconds'))
+    print('{:<28}{:>10.3f}'.format('dom, linear lookups', linear))
+    print('{:<28}{:>10.3f}'.format('dom, tag index', indexed))
+    print('{:<28}{:>10.3f}'.format('stream (incl. xml parsing)', streamed))
+    print('tag index speedup: {:.1f}x'.format(linear / indexed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Throughput of juniper_conf local source parsing with a pool of worker processes.
+
+Writes synthetic configurations to a temporary directory and runs
+process_local over them with an increasing number of workers.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import fixtures  # noqa: E402
+import juniper_conf  # noqa: E402
+
+
+class NullWriter:
+    def write_json(self, name, router_json):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200, help='Number of synthetic configuration files.')
+    parser.add_argument('--interfaces', type=int, default=500, help='Interfaces per configuration.')
+    parser.add_argument('--workers', type=int, nargs='+', help='Worker counts to run, default 1, 2, 4 .. cores.')
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores})
+
+    juniper_conf.logger.setLevel(logging.WARNING)
+    tmp = tempfile.mkdtemp()
+    try:
+        xml = fixtures.junos_config(args.interfaces)
+        files = []
+        for i in range(args.files):
+            path = os.path.join(tmp, 'router-{}.xml'.format(i))
+            with open(path, 'w') as f:
+                f.write(xml)
+            files.append(path)
+        print('{} files of {:.1f} MB, {} cores'.format(args.files, len(xml) / 1e6, cores))
+
+        print('{:<10}{:>10}{:>12}{:>10}'.format('workers', 'seconds', 'files/s', 'speedup'))
+        single = None
+        for n in workers:
+            start = time.perf_counter()
+            juniper_conf.process_local(files, NullWriter(), workers=n)
+            seconds = time.perf_counter() - start
+            single = single or seconds
+            print('{:<10}{:>10.2f}{:>12.1f}{:>10.1f}'.format(n, seconds, len(files) / seconds, single / seconds))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
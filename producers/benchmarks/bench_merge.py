@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Time of nerds_utils.merge over a synthetic NERDS repository.
+
+Builds producers/<producer>/json/<host>.json for a number of producers and
+hosts, with documents shaped like the output of the real producers, and merges
+it with an increasing number of worker processes. Then times incremental
+merges: the first one, one without changes and one after rewriting some files.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fixtures  # noqa: E402
+from nerds_utils import NerdsWriter, get_encoder  # noqa: E402
+from nerds_utils import merge  # noqa: E402
+
+SHAPES = [
+    ('nmap_services_py', lambda name: fixtures.nmap_services(name, addresses=2, ports=10)),
+    ('raritan_snmp', lambda name: fixtures.raritan(name, ports=8)),
+    ('nagiosxi_api', lambda name: fixtures.nagiosxi(name, checks=10)),
+    ('nunoc_cosmos', fixtures.nunoc_cosmos),
+]
+
+
+def build_repo(repo, files, producers):
+    """
+    Writes files NERDS files spread over producers, every host has a file from each producer.
+    """
+    hosts = max(files // producers, 1)
+    encoder = get_encoder()
+    names = []
+    for p in range(producers):
+        name, shape = SHAPES[p % len(SHAPES)]
+        producer = '{}-{}'.format(name, p)
+        names.append(producer)
+        with NerdsWriter(os.path.join(repo, 'producers', producer, 'json'), merge=None, encoder=encoder) as writer:
+            for h in range(hosts):
+                doc = shape('host-{}.example.net'.format(h))
+                section = next(k for k in doc['host'] if k not in ('name', 'version'))
+                doc['host'][producer] = doc['host'].pop(section)
+                writer.write(doc)
+    return hosts, names
+
+
+def touch(repo, files, producers, hosts):
+    """
+    Merges new content into files NERDS files spread over the repository.
+    """
+    for i in range(files):
+        writer = NerdsWriter(os.path.join(repo, 'producers', producers[i % len(producers)], 'json'))
+        writer.write({'host': {'name': 'host-{}.example.net'.format(i * 7919 % hosts), 'version': 1, 'touched': i}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=50000, help='Number of NERDS files in the repository.')
+    parser.add_argument('--producers', type=int, default=10, help='Number of producers.')
+    parser.add_argument('--policy', choices=sorted(merge.MERGE_POLICIES), default='right')
+    parser.add_argument('--workers', type=int, nargs='+', help='Worker counts to run, default 1 and cores.')
+    parser.add_argument('--changed', type=int, default=500, help='Files rewritten before the last incremental merge.')
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, cores})
+
+    merge.logger.setLevel(logging.WARNING)
+    repo = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        hosts, producers = build_repo(repo, args.files, args.producers)
+        print('{} hosts x {} producers built in {:.1f} s, {} cores'.format(
+            hosts, args.producers, time.perf_counter() - start, cores))
+        print('{:<10}{:>10}{:>12}{:>10}'.format('workers', 'seconds', 'files/s', 'speedup'))
+        single = None
+        for n in workers:
+            start = time.perf_counter()
+            merge.merge([repo], merge.output_dir(repo), args.policy, n)
+            seconds = time.perf_counter() - start
+            single = single or seconds
+            print('{:<10}{:>10.2f}{:>12.0f}{:>10.1f}'.format(
+                n, seconds, hosts * args.producers / seconds, single / seconds))
+
+        out_dir = merge.output_dir(repo) + '-incremental'
+        print('{:<24}{:>10}{:>10}'.format('incremental merge', 'seconds', 'hosts'))
+        for run, changed in [('first', 0), ('unchanged', 0), ('{} files changed'.format(args.changed), args.changed)]:
+            touch(repo, changed, producers, hosts)
+            start = time.perf_counter()
+            merged = merge.merge_incremental([repo], out_dir, args.policy, workers[-1])
+            print('{:<24}{:>10.2f}{:>10}'.format(run, time.perf_counter() - start, merged))
+    finally:
+        shutil.rmtree(repo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Memory held by a synthetic fleet of juniper_conf Router models.
+
+Compares the slotted models with the dict backed classes and unit dicts they
+replaced, and checks that both produce the same JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import models  # noqa: E402
+from models.chassis import Chassis, ChassisModule  # noqa: E402
+
+
+class Legacy:
+    """
+    The models as they were before __slots__, attributes in a __dict__ per object.
+    """
+    class Router:
+        def __init__(self):
+            self.name = ''
+            self.version = ''
+            self.model = ''
+            self.interfaces = []
+            self.bgp_peerings = []
+            self.hardware = ''
+
+        def to_json(self):
+            j = vars(self).copy()
+            j['interfaces'] = [i.to_json() for i in self.interfaces]
+            j['bgp_peerings'] = [p.to_json() for p in self.bgp_peerings]
+            if self.hardware:
+                j['hardware'] = self.hardware.to_json()
+            return j
+
+    class Interface:
+        def __init__(self):
+            self.name = ''
+            self.bundle = ''
+            self.description = ''
+            self.vlantagging = ''
+            self.tunneldict = []
+            self.inactive = False
+            self.unitdict = []
+
+        def to_json(self):
+            return {
+                'name': self.name,
+                'bundle': self.bundle,
+                'description': self.description,
+                'vlantagging': self.vlantagging,
+                'tunnels': self.tunneldict,
+                'units': self.unitdict,
+                'inactive': self.inactive,
+            }
+
+    @staticmethod
+    def Unit(unit, description, vlanid, address, inactive):
+        return {'unit': unit, 'description': description, 'vlanid': vlanid, 'address': address, 'inactive': inactive}
+
+    class BgpPeering:
+        def __init__(self):
+            self.type = None
+            self.remote_address = None
+            self.description = None
+            self.local_address = None
+            self.group = None
+            self.as_number = None
+
+        def to_json(self):
+            return vars(self).copy()
+
+    class Chassis:
+        def __init__(self):
+            self.name = ''
+            self.serial_number = ''
+            self.description = ''
+            self.modules = []
+
+        def to_json(self):
+            out = vars(self).copy()
+            out['modules'] = [m.to_json() for m in self.modules]
+            return out
+
+    class ChassisModule:
+        def __init__(self):
+            self.name = ''
+            self.version = ''
+            self.part_number = ''
+            self.serial_number = ''
+            self.description = ''
+            self.model_number = ''
+            self.clei_code = ''
+            self.sub_modules = []
+
+        def to_json(self):
+            out = vars(self).copy()
+            out['sub_modules'] = [m.to_json() for m in self.sub_modules]
+            return out
+
+
+class Slotted:
+    Router = models.Router
+    Interface = models.Interface
+    Unit = models.Unit
+    BgpPeering = models.BgpPeering
+    Chassis = Chassis
+    ChassisModule = ChassisModule
+
+
+def fleet(m, routers, interfaces, units, peerings, modules):
+    """
+    Returns routers built from the classes in m, shaped like parsed configurations.
+    """
+    out = []
+    for r in range(routers):
+        router = m.Router()
+        router.name = 'router-{}.example.net'.format(r)
+        router.version = '12.3R6.6'
+        router.model = 'mx480'
+        for i in range(interfaces):
+            interface = m.Interface()
+            interface.name = 'xe-{}/{}/{}'.format(i // 400, i // 10 % 40, i % 10)
+            interface.description = 'Interface {} of {}'.format(i, router.name)
+            interface.vlantagging = True
+            interface.tunneldict.append({'source': None, 'destination': None})
+            interface.unitdict = [
+                m.Unit(str(100 + u), 'Unit {}'.format(u), str(100 + u), ['10.{}.{}.{}/30'.format(r % 256, i % 256, u * 4)], False)
+                for u in range(units)
+            ]
+            router.interfaces.append(interface)
+        for p in range(peerings):
+            peering = m.BgpPeering()
+            peering.type = 'external'
+            peering.group = 'group-{}'.format(p % 10)
+            peering.remote_address = '192.0.2.{}'.format(p % 256)
+            peering.as_number = str(64512 + p)
+            router.bgp_peerings.append(peering)
+        router.hardware = m.Chassis()
+        router.hardware.name = 'Chassis'
+        for c in range(modules):
+            module = m.ChassisModule()
+            module.name = 'FPC {}'.format(c)
+            module.serial_number = 'SN{}-{}'.format(r, c)
+            for s in range(3):
+                sub = m.ChassisModule()
+                sub.name = 'PIC {}'.format(s)
+                module.sub_modules.append(sub)
+            router.hardware.modules.append(module)
+        out.append(router)
+    return out
+
+
+def measure(m, args):
+    tracemalloc.start()
+    routers = fleet(m, args.routers, args.interfaces, args.units, args.peerings, args.modules)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, routers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--routers', type=int, default=500, help='Number of routers in the fleet.')
+    parser.add_argument('--interfaces', type=int, default=200, help='Interfaces per router.')
+    parser.add_argument('--units', type=int, default=4, help='Units per interface.')
+    parser.add_argument('--peerings', type=int, default=100, help='BGP peerings per router.')
+    parser.add_argument('--modules', type=int, default=10, help='Chassis modules per router.')
+    args = parser.parse_args()
+
+    legacy, legacy_routers = measure(Legacy, args)
+    slotted, slotted_routers = measure(Slotted, args)
+    same = all(
+        json.dumps(a.to_json()) == json.dumps(b.to_json()) for a, b in zip(legacy_routers, slotted_routers))
+
+    print('{} routers, {} interfaces with {} units, {} peerings, {} modules each'.format(
+        args.routers, args.interfaces, args.units, args.peerings, args.modules))
+    print('{:<10}{:>12}'.format('models', 'MB'))
+    print('{:<10}{:>12.1f}'.format('dict', legacy / 1e6))
+    print('{:<10}{:>12.1f}'.format('slots', slotted / 1e6))
+    print('saved {:.0%}, identical JSON: {}'.format(1 - slotted / legacy, same))
+
+
+if __name__ == '__main__':
+    main()
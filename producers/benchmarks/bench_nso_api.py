@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Requests per second of the nso producer's Api against a local stub NSO.
+
+Compares a urlopen per request, as Api did before it kept its connections
+open, with the pooled Api, plain and gzipped, from one and several threads.
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nso'))
+
+import fixtures  # noqa: E402
+from api import Api  # noqa: E402
+
+
+class StubNso(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes, do not let them wait for an ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = self.server.body
+        headers = {}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = self.server.gzipped
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.yang.data+json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def urlopen_get(url, user, password):
+    """
+    A GET the way Api did it before: a new connection and auth header per request.
+    """
+    basic = '{}:{}'.format(user, password).encode('UTF-8')
+    headers = {
+        'Authorization': 'Basic {}'.format(base64.encodebytes(basic).decode('UTF-8')[:-1]),
+        'Accept': 'application/vnd.yang.data+json',
+    }
+    with urlopen(Request(url, headers=headers)) as r:
+        return json.loads(r.read())
+
+
+def rate(get, requests, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(requests):
+            get()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for f in [executor.submit(get) for _ in range(requests)]:
+                f.result()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per measurement.')
+    parser.add_argument('--interfaces', type=int, default=10, help='Interfaces in every reply.')
+    parser.add_argument('--threads', type=int, default=4, help='Threads of the parallel measurements.')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNso)
+    server.daemon_threads = True
+    server.body = json.dumps(fixtures.nso_junos_interfaces(interfaces=args.interfaces)).encode()
+    server.gzipped = gzip.compress(server.body)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/api/running'.format(server.server_address[1])
+    path = '/devices/device/r1/config/configuration/interfaces?deep'
+
+    api = Api(url, 'user', 'password')
+    print('reply of {} bytes, {} gzipped'.format(len(server.body), len(server.gzipped)))
+    print('{:<28}{:>10}{:>10}'.format('client', '1 thread', '{} threads'.format(args.threads)))
+    for name, get in [
+            ('urlopen per request', lambda: urlopen_get(url + path, 'user', 'password')),
+            ('Api, pooled, gzip', lambda: api.get(path))]:
+        print('{:<28}{:>10.0f}{:>10.0f}'.format(
+            name, rate(get, args.requests, 1), rate(get, args.requests, args.threads)))
+    api.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
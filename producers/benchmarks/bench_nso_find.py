@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+nso.utils path lookups before and after they were compiled and made safe for deep data.
+
+Times find on the paths the Junos parser uses, find_all over the units of a
+large interfaces reply the way junos.parse_unit calls it, and find_all on a
+payload nested deeper than the recursion limit allows the old version to go.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nso'))
+
+import fixtures  # noqa: E402
+import utils  # noqa: E402
+
+
+def old_find(what, data, delimiter='.', default=None):
+    paths = what.split(delimiter)
+    elm = data
+    for p in paths:
+        if p not in elm:
+            elm = default
+            break
+        elm = elm[p]
+    return elm
+
+
+def old_find_all(what, data, result=None):
+    if result is None:
+        result = []
+    if isinstance(data, list):
+        for v in data:
+            old_find_all(what, v, result)
+    if isinstance(data, dict):
+        for k, v in data.items():
+            if k == what:
+                result.append(v)
+            else:
+                old_find_all(what, v, result)
+    return result
+
+
+def old_find_first(what, data, default=None):
+    result = old_find_all(what, data)
+    if result:
+        return result[0]
+    else:
+        return default
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interfaces', type=int, default=5000, help='Interfaces in the reply.')
+    parser.add_argument('--depth', type=int, default=5000, help='Nesting of the deep payload.')
+    args = parser.parse_args()
+
+    device = {'tailf-ncs:device': {'config': {'junos:configuration': {'version': '18.1R3'}}}}
+    interfaces = fixtures.nso_junos_interfaces(args.interfaces)['junos:interfaces']['interface']
+    units = [u for i in interfaces for u in i.get('unit', [])]
+    deep = {'name': 'bottom'}
+    for i in range(args.depth):
+        deep = {'family': {'unit': [deep]}}
+
+    old = {'find': old_find, 'find_all': old_find_all, 'find_first': old_find_first}
+    new = {'find': utils.find, 'find_all': utils.find_all, 'find_first': utils.find_first}
+    print('{:<36}{:>10}{:>10}'.format('lookup', 'before', 'after'))
+    cases = [
+        ('find x 100k', lambda f: [f['find']('tailf-ncs:device.config.junos:configuration.version', device)
+                                   for _ in range(100000)]),
+        ('find_all per unit ({})'.format(len(units)), lambda f: [f['find_all']('name', f['find_all']('address', u))
+                                                                 for u in units]),
+        ('find_first bundle per interface', lambda f: [f['find_first']('bundle', i) for i in interfaces]),
+        ('find_all depth {}'.format(args.depth), lambda f: f['find_all']('name', deep)),
+    ]
+    for name, case in cases:
+        try:
+            before = '{:.3f}'.format(best(lambda: case(old)))
+        except RecursionError:
+            before = 'recursion'
+        after = best(lambda: case(new))
+        print('{:<36}{:>10}{:>10.3f}'.format(name, before, after))
+
+
+if __name__ == '__main__':
+    main()
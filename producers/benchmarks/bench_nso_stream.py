@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Whole reply vs streamed decoding of a large NSO interfaces reply.
+
+Times json.loads of the reply followed by junos.parse_interfaces against
+stream.iter_items feeding junos.parse_interface one interface at a time, and
+the peak of the memory each allocates (tracemalloc), the parsed interfaces
+included.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nso'))
+
+import fixtures  # noqa: E402
+import stream  # noqa: E402
+from parser import junos  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+
+
+def whole(body):
+    return junos.parse_interfaces(json.loads(body))
+
+
+def streamed(body):
+    chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+    return [junos.parse_interface(item) for item in stream.iter_items(chunks, 'junos:interfaces.interface')]
+
+
+def measure(fn, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    interfaces = fn(body)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, len(interfaces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interfaces', type=int, default=20000, help='Interfaces in the reply.')
+    parser.add_argument('--units', type=int, default=4, help='Units per interface.')
+    args = parser.parse_args()
+
+    # NSO pretty prints its replies
+    body = json.dumps(fixtures.nso_junos_interfaces(args.interfaces, args.units), indent=2).encode()
+    print('reply of {:.1f} MB, ijson {}'.format(len(body) / 1e6, 'used' if stream.ijson else 'not installed'))
+    print('{:<10}{:>10}{:>14}'.format('decoding', 'seconds', 'peak MB'))
+    for name, fn in [('whole', whole), ('streamed', streamed)]:
+        seconds, peak, count = measure(fn, body)
+        assert count == args.interfaces
+        print('{:<10}{:>10.2f}{:>14.1f}'.format(name, seconds, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
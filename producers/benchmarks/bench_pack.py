@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+One file per host compared with the packed store of nerds_utils.pack.
+
+Times writing a producer's output both ways, opening the store, fetching
+random hosts by name and reading every host.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fixtures  # noqa: E402
+from nerds_utils import NerdsWriter, get_encoder, load_nerds_file  # noqa: E402
+from nerds_utils.pack import PackReader, PackWriter  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=20000, help='Number of hosts.')
+    parser.add_argument('--lookups', type=int, default=1000, help='Random hosts fetched by name.')
+    args = parser.parse_args()
+
+    docs = [fixtures.nagiosxi('host-{}.example.net'.format(h), checks=10) for h in range(args.hosts)]
+    names = [doc['host']['name'] for doc in random.Random(1).choices(docs, k=args.lookups)]
+    tmp = tempfile.mkdtemp()
+    json_dir = os.path.join(tmp, 'json')
+    pack_dir = os.path.join(tmp, 'packed')
+    encoder = get_encoder(compact=True)
+    try:
+        def write_files():
+            with NerdsWriter(json_dir, merge=None, encoder=encoder) as writer:
+                for doc in docs:
+                    writer.write(doc)
+
+        def write_pack():
+            with PackWriter(pack_dir, merge=None, encoder=encoder) as writer:
+                for doc in docs:
+                    writer.write(doc)
+
+        def read_files():
+            return [load_nerds_file(os.path.join(json_dir, name + '.json')) for name in names]
+
+        def read_pack():
+            with PackReader(pack_dir) as reader:
+                return [reader.get(name) for name in names]
+
+        def all_files():
+            return [load_nerds_file(os.path.join(json_dir, name)) for name in sorted(os.listdir(json_dir))]
+
+        def all_pack():
+            with PackReader(pack_dir) as reader:
+                return list(reader)
+
+        print('{} hosts, {} lookups by name'.format(args.hosts, args.lookups))
+        print('{:<22}{:>12}{:>12}'.format('seconds', 'files', 'packed'))
+        for label, files, packed in [
+                ('write', write_files, write_pack),
+                ('open + lookups', read_files, read_pack),
+                ('read all', all_files, all_pack)]:
+            files_time, files_result = timed(files)
+            packed_time, packed_result = timed(packed)
+            assert files_result == packed_result
+            print('{:<22}{:>12.3f}{:>12.3f}'.format(label, files_time, packed_time))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
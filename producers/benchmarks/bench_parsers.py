@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Parse and format time and memory of every producer on synthetic input, checked
+against a baseline.
+
+Each case of parse_cases.py runs in a fresh process of the Python the producer
+needs, set the Python 2 interpreter with --python2 or NERDS_PYTHON2. Cases whose
+producer can not be imported (a missing python-nmap, requests or a working
+Python 2) are skipped. A case regresses when it is slower or grows the RSS more
+than --tolerance times its baseline, and the script then exits with 1:
+
+    python benchmarks/bench_parsers.py                    # check against baseline.json
+    python benchmarks/bench_parsers.py --save-baseline    # after a deliberate change
+
+The baseline holds numbers of one machine, save a new one where the checks run.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parse_cases import CASES, SKIPPED  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'baseline.json')
+# Differences below these are noise, whatever the tolerance
+MIN_SECONDS = 0.002
+MIN_RSS_KB = 2048
+
+
+def works(python):
+    """
+    Returns whether python runs at all, a pyenv shim of a missing version exits with an error.
+    """
+    try:
+        proc = subprocess.run([python, '-c', 'pass'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return proc.returncode == 0
+
+
+def run_case(name, python, scale, repeat):
+    """
+    Returns the result of a case, None if it was skipped.
+    """
+    proc = subprocess.run(
+        [python, os.path.join(HERE, 'parse_cases.py'), name, '--scale', str(scale), '--repeat', str(repeat)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode == SKIPPED:
+        return None
+    if proc.returncode != 0:
+        raise RuntimeError('{} failed:\n{}'.format(name, proc.stderr))
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def regressions(result, baseline, tolerance):
+    """
+    Returns what got worse than tolerance times the baseline of a case.
+    """
+    found = []
+    if result['seconds'] > max(baseline['seconds'] * tolerance, baseline['seconds'] + MIN_SECONDS):
+        found.append('time {:.1f}x'.format(result['seconds'] / baseline['seconds']))
+    if result['rss_growth_kb'] > max(baseline['rss_growth_kb'] * tolerance, baseline['rss_growth_kb'] + MIN_RSS_KB):
+        found.append('memory {} KB over {} KB'.format(result['rss_growth_kb'], baseline['rss_growth_kb']))
+    return found
+
+
+def load_baseline(path, scale):
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if baseline.get('scale') != scale:
+        print('Baseline is for scale {}, not checking.'.format(baseline.get('scale')))
+        return {}
+    return baseline['cases']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cases', nargs='*', help='Cases to run, all by default: {}'.format(', '.join(sorted(CASES))))
+    parser.add_argument('--scale', type=int, default=1, help='Multiplies the size of every input.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per case, the best one counts.')
+    parser.add_argument('--python2', default=os.environ.get('NERDS_PYTHON2', 'python2'),
+                        help='Interpreter for the Python 2 producers.')
+    parser.add_argument('--python3', default=sys.executable, help='Interpreter for the Python 3 producers.')
+    parser.add_argument('--baseline', default=BASELINE, help='Baseline file.')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed factor over the baseline.')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline.')
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error('Unknown cases: {}'.format(', '.join(sorted(unknown))))
+    baseline = {} if args.save_baseline else load_baseline(args.baseline, args.scale)
+    pythons = {version: python for version, python in [(2, args.python2), (3, args.python3)] if works(python)}
+    results = {}
+    failed = False
+    print('{:<20}{:>10}{:>12}{:>14}{:>14}  {}'.format('case', 'items', 'ms', 'RSS +KB', 'peak KB', 'check'))
+    for name in args.cases or sorted(CASES):
+        python = pythons.get(CASES[name][1])
+        result = run_case(name, python, args.scale, args.repeat) if python else None
+        if result is None:
+            print('{:<20}{:>10}'.format(name, 'skipped'))
+            continue
+        results[name] = result
+        check = ''
+        if name in baseline:
+            found = regressions(result, baseline[name], args.tolerance)
+            failed = failed or bool(found)
+            check = 'REGRESSION ' + ', '.join(found) if found else 'ok'
+        print('{:<20}{:>10}{:>12.1f}{:>14}{:>14}  {}'.format(
+            name, result['items'], result['seconds'] * 1000, result['rss_growth_kb'], result['peak_rss_kb'], check))
+
+    if args.save_baseline:
+        cases = {
+            name: {'seconds': round(r['seconds'], 5), 'rss_growth_kb': r['rss_growth_kb']} for name, r in results.items()}
+        with open(args.baseline, 'w') as f:
+            json.dump({'scale': args.scale, 'cases': cases}, f, indent=4, sort_keys=True)
+            f.write('\n')
+        print('Saved baseline of {} cases to {}.'.format(len(cases), args.baseline))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
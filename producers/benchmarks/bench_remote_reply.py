@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Time and peak memory of turning raw SSH output into a parseable reply.
+
+Compares the string handling RemoteSource used before XmlReply (decode,
+append the end tag and rebuild the output line by line) with XmlReply, which
+finds the command echo once and reads from a view of the received bytes.
+Every variant runs in its own process so that peak RSS is not shared.
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+from xml.etree.ElementTree import iterparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import fixtures  # noqa: E402
+from util.reply import XmlReply  # noqa: E402
+
+COMMAND = 'show configuration | display xml | no-more'
+VARIANTS = ['legacy', 'reply']
+
+
+def legacy_strip_before(target, what):
+    out = ""
+    match = False
+    for line in target.splitlines(True):
+        if what in line:
+            match = True
+        elif match:
+            out += line
+    return out
+
+
+def legacy(data):
+    xml = data.decode('utf-8') + '</rpc-reply>'
+    return io.StringIO(legacy_strip_before(xml, COMMAND))
+
+
+def reply(data):
+    return XmlReply.from_command_output(data, COMMAND, b'</rpc-reply>').open()
+
+
+def ssh_output(size):
+    """
+    Returns what pexpect has in before for a configuration of about size bytes.
+    """
+    one = len(fixtures.junos_config(1000).encode('utf-8')) / 1000
+    config = fixtures.junos_config(max(int(size / one), 1)).encode('utf-8')
+    end = config.rindex(b'</rpc-reply>')
+    return b'--- JUNOS 12.3R6.6\r\n{master}\r\nuser@bench-re0> ' + COMMAND.encode('utf-8') + b'\r\n' + config[:end]
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run(variant, size, parse):
+    data = ssh_output(size)
+    before = peak_rss()
+    start = time.perf_counter()
+    f = {'legacy': legacy, 'reply': reply}[variant](data)
+    elements = 0
+    if parse:
+        for event, elem in iterparse(f):
+            elements += 1
+            elem.clear()
+    else:
+        while f.read(65536):
+            pass
+    seconds = time.perf_counter() - start
+    print(len(data), seconds, before, peak_rss(), elements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=200, help='Size of the synthetic reply in MB.')
+    parser.add_argument('--no-parse', action='store_true', help='Only read the reply instead of parsing it.')
+    parser.add_argument('--run', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = int(args.size * 1e6)
+    if args.run:
+        run(args.run, size, not args.no_parse)
+        return
+
+    print('{:<10}{:>10}{:>12}{:>18}'.format('variant', 'seconds', 'peak MB', 'peak - input MB'))
+    for variant in VARIANTS:
+        cmd = [sys.executable, os.path.abspath(__file__), '--run', variant, '--size', str(args.size)]
+        if args.no_parse:
+            cmd.append('--no-parse')
+        out = subprocess.check_output(cmd).split()
+        length, seconds, before, peak = int(out[0]), float(out[1]), int(out[2]), int(out[3])
+        print('{:<10}{:>10.2f}{:>12.0f}{:>18.0f}'.format(variant, seconds, peak / 1e6, (peak - before) / 1e6))
+    print('input: {:.0f} MB of ssh output'.format(length / 1e6))
+
+
+if __name__ == '__main__':
+    main()
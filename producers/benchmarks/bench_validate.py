@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Throughput of nerds_utils.validate on documents shaped like what each producer
+writes, and what validating every document adds to writing them with NerdsWriter.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'juniper_conf'))
+
+import fixtures  # noqa: E402
+from nerds_utils.encoders import get_encoder  # noqa: E402
+from nerds_utils.file import NerdsWriter  # noqa: E402
+from nerds_utils.validate import validate  # noqa: E402
+from parsers import RouterPaser  # noqa: E402
+
+
+def documents(interfaces):
+    router = RouterPaser().parse(
+        minidom.parseString(fixtures.junos_config(interfaces)), minidom.parseString(fixtures.junos_version()))
+    return [
+        ('juniper_conf', fixtures.nerds(router.name, 'juniper_conf', router.to_json())),
+        ('nmap_services_py', fixtures.nmap_services()),
+        ('raritan', fixtures.raritan()),
+        ('nagiosxi_api', fixtures.nagiosxi()),
+        ('nunoc_cosmos', fixtures.nunoc_cosmos()),
+    ]
+
+
+def rate(doc, number):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            validate(doc)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return number / best
+
+
+def write_time(docs):
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        with NerdsWriter(out_dir, merge=None, encoder=get_encoder(compact=True), validate=False) as writer:
+            for doc in docs:
+                writer.write(doc)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interfaces', type=int, default=20, help='Interfaces of the juniper_conf router.')
+    parser.add_argument('--number', type=int, default=20000, help='Validations per timing.')
+    parser.add_argument('--hosts', type=int, default=5000, help='nunoc_cosmos documents written per writer run.')
+    args = parser.parse_args()
+
+    print('{:<18}{:>14}'.format('producer', 'docs/s'))
+    for producer, doc in documents(args.interfaces):
+        errors = validate(doc)
+        if errors:
+            raise SystemExit('Fixture for {} is invalid: {}'.format(producer, errors))
+        print('{:<18}{:>14,.0f}'.format(producer, rate(doc, args.number)))
+
+    docs = [fixtures.nunoc_cosmos('host{}.example.net'.format(i)) for i in range(args.hosts)]
+    writing = write_time(docs)
+    start = time.perf_counter()
+    for doc in docs:
+        validate(doc)
+    checking = time.perf_counter() - start
+    print('\nNerdsWriter, {} hosts: {:.2f} s writing, validating them adds {:.3f} s ({:.1f}%)'.format(
+        args.hosts, writing, checking, checking / writing * 100))
+
+if __name__ == '__main__':
+    main()
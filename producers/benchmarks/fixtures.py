@@ -0,0 +1,257 @@
+"""
+Synthetic inputs for the benchmarks, scaled by a size argument.
+"""
+
+
+def junos_config(interfaces=1000, units=4, bgp_groups=10, neighbors=20, logical_interfaces=0):
+    """
+    Returns a "show configuration | display xml" reply with the given number of
+    physical interfaces, units per interface, bgp groups and neighbors per group.
+    """
+    out = [
+        '<rpc-reply xmlns:junos="http://xml.juniper.net/junos/12.3R6/junos">',
+        '<configuration junos:commit-seconds="1437707826">',
+        '<version>12.3R6.6</version>',
+        '<groups><name>re0</name><system><host-name>bench-re0</host-name></system></groups>',
+        '<system><domain-name>example.net</domain-name></system>',
+    ]
+    if logical_interfaces:
+        out.append('<logical-systems><name>bench-ls</name><interfaces>')
+        for i in range(logical_interfaces):
+            out.append(
+                '<interface><name>xe-{0}/{1}/{2}</name><unit><name>{3}</name>'
+                '<vlan-id>{3}</vlan-id></unit></interface>'.format(i // 4000, i // 100 % 40, i % 100, 3000 + i % 1000))
+        out.append('</interfaces></logical-systems>')
+    out.append('<interfaces>')
+    for i in range(interfaces):
+        out.append('<interface><name>xe-{0}/{1}/{2}</name>'.format(i // 4000, i // 100 % 40, i % 100))
+        out.append('<description>Synthetic interface {0}</description>'.format(i))
+        out.append('<vlan-tagging/><mtu>9192</mtu><encapsulation>flexible-ethernet-services</encapsulation>')
+        for u in range(units):
+            out.append(
+                '<unit><name>{0}</name><description>Unit {0} of {1}</description><vlan-id>{0}</vlan-id>'
+                '<family><inet><filter><input><filter-name>re-protect</filter-name></input></filter>'
+                '<address><name>10.{2}.{3}.{4}/30</name></address></inet>'
+                '<inet6><address><name>fd00:{1:x}:{0:x}::1/64</name></address></inet6></family></unit>'.format(
+                    100 + u, i, i // 256 % 256, i % 256, u * 4 + 1))
+        out.append('</interface>')
+    out.append('</interfaces><protocols><bgp>')
+    for g in range(bgp_groups):
+        out.append('<group><name>group-{0}</name><type>{1}</type>'.format(g, 'internal' if g % 2 else 'external'))
+        if g % 2:
+            out.append('<local-address>192.168.{0}.1</local-address>'.format(g))
+        for n in range(neighbors):
+            out.append(
+                '<neighbor><name>192.168.{0}.{1}</name><description>Peer {1}</description>'
+                '<peer-as>{2}</peer-as></neighbor>'.format(g, n + 2, 64512 + n))
+        out.append('</group>')
+    out.append('</bgp></protocols></configuration></rpc-reply>')
+    return '\n'.join(out)
+
+
+def junos_version():
+    return (
+        '<rpc-reply xmlns:junos="http://xml.juniper.net/junos/12.3R6/junos">'
+        '<software-information><host-name>bench</host-name><product-model>mx960</product-model>'
+        '<junos-version>12.3R6.6</junos-version></software-information></rpc-reply>'
+    )
+
+
+def nerds(name, producer, data):
+    return {'host': {'version': 1, 'name': name, producer: data}}
+
+
+def nmap_services(name='host.example.net', addresses=4, ports=40):
+    """
+    Returns an nmap_services_py document for a host with the given number of
+    addresses and open tcp ports per address.
+    """
+    services = {}
+    for a in range(addresses):
+        services['192.0.2.{}'.format(a + 1)] = {
+            'tcp': {
+                str(port): {
+                    'state': 'open', 'reason': 'syn-ack', 'name': 'service-{}'.format(port),
+                    'product': 'Synthetic daemon', 'version': '1.{}'.format(port % 10),
+                    'extrainfo': 'protocol 2.0', 'conf': '10', 'cpe': 'cpe:/a:example:daemon:1',
+                } for port in range(20, 20 + ports)
+            }
+        }
+    return nerds(name, 'nmap_services_py', {
+        'hostnames': [name],
+        'addresses': sorted(services),
+        'os': {'class': {'vendor': 'Linux', 'osfamily': 'Linux', 'accuracy': '100'}},
+        'uptime': {'seconds': '1234567', 'lastboot': 'Mon Jan  1 00:00:00 2018'},
+        'services': services,
+    })
+
+
+def raritan(name='pdu.example.net', ports=48):
+    """
+    Returns a raritan document for a PDU with the given number of outlets.
+    """
+    return nerds(name, 'raritan', {'ports': [
+        {'name': str(p), 'description': 'server-{}'.format(p)} for p in range(1, ports + 1)
+    ]})
+
+
+def nagiosxi(name='host.example.net', checks=30):
+    """
+    Returns a nagiosxi_api document for a host with the given number of service checks.
+    """
+    return nerds(name, 'nagiosxi_api', {
+        'host_name': name,
+        'host_alias': name.split('.')[0],
+        'host_address': '192.0.2.1',
+        'checks': [{
+            'check_command': 'check_nrpe!check_{}'.format(c),
+            'description': 'Check {}'.format(c),
+            'display_name': 'Check {}'.format(c),
+            'last_check': '2018-01-01 00:00:00',
+            'perf_data': 'time=0.{0}s;1;2;0 size={0}B;;;0'.format(c),
+            'plugin_output': 'OK - check {} is fine'.format(c),
+        } for c in range(checks)],
+    })
+
+
+def nunoc_cosmos(name='host.example.net'):
+    return nerds(name, 'nunoc_cosmos', {
+        'addresses': ['192.0.2.1', '2001:db8::1'], 'sunet_iaas': True, 'managed_by': 'Puppet'})
+
+
+def nso_junos_interfaces(interfaces=1000, units=4):
+    """
+    Returns the junos:interfaces part of an NSO device configuration payload.
+    """
+    return {'junos:interfaces': {'interface': [{
+        'name': 'xe-{0}/{1}/{2}'.format(i // 4000, i // 100 % 40, i % 100),
+        'description': 'Synthetic interface {0}'.format(i),
+        'flexible-vlan-tagging': [None],
+        'unit': [{
+            'name': str(100 + u),
+            'description': 'Unit {0} of {1}'.format(100 + u, i),
+            'vlan-id': 100 + u,
+            'family': {
+                'inet': {'address': [{'name': '10.{0}.{1}.{2}/30'.format(i // 256 % 256, i % 256, u * 4 + 1)}]},
+                'inet6': {'address': [{'name': 'fd00:{0:x}:{1:x}::1/64'.format(i, 100 + u)}]},
+            },
+        } for u in range(units)],
+    } for i in range(interfaces)]}}
+
+
+def isis_database(nodes=1000, neighbours=4):
+    """
+    Returns "show isis database detail" output for a ring of nodes, as lines.
+    """
+    lines = [
+        'IS-IS Level-2 Link State Database:',
+        'LSPID                 LSP Seq Num  LSP Checksum  LSP Holdtime      ATT/P/OL',
+    ]
+    for n in range(nodes):
+        lines.append('{0}.00-00  0x0000000C   0x5B6F        1150              0/0/0'.format(_system_id(n)))
+        lines.append('  Area Address: 47.0023.0000.0001.0001.0001.0001')
+        lines.append('  NLPID:        0xCC')
+        lines.append('  Hostname: node-{0}'.format(n))
+        lines.append('  IP Address:   10.{0}.{1}.1'.format(n // 256 % 256, n % 256))
+        for b in range(1, neighbours + 1):
+            lines.append('  Metric: {0:<10} IS {1}.00'.format(10 * b, _system_id((n + b) % nodes)))
+        lines.append('  Metric: 0          IP 10.{0}.{1}.0 255.255.255.0'.format(n // 256 % 256, n % 256))
+    return lines
+
+
+def _system_id(n):
+    return '0000.{0:04d}.{1:04d}'.format(n // 10000, n % 10000)
+
+
+def raritan_snmpwalk(ports=48):
+    """
+    Returns snmpwalk output of the outlet names of a Raritan PDU.
+    """
+    return '\n'.join(
+        'SNMPv2-SMI::enterprises.13742.6.3.5.3.1.3.1.{0} = STRING: "server-{0}.example.net"'.format(p)
+        for p in range(1, ports + 1))
+
+
+LIVESTATUS_COLUMNS = [
+    'host_name', 'host_address', 'host_alias', 'check_command', 'description', 'display_name', 'last_check',
+    'perf_data', 'plugin_output',
+]
+
+
+def livestatus(hosts=1000, checks=30):
+    """
+    Returns the columns and rows livestatus answers a services query with.
+    """
+    rows = []
+    for h in range(hosts):
+        name = 'host{0}.example.net'.format(h)
+        for c in range(checks):
+            rows.append([
+                name, '10.{0}.{1}.1'.format(h // 256 % 256, h % 256), 'host{0}'.format(h),
+                'check_nrpe!check_{0}'.format(c), 'Check {0}'.format(c), 'Check {0}'.format(c), 1514764800 + c,
+                'time=0.{0}s;1;2;0'.format(c), 'OK - check {0} is fine'.format(c),
+            ])
+    return LIVESTATUS_COLUMNS, rows
+
+
+def nagiosxi_servicestatus(hosts=1000, checks=30):
+    """
+    Returns the servicestatus list of the Nagios XI API, reduced to the fields nagiosxi_api keeps.
+    """
+    return [{
+        'host_name': 'host{0}.example.net'.format(h),
+        'host_address': '10.{0}.{1}.1'.format(h // 256 % 256, h % 256),
+        'host_alias': 'host{0}'.format(h),
+        'check_command': 'check_nrpe!check_{0}'.format(c),
+        'description': 'Check {0}'.format(c),
+        'display_name': 'Check {0}'.format(c),
+        'last_check': '2018-01-01 00:00:00',
+        'plugin_output': 'OK - check {0} is fine'.format(c),
+        'perf_data': 'time=0.{0}s;1;2;0'.format(c),
+    } for h in range(hosts) for c in range(checks)]
+
+
+def csv_hosts(hosts=10000, columns=10, delim=';'):
+    """
+    Returns a csv_producer input file, a header and one line per host.
+    """
+    header = ['Host Name'] + ['Column {0}'.format(c) for c in range(1, columns)]
+    lines = [delim.join(header)]
+    for h in range(hosts):
+        lines.append(delim.join(['host{0}.example.net'.format(h)] + [
+            '"value {0} {1}"'.format(h, c) if c % 3 else '' for c in range(1, columns)]))
+    return '\n'.join(lines) + '\n'
+
+
+def cfengine_report(hosts=1000, rows=10, delim=','):
+    """
+    Returns a CFEngine report export with rows lines per host.
+    """
+    lines = [delim.join(['HostName', 'Promise Handle', 'Promiser', 'Promise Outcome', 'Last seen'])]
+    for h in range(hosts):
+        for r in range(rows):
+            lines.append(delim.join([
+                'host{0}.example.net'.format(h), 'handle_{0}'.format(r), '/etc/file{0}'.format(r),
+                'kept' if r % 4 else 'repaired', '2018-01-01 00:00:00']))
+    return '\n'.join(lines) + '\n'
+
+
+def nmap_scan(address='192.0.2.1', name='host.example.net', ports=40):
+    """
+    Returns what python-nmap's PortScanner.scan returns for one host with open tcp ports.
+    """
+    return {
+        'nmap': {'command_line': 'nmap -oX - -sV {0}'.format(address), 'scanstats': {'uphosts': '1'}},
+        'scan': {address: {
+            'hostnames': [{'name': name, 'type': 'PTR'}],
+            'addresses': {'ipv4': address},
+            'status': {'state': 'up', 'reason': 'echo-reply'},
+            'tcp': dict((port, {
+                'state': 'open', 'reason': 'syn-ack', 'name': 'service-{0}'.format(port),
+                'product': 'Synthetic daemon', 'version': '1.{0}'.format(port % 10),
+                'extrainfo': 'protocol 2.0', 'conf': '10', 'cpe': 'cpe:/a:example:daemon:1',
+            }) for port in range(20, 20 + ports)),
+            'osmatch': [{'name': 'Linux 4.X', 'accuracy': '100', 'osclass': [
+                {'type': 'general purpose', 'vendor': 'Linux', 'osfamily': 'Linux', 'accuracy': '100'}]}],
+        }},
+    }
@@ -0,0 +1,157 @@
+"""
+The parse and format functions bench_parsers.py times, one case per producer.
+
+Runs under Python 2 as well as 3, since some producers still need Python 2.
+bench_parsers.py runs every case in a process of its own:
+
+    python parse_cases.py <case> [--scale 1] [--repeat 5]
+
+and reads one line of JSON with the best time and the memory of the case.
+Exits with SKIPPED when the producer can not be imported here.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import io
+import json
+import os
+import resource
+import sys
+import time
+
+import fixtures
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SKIPPED = 3
+clock = getattr(time, 'perf_counter', time.time)
+
+
+def producer_path(name):
+    sys.path.insert(0, os.path.join(HERE, '..', name))
+    # Producers import nerds_utils from their parent
+    sys.path.insert(1, os.path.join(HERE, '..'))
+
+
+def juniper_conf(scale):
+    from xml.dom import minidom
+    from parsers import RouterPaser
+    config = minidom.parseString(fixtures.junos_config(interfaces=1000 * scale))
+    version = minidom.parseString(fixtures.junos_version())
+    return lambda: (config, version), lambda config, version: RouterPaser().parse(config, version).interfaces
+
+
+def nso(scale):
+    from parser import junos
+    data = fixtures.nso_junos_interfaces(interfaces=1000 * scale)
+    return lambda: (data,), junos.parse_interfaces
+
+
+def alcatel_isis(scale):
+    import alcatel_isis
+    lines = fixtures.isis_database(nodes=500 * scale)
+    return lambda: (lines,), alcatel_isis.process_isis_output
+
+
+def raritan_snmp(scale):
+    import raritan_snmp
+    output = fixtures.raritan_snmpwalk(ports=5000 * scale).encode('utf-8')
+    return lambda: (output,), raritan_snmp.parse_snmpwalk
+
+
+def checkmk_livestatus(scale):
+    import checkmk_livestatus
+    columns, rows = fixtures.livestatus(hosts=500 * scale)
+    return lambda: (columns, rows), lambda columns, rows: list(checkmk_livestatus.nerds_format(columns, rows))
+
+
+def nagiosxi_api(scale):
+    import nagiosxi_api
+    # nerds_format pops the host fields from the services it gets
+    return lambda: (fixtures.nagiosxi_servicestatus(hosts=500 * scale),), \
+        lambda services: list(nagiosxi_api.nerds_format(services))
+
+
+def csv_producer(scale):
+    import csv_producer
+    data = fixtures.csv_hosts(hosts=10000 * scale)
+    return lambda: (io.StringIO(u'' + data),), csv_producer.read_csv
+
+
+def cfengine_report(scale):
+    import cfengine_report
+    data = fixtures.cfengine_report(hosts=1000 * scale)
+    return lambda: (io.StringIO(u'' + data), ','), cfengine_report.read_csv
+
+
+def nmap_services_py(scale):
+    import nmap_services_py
+    scans = [fixtures.nmap_scan('10.0.{0}.{1}'.format(h // 256, h % 256), 'host{0}.example.net'.format(h))
+             for h in range(200 * scale)]
+    return lambda: (scans,), lambda scans: [nmap_services_py.nerds_format(next(iter(s['scan'])), s) for s in scans]
+
+
+# name: (producer directory, Python major version, setup returning (arguments, function))
+CASES = {
+    'juniper_conf': ('juniper_conf', 3, juniper_conf),
+    'nso': ('nso', 3, nso),
+    'alcatel_isis': ('alcatel_isis', 2, alcatel_isis),
+    'raritan_snmp': ('raritan_snmp', 3, raritan_snmp),
+    'checkmk_livestatus': ('checkmk_livestatus', 2, checkmk_livestatus),
+    'nagiosxi_api': ('nagiosxi_api', 3, nagiosxi_api),
+    'csv_producer': ('csv_producer', 2, csv_producer),
+    'cfengine_report': ('cfengine_report', 2, cfengine_report),
+    'nmap_services_py': ('nmap_services_py', 3, nmap_services_py),
+}
+
+
+def rss_kb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(name, scale=1, repeat=5):
+    """
+    Returns the best time of repeat calls of the function of a case, the
+    number of items it returned and how much the peak RSS of the process grew
+    during the first call.
+    """
+    directory, python, setup = CASES[name]
+    producer_path(directory)
+    try:
+        arguments, function = setup(scale)
+    except ImportError as e:
+        print('{0}: {1}'.format(name, e), file=sys.stderr)
+        sys.exit(SKIPPED)
+    best = None
+    rss_growth = None
+    items = None
+    for _ in range(repeat):
+        args = arguments()
+        gc.collect()
+        rss = rss_kb()
+        start = clock()
+        result = function(*args)
+        seconds = clock() - start
+        if rss_growth is None:
+            rss_growth = rss_kb() - rss
+            items = len(result)
+        best = seconds if best is None else min(best, seconds)
+        del result, args
+    return {
+        'case': name, 'scale': scale, 'items': items, 'seconds': best, 'rss_growth_kb': rss_growth,
+        'peak_rss_kb': rss_kb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('case', choices=sorted(CASES))
+    parser.add_argument('--scale', type=int, default=1, help='Multiplies the size of the input.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls, the best one counts.')
+    args = parser.parse_args()
+    print(json.dumps(run(args.case, args.scale, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
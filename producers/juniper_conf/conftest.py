@@ -0,0 +1,5 @@
+import os
+import sys
+
+# nerds_utils, as juniper_conf.py finds it
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -19,12 +19,20 @@
 # along with NERDS. If not, see <http://www.gnu.org/licenses/>.
 
 from xml.dom import minidom
+from xml.etree.ElementTree import ParseError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import os
 import sys
+import time
 from configparser import SafeConfigParser
 import argparse
 import logging
-from parsers import ElementParser, RouterPaser, ChassisParser
-from util import JsonWriter, JunosRemoteSource
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parsers import ElementParser, ElementStream, RouterPaser, ChassisParser  # noqa: E402
+from util import JsonWriter, JunosRemoteSource, XmlCache  # noqa: E402
+from nerds_utils.encoders import ENCODERS, get_encoder  # noqa: E402
+from nerds_utils import metrics  # noqa: E402
 
 logger = logging.getLogger('juniper_conf')
 logger.setLevel(logging.INFO)
@@ -41,11 +49,20 @@ logger.addHandler(ch)
 # If you have Python <2.7 you need to install argparse manually.
 
 
-def get_physical_interfaces(xmldoc):
+PARSER_BACKENDS = ['dom', 'stream']
+
+
+def get_physical_interfaces(xmldoc, stream=False):
     """
     Takes the output of "show interfaces" and creates a list of interface names that
     are physically in the router.
     """
+    if stream:
+        names = []
+        elementStream = ElementStream()
+        elementStream.on("physical-interfaces", lambda p, path: names.append(p.first("name").text()))
+        elementStream.run(xmldoc)
+        return names
     return [p.first("name").text() for p in ElementParser(xmldoc).all("physical-interfaces")]
 
 
@@ -68,7 +85,8 @@ def get_local_xml(f):
     Returns False if the XML is malformed.
     """
     try:
-        xmldoc = minidom.parse(f)
+        with metrics.timer('juniper_conf.parse_xml'):
+            xmldoc = minidom.parse(f)
     except Exception as e:
         logger.error(str(e))
         logger.error('Malformed XML input from %s.' % f)
@@ -76,6 +94,200 @@ def get_local_xml(f):
     return xmldoc
 
 
+def get_parser_backend(config):
+    """
+    Returns the configured XML parser backend, dom (the default) or stream.
+    """
+    backend = config.get('parser', 'backend', fallback='dom')
+    if backend not in PARSER_BACKENDS:
+        logger.error('Unknown parser backend %s, use one of %s.', backend, ', '.join(PARSER_BACKENDS))
+        sys.exit(1)
+    return backend
+
+
+def parse_local(f, stream=False):
+    """
+    Parses a local configuration file into a Router object.
+
+    Returns None if the file could not be parsed.
+    """
+    if stream:
+        try:
+            with metrics.timer('juniper_conf.parse'):
+                return RouterPaser().parse_stream(f)
+        except ParseError as e:
+            logger.error(str(e))
+            logger.error('Malformed XML input from %s.' % f)
+            return None
+    xmldoc = get_local_xml(f)
+    if xmldoc:
+        # Parse the xml document to create a Router object
+        with metrics.timer('juniper_conf.parse'):
+            return RouterPaser().parse(xmldoc)
+    return None
+
+
+def parse_local_json(f, stream=False):
+    """
+    Parses a local configuration file in a worker process.
+
+    Returns the router name and JSON, which are cheaper to send back to the
+    parent process than the Router object, or None if the file could not be parsed.
+    """
+    router = parse_local(f, stream)
+    if router:
+        return router.name, router.to_json()
+    return None
+
+
+def process_local(files, jsonWriter, stream=False, workers=1):
+    """
+    Parses the local files, in a pool of worker processes if workers > 1.
+
+    Results are logged and written in the order of files, so the output is the
+    same whatever the number of workers. Returns the files that failed.
+    """
+    if not files:
+        return []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parse_local_json, f, stream) for f in files]
+            return write_local(files, [future.result for future in futures], jsonWriter)
+    return write_local(files, [partial(parse_local_json, f, stream) for f in files], jsonWriter)
+
+
+def write_local(files, results, jsonWriter):
+    """
+    Writes the result of each file, given as a function returning what
+    parse_local_json does, and reports the files that failed.
+    """
+    failed = []
+    start = time.time()
+    for i, (f, result) in enumerate(zip(files, results), 1):
+        try:
+            parsed = result()
+        except Exception as e:
+            logger.error('[%s] parsing failed: %s', f, e)
+            parsed = None
+        if parsed:
+            logger.info('[%d/%d] %s parsed.', i, len(files), f)
+            jsonWriter.write_json(*parsed)
+        else:
+            logger.info('[%d/%d] %s failed.', i, len(files), f)
+            failed.append(f)
+    logger.info('Parsed %d of %d local files in %.0f s.', len(files) - len(failed), len(files), time.time() - start)
+    if failed:
+        logger.warning('Failed files: %s', ' '.join(failed))
+    return failed
+
+
+def collect_remote(junosRemote, host, stream=False, cache=None):
+    """
+    Fetches and parses the configuration, interfaces and hardware of a remote host.
+
+    With a cache, the raw replies are stored and a router parsed earlier from the
+    very same replies is returned as a CachedRouter instead of parsing them again.
+    Of the interfaces reply only the physical interface names count, its
+    counters change on every run.
+
+    Returns None if the configuration could not be fetched or parsed.
+    """
+    junosRemote.host = host
+    version_xml, configuration_xml, interfaces_xml, hardware_xml = junosRemote.fetch_show_all()
+    if configuration_xml is None:
+        return None
+    try:
+        # Only the interface names are used, the rest of the reply is live counters
+        interfaces = junosRemote.parse_reply(interfaces_xml)
+        with metrics.timer('juniper_conf.parse'):
+            physical_interfaces = get_physical_interfaces(interfaces, stream) if interfaces else []
+        key = None
+        if cache:
+            commands = [junosRemote.SHOW_VERSION, junosRemote.SHOW_CONFIGURATION, junosRemote.SHOW_HARDWARE]
+            digests = cache.store_replies(host, commands, [version_xml, configuration_xml, hardware_xml])
+            key = cache.key(digests, physical_interfaces)
+            router = cache.router(key)
+            if router:
+                metrics.count('juniper_conf.cache_hits')
+                return router
+        version_data, configuration, hardware = [
+            junosRemote.parse_reply(xml) for xml in [version_xml, configuration_xml, hardware_xml]]
+        if not configuration:
+            return None
+        with metrics.timer('juniper_conf.parse'):
+            chassis = None
+            if hardware:
+                if stream:
+                    chassis = ChassisParser().parse_stream(hardware)
+                else:
+                    chassis = ChassisParser().parse(hardware)
+
+            # Parse the xml document to create a Router object
+            if stream:
+                router = RouterPaser().parse_stream(configuration, version_data, physical_interfaces)
+            else:
+                router = RouterPaser().parse(configuration, version_data, physical_interfaces)
+    except ParseError as e:
+        logger.error(str(e))
+        logger.error('Malformed XML input from %s.' % host)
+        return None
+    if chassis:
+        router.hardware = chassis
+    if cache:
+        cache.store_router(key, router)
+    return router
+
+
+def collect_host(config, host, stream=False, host_timeout=None, cache=None):
+    """
+    Collects a single remote host with its own SSH sessions, safe to run in a worker thread.
+
+    host_timeout limits the total time spent waiting on the host in seconds.
+    """
+    junosRemote = JunosRemoteSource(
+        host, config.get('ssh', 'user'), config.get('ssh', 'password'), stream,
+        config.getboolean('ssh', 'reuse_session', fallback=False))
+    if host_timeout:
+        junosRemote.deadline = time.time() + host_timeout
+    return collect_remote(junosRemote, host, stream, cache)
+
+
+def process_remote(config, hosts, jsonWriter, stream=False, workers=1, host_timeout=None, cache=None):
+    """
+    Collects the remote hosts using a pool of worker threads.
+
+    Results are logged and written in the order of hosts, so the output is the
+    same whatever the number of workers. Routers found unchanged in the cache
+    are not written again if their output already exists. Returns the hosts
+    that failed.
+    """
+    failed = []
+    if not hosts:
+        return failed
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = [executor.submit(collect_host, config, host, stream, host_timeout, cache) for host in hosts]
+        for i, (host, future) in enumerate(zip(hosts, futures), 1):
+            try:
+                router = future.result()
+            except Exception as e:
+                logger.error('[%s] collection failed: %s', host, e)
+                router = None
+            if router and getattr(router, 'cached', False) and jsonWriter.exists(router.name.lower()):
+                logger.info('[%d/%d] %s unchanged.', i, len(hosts), host)
+            elif router:
+                logger.info('[%d/%d] %s collected.', i, len(hosts), host)
+                # Write JSON
+                jsonWriter.write(router)
+            else:
+                logger.info('[%d/%d] %s failed.', i, len(hosts), host)
+                failed.append(host)
+    logger.info('Collected %d of %d remote hosts in %.0f s.', len(hosts) - len(failed), len(hosts), time.time() - start)
+    if failed:
+        logger.warning('Failed hosts: %s', ' '.join(failed))
+    return failed
+
+
 def parse_args():
     # User friendly usage output
     parser = argparse.ArgumentParser()
@@ -91,6 +303,40 @@ def parse_args():
         '-N',
         action='store_true',
         help='Don\'t write output to disk.')
+    parser.add_argument(
+        '--json-encoder',
+        choices=ENCODERS + ['auto'],
+        default='json',
+        help='JSON encoder for the output, auto picks the fastest installed.')
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='Write compact JSON instead of pretty printed.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of remote hosts to collect in parallel.')
+    parser.add_argument(
+        '--local-workers',
+        type=int,
+        default=1,
+        help='Number of processes parsing local files in parallel.')
+    parser.add_argument(
+        '--host-timeout',
+        type=int,
+        help='Give up on a remote host after this many seconds.')
+    parser.add_argument(
+        '--cache-dir',
+        help='Cache raw XML replies and parsed routers in this directory.')
+    parser.add_argument(
+        '--cache-max-age',
+        type=float,
+        help='Evict cache entries unused for this many days.')
+    parser.add_argument(
+        '--cache-max-size',
+        type=float,
+        help='Evict the least recently used cache entries above this many MB.')
     args = parser.parse_args()
     # Load the configuration file
     if not args.C:
@@ -98,51 +344,36 @@ def parse_args():
         sys.exit(1)
     else:
         config = init_config(args.C)
-    not_to_disk = False
-    out_dir = 'json/'
-    if args.N:
-        not_to_disk = True
-    if args.O:
-        out_dir = args.O
+    if not args.O:
+        args.O = 'json/'
 
-    return config, not_to_disk, out_dir
+    return config, args
 
 
 def main():
-    config, not_to_disk, out_dir = parse_args()
-    jsonWriter = JsonWriter(not_to_disk, out_dir)
+    config, args = parse_args()
+    stream = get_parser_backend(config) == 'stream'
+    try:
+        encoder = get_encoder(args.json_encoder, args.compact, sort_keys=False)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    jsonWriter = JsonWriter(args.N, args.O, encoder)
     # Process local files
     local_sources = config.get('sources', 'local').split()
-    for f in local_sources:
-        xmldoc = get_local_xml(f)
-        if xmldoc:
-            # Parse the xml document to create a Router object
-            router = RouterPaser().parse(xmldoc)
-            jsonWriter.write(router)
+    process_local(local_sources, jsonWriter, stream, args.local_workers)
     # Process remote hosts
     remote_sources = config.get('sources', 'remote').split()
-    junosRemote = JunosRemoteSource(None, config.get('ssh', 'user'), config.get('ssh', 'password'))
-    for host in remote_sources:
-        junosRemote.host = host
-        version_data = junosRemote.show_version()
-        configuration = junosRemote.show_configuration()
-        if configuration:
-            interfaces = junosRemote.show_interfaces()
-            if interfaces:
-                physical_interfaces = get_physical_interfaces(interfaces)
-            else:
-                physical_interfaces = []
-
-            hardware = junosRemote.show_hardware()
-            if hardware:
-                chassis = ChassisParser().parse(hardware)
-
-            # Parse the xml document to create a Router object
-            router = RouterPaser().parse(configuration, version_data, physical_interfaces)
-            if chassis:
-                router.hardware = chassis
-            # Write JSON
-            jsonWriter.write(router)
+    cache = None
+    if args.cache_dir:
+        max_size = int(args.cache_max_size * 1024 * 1024) if args.cache_max_size is not None else None
+        cache = XmlCache(args.cache_dir, args.cache_max_age, max_size)
+    process_remote(config, remote_sources, jsonWriter, stream, args.workers, args.host_timeout, cache)
+    if cache:
+        cache.evict()
+        logger.info(cache.summary())
+    if not args.N:
+        metrics.save(args.O, 'juniper_conf')
     return 0
 
 
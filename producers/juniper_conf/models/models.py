@@ -1,4 +1,6 @@
 class Router:
+    __slots__ = ('name', 'version', 'model', 'interfaces', 'bgp_peerings', 'hardware')
+
     def __init__(self):
         self.name = ''
         self.version = ''
@@ -8,15 +10,19 @@ class Router:
         self.hardware = ''
 
     def to_json(self):
-        j = vars(self).copy()
-        j['interfaces'] = [i.to_json() for i in self.interfaces]
-        j['bgp_peerings'] = [p.to_json() for p in self.bgp_peerings]
-        if self.hardware:
-            j['hardware'] = self.hardware.to_json()
-        return j
+        return {
+            'name': self.name,
+            'version': self.version,
+            'model': self.model,
+            'interfaces': [i.to_json() for i in self.interfaces],
+            'bgp_peerings': [p.to_json() for p in self.bgp_peerings],
+            'hardware': self.hardware.to_json() if self.hardware else self.hardware,
+        }
 
 
 class Interface:
+    __slots__ = ('name', 'bundle', 'description', 'vlantagging', 'tunneldict', 'inactive', 'unitdict')
+
     def __init__(self):
         self.name = ''
         self.bundle = ''
@@ -24,9 +30,7 @@ class Interface:
         self.vlantagging = ''
         self.tunneldict = []
         self.inactive = False
-        # Unit dict is a list of dictionaries containing units to
-        # interfaces, should be index like {'unit': 'name',
-        # 'description': 'foo', 'vlanid': 'bar', 'address': 'xyz'}
+        # List of the Units of the interface
         self.unitdict = []
 
     def to_json(self):
@@ -36,13 +40,51 @@ class Interface:
             'description': self.description,
             'vlantagging': self.vlantagging,
             'tunnels': self.tunneldict,
-            'units': self.unitdict,
+            'units': [u.to_json() for u in self.unitdict],
             'inactive': self.inactive,
         }
         return j
 
 
+class Unit:
+    """
+    Logical unit of an Interface.
+
+    Units used to be dicts and can still be read like one, unit['vlanid'] or
+    unit.get('vlanid').
+    """
+    __slots__ = ('unit', 'description', 'vlanid', 'address', 'inactive')
+
+    def __init__(self, unit=None, description=None, vlanid=None, address=None, inactive=False):
+        self.unit = unit
+        self.description = description
+        self.vlanid = vlanid
+        self.address = address if address is not None else []
+        self.inactive = inactive
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        return getattr(self, key)
+
+    def to_json(self):
+        return {
+            'unit': self.unit,
+            'description': self.description,
+            'vlanid': self.vlanid,
+            'address': self.address,
+            'inactive': self.inactive,
+        }
+
+
 class BgpPeering:
+    __slots__ = ('type', 'remote_address', 'description', 'local_address', 'group', 'as_number')
+
     def __init__(self):
         self.type = None
         self.remote_address = None
@@ -52,5 +94,11 @@ class BgpPeering:
         self.as_number = None
 
     def to_json(self):
-        j = vars(self).copy()
-        return j
+        return {
+            'type': self.type,
+            'remote_address': self.remote_address,
+            'description': self.description,
+            'local_address': self.local_address,
+            'group': self.group,
+            'as_number': self.as_number,
+        }
@@ -0,0 +1,44 @@
+import json
+import unittest
+from .models import Router, Interface, Unit, BgpPeering
+from .chassis import Chassis
+
+
+class RouterTest(unittest.TestCase):
+    def setUp(self):
+        interface = Interface()
+        interface.name = 'xe-0/0/0'
+        interface.unitdict = [Unit('100', 'Unit 100', '100', ['10.0.0.1/31'])]
+        self.router = Router()
+        self.router.name = 'r1'
+        self.router.interfaces = [interface]
+        self.router.bgp_peerings = [BgpPeering()]
+
+    def test_to_json(self):
+        j = self.router.to_json()
+        self.assertEqual(list(j), ['name', 'version', 'model', 'interfaces', 'bgp_peerings', 'hardware'])
+        self.assertEqual(j['hardware'], '')
+        self.assertEqual(list(j['interfaces'][0]), [
+            'name', 'bundle', 'description', 'vlantagging', 'tunnels', 'units', 'inactive'])
+        self.assertEqual(json.dumps(j['interfaces'][0]['units']), json.dumps([{
+            'unit': '100', 'description': 'Unit 100', 'vlanid': '100', 'address': ['10.0.0.1/31'], 'inactive': False}]))
+        self.assertEqual(list(j['bgp_peerings'][0]), [
+            'type', 'remote_address', 'description', 'local_address', 'group', 'as_number'])
+
+    def test_hardware(self):
+        self.router.hardware = Chassis()
+        self.assertEqual(list(self.router.to_json()['hardware']), ['name', 'serial_number', 'description', 'modules'])
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.router.typo = 'x'
+
+
+class UnitTest(unittest.TestCase):
+    def test_mapping(self):
+        unit = Unit('100', vlanid='100')
+        self.assertEqual(unit['unit'], '100')
+        self.assertEqual(unit.get('vlanid'), '100')
+        self.assertEqual(unit['address'], [])
+        self.assertEqual(unit.get('missing', 'x'), 'x')
+        self.assertRaises(KeyError, lambda: unit['missing'])
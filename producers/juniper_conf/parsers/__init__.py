@@ -3,3 +3,4 @@ from .bgp import BgpPeeringParser
 from .interfaces import InterfaceParser
 from .router import RouterPaser
 from .base import ElementParser
+from .stream import ElementStream
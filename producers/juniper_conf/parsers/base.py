@@ -1,3 +1,6 @@
+from bisect import bisect_left, bisect_right
+
+
 class ParserError(Exception):
     pass
 
@@ -5,9 +8,13 @@ class ParserError(Exception):
 class ElementParser:
     """
         A Simple xml parsing helper. Wraps around xml.dom elements and allows chaining.
+
+        Tag lookups go through a TagIndex of the tree, built the first time all() is
+        used and shared by every ElementParser handed out from there on.
     """
-    def __init__(self, nodeTree):
+    def __init__(self, nodeTree, index=None):
         self.nodeTree = nodeTree or EmptyTree()
+        self.index = index or TagIndex.cached(self.nodeTree)
 
     def text(self):
         """
@@ -24,10 +31,15 @@ class ElementParser:
         """
             Gets the first matching tag. If no tag is present an EmptyTree will be returned.
             Wraps all elements in a new ElementParser.
+
+            Without an index the tree is walked until the first match.
         """
-        res = self.all(tag)
-        if len(res) > 0:
-            return res[0]
+        if self.index is not None and self.index.covers(self.nodeTree):
+            node = self.index.first(self.nodeTree, tag)
+        else:
+            node = self._walk_first(tag)
+        if node is not None:
+            return ElementParser(node, self.index)
         else:
             return ElementParser(EmptyTree())
 
@@ -36,13 +48,24 @@ class ElementParser:
             Gets all tags matching supplied tag name.
             Wraps all elements in a new ElementParser.
         """
-        return [ElementParser(n) for n in self.nodeTree.getElementsByTagName(tag)]
+        if isinstance(self.nodeTree, EmptyTree):
+            return []
+        if self.index is None or not self.index.covers(self.nodeTree):
+            self.index = TagIndex.build(self.nodeTree)
+        return [ElementParser(n, self.index) for n in self.index.lookup(self.nodeTree, tag)]
+
+    def children(self):
+        """
+            Returns all direct child elements.
+            Wraps all elements in a new ElementParser.
+        """
+        return [ElementParser(n, self.index) for n in self.nodeTree.childNodes if n.nodeType == n.ELEMENT_NODE]
 
     def parent(self):
         """
             Returns parent node.
         """
-        return ElementParser(self.nodeTree.parentNode)
+        return ElementParser(self.nodeTree.parentNode, self.index)
 
     def tag(self):
         """
@@ -56,6 +79,95 @@ class ElementParser:
         """
         return self.nodeTree.getAttribute(key) or default
 
+    def _walk_first(self, tag):
+        stack = list(reversed(self.nodeTree.childNodes))
+        while stack:
+            node = stack.pop()
+            if node.nodeType == node.ELEMENT_NODE:
+                if node.tagName == tag:
+                    return node
+                stack.extend(reversed(node.childNodes))
+        return None
+
+
+class TagIndex:
+    """
+        Maps tag names to the elements of an xml.dom tree in document order.
+
+        The tree is walked once. Every element gets a span of positions covering
+        its subtree, so matches below any element are a slice of the tag list.
+        The tree must not be modified after the index is built.
+
+        The index is kept on the root node so that every ElementParser created for
+        the same document reuses it, and is freed together with the document.
+    """
+    def __init__(self, root):
+        self.tags = {}
+        self.spans = {}
+        self.elements = []
+        self._walk(root)
+
+    @classmethod
+    def build(cls, root):
+        index = cls(root)
+        root._tag_index = index
+        return index
+
+    @classmethod
+    def cached(cls, root):
+        """
+            Returns the index built for root, if any.
+        """
+        return getattr(root, '_tag_index', None)
+
+    def covers(self, node):
+        return node in self.spans
+
+    def lookup(self, node, tag):
+        """
+            Returns the elements named tag below node.
+        """
+        start, end = self.spans[node]
+        positions = self.tags.get(tag)
+        if not positions:
+            return []
+        lo = bisect_right(positions, start)
+        hi = bisect_left(positions, end, lo)
+        elements = self.elements
+        return [elements[p] for p in positions[lo:hi]]
+
+    def first(self, node, tag):
+        """
+            Returns the first element named tag below node or None.
+        """
+        start, end = self.spans[node]
+        positions = self.tags.get(tag)
+        if not positions:
+            return None
+        lo = bisect_right(positions, start)
+        if lo < len(positions) and positions[lo] < end:
+            return self.elements[positions[lo]]
+        return None
+
+    def _walk(self, root):
+        elements = self.elements
+        spans = self.spans
+        tags = self.tags
+        element_node = root.ELEMENT_NODE
+
+        def visit(node):
+            start = len(elements)
+            elements.append(node)
+            for child in node.childNodes:
+                if child.nodeType == element_node:
+                    positions = tags.get(child.tagName)
+                    if positions is None:
+                        positions = tags[child.tagName] = []
+                    positions.append(len(elements))
+                    visit(child)
+            spans[node] = (start, len(elements))
+        visit(root)
+
 
 class EmptyTree:
     """
@@ -64,13 +176,12 @@ class EmptyTree:
     def __init__(self):
         self.childNodes = []
 
-    def getElementsByTagName(self, tag):
-        return []
-
 
 def get_hostname(doc):
-    hostname = doc.first("host-name").text()
-    domain = doc.first('domain-name').text()
+    return clean_hostname(doc.first("host-name").text(), doc.first('domain-name').text())
+
+
+def clean_hostname(hostname, domain):
     if not hostname:
         raise ParserError('Could not find host-name in the Juniper configuration.')
     if domain:
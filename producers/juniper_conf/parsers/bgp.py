@@ -1,4 +1,5 @@
 from .base import ElementParser
+from .stream import ElementStream
 from models import BgpPeering
 
 
@@ -6,9 +7,33 @@ class BgpPeeringParser:
 
     def parse(self, nodeTree):
         peerings = []
-        bgpGroups = [g for bgp in ElementParser(nodeTree).all("bgp") if not bgp.attr('inactive') == 'inactive' for g in bgp.all("group")]
+        for bgp in ElementParser(nodeTree).all("bgp"):
+            self._bgp(bgp, peerings)
+        return peerings
+
+    def parse_stream(self, source):
+        """
+            Parses a configuration file name or file object using an ElementStream.
+        """
+        stream = ElementStream()
+        result = self.register(stream)
+        stream.run(source)
+        return result()
+
+    def register(self, stream):
+        """
+            Registers the bgp handler on an ElementStream.
+            Returns a function giving the peerings once the stream has run.
+        """
+        peerings = []
+        stream.on("bgp", lambda node, path: self._bgp(node, peerings))
+        return lambda: peerings
 
-        for group in bgpGroups:
+    def _bgp(self, bgp, peerings):
+        if bgp.attr('inactive') == 'inactive':
+            return
+
+        for group in bgp.all("group"):
             if not group.attr('inactive') == 'inactive':
                 gname = group.first("name").text()
                 gtype = group.first("type").text()
@@ -24,5 +49,3 @@ class BgpPeeringParser:
                         peering.local_address = local_address
                         peering.as_number = neighbor.first("peer-as").text()
                         peerings.append(peering)
-
-        return peerings
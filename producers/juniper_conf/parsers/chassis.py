@@ -1,4 +1,5 @@
 from .base import ElementParser
+from .stream import ElementStream
 from models.chassis import Chassis, ChassisModule
 
 
@@ -13,6 +14,16 @@ class ChassisParser:
         chassisNode = ElementParser(nodeTree).first("chassis")
         return self._create_chassis(chassisNode)
 
+    def parse_stream(self, source):
+        """
+            Parses the first chassis node in a file name or file object using an ElementStream.
+        """
+        chassis = []
+        stream = ElementStream()
+        stream.on("chassis", lambda node, path: chassis.append(self._create_chassis(node)), lambda path: not chassis)
+        stream.run(source)
+        return chassis[0] if chassis else self._create_chassis(ElementParser(None))
+
     def parseAll(self, nodeTree):
         return [self._create_chassis(n) for n in ElementParser(nodeTree).all("chassis")]
 
@@ -42,7 +53,7 @@ class ChassisParser:
         module.clei_code = node.first("clei-code").text()
         module.clei_code = node.first("clei-code").text()
         module.sub_modules = [
-            self._create_module(ElementParser(c))
-            for c in node.nodeTree.childNodes if "-module" in c.nodeName
+            self._create_module(c)
+            for c in node.children() if "-module" in c.tag()
         ]
         return module
@@ -1,5 +1,6 @@
-from models import Interface
+from models import Interface, Unit
 from .base import ElementParser, get_hostname
+from .stream import ElementStream, register_hostname
 from util import logger
 
 
@@ -13,24 +14,9 @@ class InterfaceParser:
         ]
 
         interface_map = {}
+        skipped = []
         for node in interfaceNodes:
-            iname = node.first("name").text()
-            if iname is None:
-                continue
-            interface = interface_map.get(iname, self.new_interface(iname))
-
-            if physicalInterfaces and iname not in physicalInterfaces:
-                logger.warn("Interface {0} is configured but not found in {1}".format(iname, host_name))
-                continue
-
-            # Update interface
-            self._interface(interface, node)
-            interface_map[interface.name] = interface
-
-        # Add remaining physical interfaces if any
-        for iface in physicalInterfaces:
-            if iface not in interface_map:
-                interface_map[iface] = self.new_interface(iface)
+            self._configured(interface_map, node, physicalInterfaces, skipped)
 
         # Handle logical systems
         logicalNodes = [
@@ -38,20 +24,87 @@ class InterfaceParser:
             if i.parent().tag() in ['logical-systems']
             for iface in i.all("interface")
         ]
-        for node in logicalNodes:
-            iname = node.first("name").text()
-            interface = interface_map.get(iname, self.new_interface(iname))
-            # Only update unitdict for logical systems
-            interface.unitdict += [self._unit(u) for u in node.all("unit")]
-            interface_map[interface.name] = interface
+        logical = [self._logical(node) for node in logicalNodes]
 
-        return sorted(interface_map.values(), key=lambda i: i.name)
+        return self._finish(interface_map, physicalInterfaces, skipped, logical, host_name)
+
+    def parse_stream(self, source, physicalInterfaces=[]):
+        """
+            Parses a configuration file name or file object using an ElementStream.
+        """
+        stream = ElementStream()
+        result = self.register(stream, physicalInterfaces)
+        stream.run(source)
+        return result()
+
+    def register(self, stream, physicalInterfaces=[]):
+        """
+            Registers the interface handlers on an ElementStream.
+            Returns a function giving the interfaces once the stream has run.
+        """
+        host_name = register_hostname(stream)
+        interface_map = {}
+        skipped = []
+        logical = []
+
+        def configured(node, path):
+            for iface in self._interface_nodes(node):
+                self._configured(interface_map, iface, physicalInterfaces, skipped)
+
+        def logical_system(node, path):
+            logical.extend(self._logical(iface) for iface in self._interface_nodes(node))
+
+        # Every child of an interfaces element is handled on its own so that only
+        # one interface is kept in memory at a time.
+        stream.on(None, configured, lambda path: path[-2:] == ['configuration', 'interfaces'])
+        stream.on(None, logical_system, lambda path: path[-2:] == ['logical-systems', 'interfaces'])
+        return lambda: self._finish(interface_map, physicalInterfaces, skipped, logical, host_name())
 
     def new_interface(self, name):
         interface = Interface()
         interface.name = name
         return interface
 
+    def _interface_nodes(self, node):
+        nodes = node.all("interface")
+        if node.tag() == "interface":
+            nodes.insert(0, node)
+        return nodes
+
+    def _configured(self, interface_map, node, physicalInterfaces, skipped):
+        iname = node.first("name").text()
+        if iname is None:
+            return
+        interface = interface_map.get(iname, self.new_interface(iname))
+
+        if physicalInterfaces and iname not in physicalInterfaces:
+            skipped.append(iname)
+            return
+
+        # Update interface
+        self._interface(interface, node)
+        interface_map[interface.name] = interface
+
+    def _logical(self, node):
+        return node.first("name").text(), [self._unit(u) for u in node.all("unit")]
+
+    def _finish(self, interface_map, physicalInterfaces, skipped, logical, host_name):
+        for iname in skipped:
+            logger.warn("Interface {0} is configured but not found in {1}".format(iname, host_name))
+
+        # Add remaining physical interfaces if any
+        for iface in physicalInterfaces:
+            if iface not in interface_map:
+                interface_map[iface] = self.new_interface(iface)
+
+        for iname, units in logical:
+            interface = interface_map.get(iname, self.new_interface(iname))
+            # Only update unitdict for logical systems
+            interface.unitdict += units
+            interface_map[interface.name] = interface
+
+        return sorted(interface_map.values(), key=lambda i: i.name)
+
     def _interface(self, interface, node):
         interface.vlantagging = len(node.all("vlan-tagging")) > 0
         interface.bundle = node.first("bundle").text()
@@ -64,10 +117,10 @@ class InterfaceParser:
         interface.unitdict += [self._unit(u) for u in node.all("unit")]
 
     def _unit(self, unit):
-        return {
-            'unit': unit.first("name").text(),
-            'description': unit.first("description").text(),
-            'vlanid': unit.first("vlan-id").text(),
-            'address': [a.first("name").text() for a in unit.all("address")],
-            'inactive': unit.attr('inactive') == 'inactive',
-        }
+        return Unit(
+            unit.first("name").text(),
+            unit.first("description").text(),
+            unit.first("vlan-id").text(),
+            [a.first("name").text() for a in unit.all("address")],
+            unit.attr('inactive') == 'inactive',
+        )
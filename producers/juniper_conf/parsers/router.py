@@ -1,11 +1,12 @@
 from .base import ElementParser, get_hostname
+from .stream import ElementStream, register_hostname, first_texts
 from models import Router
 from .interfaces import InterfaceParser
 from .bgp import BgpPeeringParser
 
 
 class RouterPaser:
-    def parse(self, nodeTree, versionTree, physical_interfaces=[]):
+    def parse(self, nodeTree, versionTree=None, physical_interfaces=[]):
         self._clean(nodeTree)
         doc = ElementParser(nodeTree)
         router = Router()
@@ -17,6 +18,25 @@ class RouterPaser:
         router.bgp_peerings = BgpPeeringParser().parse(nodeTree)
         return router
 
+    def parse_stream(self, source, versionSource=None, physical_interfaces=[]):
+        """
+            Builds the same Router as parse but streams the configuration in a
+            single pass instead of walking a full xml.dom tree.
+            Sources are file names or file objects.
+        """
+        stream = ElementStream()
+        hostname = register_hostname(stream)
+        interfaces = InterfaceParser().register(stream, physical_interfaces)
+        bgp_peerings = BgpPeeringParser().register(stream)
+        stream.run(source)
+
+        router = Router()
+        router.name = hostname()
+        router.version, router.model = first_texts(versionSource, ["junos-version", "product-model"])
+        router.interfaces = interfaces()
+        router.bgp_peerings = bgp_peerings()
+        return router
+
     def _clean(self, nodeTree):
         # Remove unwanted stuff, e.g. logical-systems
         pass
@@ -0,0 +1,140 @@
+from xml.etree.ElementTree import iterparse
+from .base import ElementParser, EmptyTree, ParserError, clean_hostname
+
+
+class StreamElement(ElementParser):
+    """
+        ElementParser for the xml.etree elements handed out by an ElementStream.
+        Streamed elements are detached from the rest of the document, so only
+        lookups inside the element itself are possible.
+    """
+    def __init__(self, nodeTree):
+        # etree elements without children are falsy, so no EmptyTree fallback here
+        self.nodeTree = nodeTree
+
+    def text(self):
+        text = [self.nodeTree.text or ""] + [child.tail or "" for child in self.nodeTree]
+        return "".join(text) or None
+
+    def first(self, tag):
+        for n in self.nodeTree.iter(tag):
+            if n is not self.nodeTree:
+                return StreamElement(n)
+        return ElementParser(EmptyTree())
+
+    def all(self, tag):
+        return [StreamElement(n) for n in self.nodeTree.iter(tag) if n is not self.nodeTree]
+
+    def children(self):
+        return [StreamElement(n) for n in self.nodeTree]
+
+    def parent(self):
+        raise ParserError('The stream backend has no parent access, streamed {0} elements are detached.'.format(self.tag()))
+
+    def tag(self):
+        return self.nodeTree.tag
+
+    def attr(self, key, default=None):
+        return self.nodeTree.get(key) or default
+
+
+class ElementStream:
+    """
+        Incremental xml parsing helper built on iterparse.
+
+        Handlers registered with on() are called with every completed element
+        they match. Only the subtrees a handler asked for are kept while they
+        are built, everything else is dropped as soon as it ends. Memory use is
+        bounded by the largest handled subtree instead of the whole document.
+    """
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, tag, handler, where=None):
+        """
+            Calls handler(element, path) for each element named tag (any element if
+            tag is None) whose path of ancestor tag names, root first, satisfies where.
+        """
+        self.handlers.append((tag, where, handler))
+
+    def run(self, source):
+        """
+            Parses source, a file name or file object, calling the registered handlers.
+            Raises xml.etree.ElementTree.ParseError on malformed input.
+        """
+        prefixes = {}
+        path = []
+        elements = []
+        matches = []
+        kept = 0
+        for event, elem in iterparse(source, events=('start-ns', 'start', 'end')):
+            if event == 'start-ns':
+                prefix, uri = elem
+                prefixes[uri] = prefix
+            elif event == 'start':
+                # Name tags the way xml.dom does, e.g. junos:comment
+                elem.tag = self._tag_name(elem.tag, prefixes)
+                handlers = [
+                    h for tag, where, h in self.handlers
+                    if (tag is None or tag == elem.tag) and (where is None or where(path))
+                ]
+                if handlers:
+                    kept += 1
+                path.append(elem.tag)
+                elements.append(elem)
+                matches.append(handlers)
+            else:
+                handlers = matches.pop()
+                path.pop()
+                elements.pop()
+                if handlers:
+                    kept -= 1
+                    for handler in handlers:
+                        handler(StreamElement(elem), path)
+                if not kept and elements:
+                    elements[-1].remove(elem)
+
+    def _tag_name(self, tag, prefixes):
+        if tag[0] != '{':
+            return tag
+        uri, name = tag[1:].split('}', 1)
+        prefix = prefixes.get(uri)
+        if prefix:
+            return '{0}:{1}'.format(prefix, name)
+        return name
+
+
+def register_first_text(stream, tag):
+    """
+        Registers a handler for the text of the first tag element in the stream.
+        Returns a function giving the text once the stream has run.
+    """
+    found = []
+
+    def handler(node, path):
+        if not found:
+            found.append(node.text())
+    stream.on(tag, handler, lambda path: not found)
+    return lambda: found[0] if found else None
+
+
+def register_hostname(stream):
+    """
+        Streaming counterpart of get_hostname.
+        Returns a function giving the host name once the stream has run.
+    """
+    hostname = register_first_text(stream, "host-name")
+    domain = register_first_text(stream, "domain-name")
+    return lambda: clean_hostname(hostname(), domain())
+
+
+def first_texts(source, tags):
+    """
+        Streams source and returns the text of the first element of each tag.
+    """
+    if source is None:
+        return [None for tag in tags]
+    stream = ElementStream()
+    texts = [register_first_text(stream, tag) for tag in tags]
+    stream.run(source)
+    return [text() for text in texts]
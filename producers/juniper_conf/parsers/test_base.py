@@ -0,0 +1,46 @@
+from xml.dom import minidom
+from .base import ElementParser, EmptyTree
+import unittest
+
+
+class ElementParserTest(unittest.TestCase):
+    def setUp(self):
+        self.doc = minidom.parseString(
+            "<a><b><name>b1</name><c>1</c></b><c>2</c><b><name>b2</name><d><c>3</c></d></b></a>")
+
+    def test_all(self):
+        doc = ElementParser(self.doc)
+        self.assertEqual([c.text() for c in doc.all("c")], ["1", "2", "3"])
+        self.assertEqual([b.first("name").text() for b in doc.all("b")], ["b1", "b2"])
+
+    def test_all_excludes_self(self):
+        b = ElementParser(self.doc).first("b")
+        self.assertEqual(b.all("b"), [])
+        self.assertEqual([c.text() for c in b.all("c")], ["1"])
+
+    def test_first_without_index(self):
+        doc = ElementParser(self.doc)
+        self.assertIsNone(doc.index)
+        self.assertEqual(doc.first("c").text(), "1")
+        self.assertIsNone(doc.first("missing").text())
+
+    def test_first_with_index(self):
+        doc = ElementParser(self.doc)
+        last = doc.all("b")[1]
+        self.assertIsNotNone(last.index)
+        self.assertEqual(last.first("c").text(), "3")
+        self.assertIsNone(last.first("missing").text())
+
+    def test_index_is_shared(self):
+        ElementParser(self.doc).all("b")
+        self.assertIsNotNone(ElementParser(self.doc).index)
+
+    def test_parent(self):
+        d = ElementParser(self.doc).all("d")[0]
+        self.assertEqual(d.parent().first("name").text(), "b2")
+        self.assertEqual(len(d.parent().parent().all("c")), 3)
+
+    def test_empty(self):
+        empty = ElementParser(EmptyTree())
+        self.assertEqual(empty.all("c"), [])
+        self.assertIsNone(empty.first("c").text())
@@ -44,3 +44,8 @@ class BgpParserTest(unittest.TestCase):
         self.assertEqual(ipv6[0].type, "internal")
         self.assertIsNone(ipv6[0].description)
         self.assertIsNone(ipv6[0].as_number)
+
+
+class BgpStreamParserTest(BgpParserTest):
+    def setUp(self):
+        self.bgp_peerings = BgpPeeringParser().parse_stream("parsers/test_show_config.xml")
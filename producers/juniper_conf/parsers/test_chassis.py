@@ -54,3 +54,8 @@ class ChassisParserTest(unittest.TestCase):
         self.assertEqual(sub_module.part_number, "777-777777")
         self.assertEqual(sub_module.serial_number, "xxxxxx7")
         self.assertEqual(sub_module.description, "SFP+-10G-LR")
+
+
+class ChassisStreamParserTest(ChassisParserTest):
+    def setUp(self):
+        self.chassis = ChassisParser().parse_stream("parsers/chassis-test.xml")
@@ -47,18 +47,21 @@ class InterfaceParserTest(unittest.TestCase):
 
     def test_with_physical(self):
         physical_interface = ["xe-0/0/0", "xe-0/0/1", "xe-0/0/3", "xe-0/0/4", "3fe", "whoooot", "ae4"]
-        self.interfaces = InterfaceParser().parse(self.xml, physical_interface)
+        self.interfaces = self.parse(physical_interface)
         self.assertEqual(len(self.interfaces), 7)
         self.contains(lambda i: i.name == "whoooot")
 
     def test_logical_systems(self):
-        self.interfaces = InterfaceParser().parse(self.xml)
+        self.interfaces = self.parse()
         et = [i for i in self.interfaces if i.name == 'xe-0/0/4']
         self.assertEqual(len(et), 1, 'Expected only one xe-0/0/4 interface')
         # Check that there are two interfaces 10 and 1002
         units = [u.get('unit') for u in et[0].unitdict]
         self.assertEqual(sorted(units), ['10', '1002'])
 
+    def parse(self, physical_interfaces=[]):
+        return InterfaceParser().parse(self.xml, physical_interfaces)
+
     def contains(self, fn):
         result = [i for i in self.interfaces if fn(i)]
         self.assertTrue(len(result) > 0, "Expected at least one matching interface")
@@ -67,3 +70,11 @@ class InterfaceParserTest(unittest.TestCase):
         print("Interfaces:")
         for i in self.interfaces:
             print(json.dumps(i.to_json(), indent=2))
+
+
+class InterfaceStreamParserTest(InterfaceParserTest):
+    def setUp(self):
+        self.interfaces = self.parse()
+
+    def parse(self, physical_interfaces=[]):
+        return InterfaceParser().parse_stream("parsers/test_show_config.xml", physical_interfaces)
@@ -0,0 +1,24 @@
+from xml.dom import minidom
+from .router import RouterPaser
+import unittest
+
+
+class RouterStreamParserTest(unittest.TestCase):
+    def setUp(self):
+        xml = minidom.parse("parsers/test_show_config.xml")
+        self.router = RouterPaser().parse(xml)
+        self.streamed = RouterPaser().parse_stream("parsers/test_show_config.xml")
+
+    def test_name(self):
+        self.assertEqual(self.router.name, "se-test.nordu.net")
+        self.assertEqual(self.streamed.name, self.router.name)
+
+    def test_same_as_dom(self):
+        self.assertEqual(self.streamed.to_json(), self.router.to_json())
+
+    def test_physical_interfaces(self):
+        physical = ["xe-0/0/0", "xe-0/0/3", "whoooot"]
+        xml = minidom.parse("parsers/test_show_config.xml")
+        router = RouterPaser().parse(xml, None, physical)
+        streamed = RouterPaser().parse_stream("parsers/test_show_config.xml", None, physical)
+        self.assertEqual(streamed.to_json(), router.to_json())
@@ -0,0 +1,77 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+import juniper_conf
+from models import Router
+
+
+class FakeWriter:
+    def __init__(self):
+        self.written = []
+
+    def write(self, router):
+        self.written.append(router.name)
+
+    def write_json(self, name, router_json):
+        self.written.append((name, router_json))
+
+
+def fake_collect_host(config, host, stream=False, host_timeout=None, cache=None):
+    # Finish in random order to check that results are still handled in host order
+    time.sleep(random.random() / 100)
+    if host.startswith('broken'):
+        return None
+    if host.startswith('crash'):
+        raise RuntimeError('boom')
+    router = Router()
+    router.name = host
+    return router
+
+
+class ProcessRemoteTest(unittest.TestCase):
+    def setUp(self):
+        self.collect_host = juniper_conf.collect_host
+        juniper_conf.collect_host = fake_collect_host
+
+    def tearDown(self):
+        juniper_conf.collect_host = self.collect_host
+
+    def test_order_with_workers(self):
+        hosts = ['r{}'.format(i) for i in range(20)]
+        writer = FakeWriter()
+        failed = juniper_conf.process_remote(None, hosts, writer, workers=8)
+        self.assertEqual(writer.written, hosts)
+        self.assertEqual(failed, [])
+
+    def test_failures(self):
+        hosts = ['r1', 'broken1', 'r2', 'crash1', 'r3']
+        writer = FakeWriter()
+        failed = juniper_conf.process_remote(None, hosts, writer, workers=3)
+        self.assertEqual(writer.written, ['r1', 'r2', 'r3'])
+        self.assertEqual(failed, ['broken1', 'crash1'])
+
+
+class ProcessLocalTest(unittest.TestCase):
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parsers', 'test_show_config.xml')
+
+    def setUp(self):
+        fd, self.broken = tempfile.mkstemp(suffix='.xml')
+        with os.fdopen(fd, 'w') as f:
+            f.write('<rpc-reply><configuration>')
+
+    def tearDown(self):
+        os.remove(self.broken)
+
+    def process(self, workers):
+        files = [self.config, self.broken, 'missing.xml', self.config]
+        writer = FakeWriter()
+        failed = juniper_conf.process_local(files, writer, workers=workers)
+        self.assertEqual(failed, [self.broken, 'missing.xml'])
+        return writer.written
+
+    def test_workers(self):
+        written = self.process(workers=1)
+        self.assertEqual([name for name, router_json in written], ['se-test.nordu.net', 'se-test.nordu.net'])
+        self.assertEqual(self.process(workers=3), written)
@@ -1,3 +1,4 @@
 from .writer import JsonWriter
 from .remote_source import RemoteSource, JunosRemoteSource
 from . import logger
+from .cache import XmlCache
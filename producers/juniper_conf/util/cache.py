@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from util import logger
+from .reply import XmlReply
+
+# Bump when the parsers change what they produce from the same XML, so that
+# routers cached by an older version are parsed again.
+CACHE_VERSION = 1
+
+
+class CachedRouter:
+    """
+        Stands in for a Router whose JSON was found in the cache.
+    """
+    cached = True
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def to_json(self):
+        return self.data
+
+
+class XmlCache:
+    """
+        On-disk cache of the raw XML replies and the routers parsed from them.
+
+            objects/<sha256>.xml    raw replies, content addressed
+            refs/<host>.json        command -> sha256 of the latest reply from host
+            routers/<sha256>.json   Router.to_json() keyed by the hash of the replies
+                                    and the physical interface names
+
+        Files are touched when used, so their modification time is the time of last
+        use, and written to a temporary file first so that workers never read a
+        partial entry.
+    """
+    def __init__(self, path, max_age=None, max_size=None):
+        self.path = path
+        # Days and bytes respectively, None for no limit
+        self.max_age = max_age
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        for d in ['objects', 'refs', 'routers']:
+            os.makedirs(os.path.join(path, d), exist_ok=True)
+
+    def key(self, digests, physical_interfaces=()):
+        """
+            Returns the key for the router parsed from replies with the given digests
+            and the given physical interfaces, in any order.
+        """
+        sha = hashlib.sha256('juniper_conf {}'.format(CACHE_VERSION).encode('utf-8'))
+        for digest in digests:
+            sha.update(b'\0' if digest is None else digest.encode('ascii'))
+        for name in sorted(name or '' for name in physical_interfaces):
+            sha.update(b'\1' + name.encode('utf-8'))
+        return sha.hexdigest()
+
+    def digest(self, reply):
+        sha = hashlib.sha256()
+        for chunk in reply.chunks():
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def store_replies(self, host, commands, replies):
+        """
+            Stores the replies to commands from host.
+            Returns the digests of the replies, None for missing ones.
+        """
+        refs = {}
+        digests = []
+        for command, reply in zip(commands, replies):
+            if reply is None:
+                digests.append(None)
+                continue
+            digest = self.digest(reply)
+            digests.append(digest)
+            path = self._path('objects', digest + '.xml')
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                self._write(path, reply.chunks())
+            refs[command] = digest
+        self._write(self._path('refs', host + '.json'), [json.dumps(refs, indent=4).encode('utf-8')])
+        return digests
+
+    def reply(self, host, command):
+        """
+            Returns the latest cached reply to command from host as an XmlReply or None.
+        """
+        try:
+            with open(self._path('refs', host + '.json')) as f:
+                digest = json.load(f).get(command)
+            with open(self._path('objects', '{}.xml'.format(digest)), 'rb') as f:
+                return XmlReply(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def router(self, key):
+        """
+            Returns a CachedRouter for key or None, counting hits and misses.
+        """
+        path = self._path('routers', key + '.json')
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            os.utime(path)
+        except (IOError, ValueError):
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return CachedRouter(cached['name'], cached['router'])
+
+    def store_router(self, key, router):
+        data = {'name': router.name, 'router': router.to_json()}
+        self._write(self._path('routers', key + '.json'), [json.dumps(data).encode('utf-8')])
+
+    def evict(self):
+        """
+            Removes entries unused for more than max_age days, then the least
+            recently used ones until the cache fits in max_size bytes.
+        """
+        entries = []
+        for d in ['objects', 'refs', 'routers']:
+            for name in os.listdir(os.path.join(self.path, d)):
+                path = self._path(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for mtime, size, path in entries)
+        oldest = time.time() - self.max_age * 86400 if self.max_age is not None else None
+        for mtime, size, path in entries:
+            too_old = oldest is not None and mtime < oldest
+            too_big = self.max_size is not None and total > self.max_size
+            if not (too_old or too_big):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evicted += 1
+
+    def summary(self):
+        return 'Cache: {} hits, {} misses, {} evicted.'.format(self.hits, self.misses, self.evicted)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _path(self, d, name):
+        return os.path.join(self.path, d, name.replace('/', '_'))
+
+    def _write(self, path, chunks):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except IOError as e:
+            logger.error("I/O error: {}".format(e))
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Stand-in for "ssh user@router" in the RemoteSource tests.
+
+Asks for a password, then answers "| display xml" commands with canned
+rpc-reply output until it reads exit. Every login is appended to the file
+given as first argument.
+"""
+import os
+import sys
+
+PARSERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parsers')
+
+VERSION = '''<rpc-reply xmlns:junos="http://xml.juniper.net/junos/12.3R6/junos">
+    <software-information>
+        <host-name>se-test-re0</host-name>
+        <product-model>mx480</product-model>
+        <junos-version>12.3R6.6</junos-version>
+    </software-information>
+</rpc-reply>'''
+
+INTERFACES = '''<rpc-reply xmlns:junos="http://xml.juniper.net/junos/12.3R6/junos">
+    <interface-information>
+        <physical-interfaces><name>xe-0/0/0</name></physical-interfaces>
+        <physical-interfaces><name>xe-0/0/3</name></physical-interfaces>
+    </interface-information>
+</rpc-reply>'''
+
+
+def read(name):
+    with open(os.path.join(PARSERS, name)) as f:
+        return f.read().strip()
+
+
+REPLIES = {
+    'show version | display xml | no-more': lambda: VERSION,
+    'show configuration | display xml | no-more': lambda: read('test_show_config.xml'),
+    'show interfaces | display xml | no-more': lambda: INTERFACES,
+    'show chassis hardware | display xml | no-more': lambda: read('chassis-test.xml'),
+}
+
+
+def main():
+    with open(sys.argv[1], 'a') as log:
+        log.write('login\n')
+    sys.stdout.write('Password:')
+    sys.stdout.flush()
+    sys.stdin.readline()
+    sys.stdout.write('--- JUNOS 12.3R6.6 built 2014-03-13 06:59:23 UTC\n')
+    while True:
+        sys.stdout.write('\n{master}\nuser@se-test-re0> ')
+        sys.stdout.flush()
+        command = sys.stdin.readline().strip()
+        if not command or command == 'exit':
+            break
+        reply = REPLIES.get(command)
+        if reply:
+            sys.stdout.write(reply() + '\n')
+        else:
+            sys.stdout.write('error: unknown command: {}\n'.format(command))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,6 @@
+import time
+from .reply import XmlReply
+from nerds_utils import metrics
 try:
     from util import logger
     import pexpect
@@ -10,75 +13,154 @@ except ImportError:
 
 
 class RemoteSource:
-    def __init__(self, host, username, password):
+    def __init__(self, host, username, password, stream=False, reuse_session=False):
         self.host = host
         self.username = username
         self.password = password
+        # Hand out file objects for ElementStream instead of xml.dom documents
+        self.stream = stream
+        # Run all commands of send_commands in one SSH session
+        self.reuse_session = reuse_session
+        # Time (as in time.time) after which no more waiting on the host is done
+        self.deadline = None
 
     def send_command(self, command):
+        return self.parse_reply(self.fetch(command))
+
+    def send_commands(self, commands):
+        """
+            Like send_command for several commands, returns a list of replies.
+
+            With reuse_session all commands run in a single SSH session.
+        """
+        if self.reuse_session:
+            replies = self.fetch_all(commands)
+        else:
+            replies = [self.fetch(command) for command in commands]
+        return [self.parse_reply(xml) for xml in replies]
+
+    def fetch(self, command):
+        """
+            Runs command on the remote host and returns the XML reply as an XmlReply.
+        """
+        return self.fetch_all([command])[0]
+
+    def fetch_all(self, commands):
+        """
+            Logs in once and runs the commands back to back. Returns the XML replies
+            as XmlReply objects, None for commands that did not complete.
+        """
+        replies = []
         if importError:
-            return None
+            return [None for command in commands]
+        try:
+            ssh = self._login()
+            if ssh:
+                for command in commands:
+                    replies.append(self._run(ssh, command))
+                ssh.sendline('exit')
+        except pexpect.ExceptionPexpect as e:
+            logger.error('[{}] unable to send command - error: {}'.format(self.host, e))
+        return replies + [None for command in commands[len(replies):]]
+
+    def ssh_command(self):
+        return 'ssh -o ConnectTimeout=10 {user}@{host}'.format(user=self.username, host=self.host)
+
+    def _login(self):
         ssh_newkey = 'Are you sure you want to continue connecting'
         login_choices = [ssh_newkey, 'Password:', 'password:', pexpect.EOF, "--- JUNOS", "Ubuntu"]
 
-        try:
-            ssh_cmd = 'ssh -o ConnectTimeout=10 {user}@{host}'.format(user=self.username, host=self.host)
-            ssh = pexpect.spawn(ssh_cmd)
-            i = ssh.expect(login_choices, timeout=12)
+        with metrics.timer('ssh.login'):
+            ssh = pexpect.spawn(self.ssh_command())
+            i = ssh.expect(login_choices, timeout=self._timeout(12))
             if i == 0:
                 ssh.sendline('yes')
                 # Try again :)
-                i = ssh.expect(login_choices)
-            if i == 1 or i == 2:
-                ssh.sendline(self.password)
-            elif i == 3:
-                logger.error("[%s] I either got key problems or connection timeout." % self.host)
-                return None
-            ssh.expect('>', timeout=60)
-            # Ready to send cmd
-            ssh.sendline(command)
-            ssh.expect('</rpc-reply>', timeout=600)   # expect end of the XML
-
-            xml = ssh.before  # take everything printed before last expect()
-            ssh.sendline('exit')
-        except pexpect.ExceptionPexpect as e:
-            logger.error('[{}] unable to send command - error: {}'.format(self.host, e))
+                i = ssh.expect(login_choices, timeout=self._timeout(30))
+        if i == 1 or i == 2:
+            ssh.sendline(self.password)
+        elif i == 3:
+            logger.error("[%s] I either got key problems or connection timeout." % self.host)
             return None
+        return ssh
+
+    @metrics.timed('ssh.command')
+    def _run(self, ssh, command):
+        # Wait for the prompt, after login or after the previous reply
+        ssh.expect('>', timeout=self._timeout(60))
+        # Ready to send cmd
+        ssh.sendline(command)
+        ssh.expect('</rpc-reply>', timeout=self._timeout(600))   # expect end of the XML
+        metrics.count('ssh.bytes', len(ssh.before))
 
-        xml = xml.decode('utf-8') + '</rpc-reply>'  # Add the end element as pexpect steals it
-        # Remove the first line in the output which is the command sent
-        # to JunOS.
+        # Everything printed before the end of the XML, which pexpect consumes.
+        # The command echo is looked up once and the reply is a view into the
+        # received bytes, so large configurations are not copied again.
+        return XmlReply.from_command_output(ssh.before, command, b'</rpc-reply>')
 
-        # Remove everything before command
-        xml = self._strip_before(xml, command)
+    def parse_reply(self, xml):
+        """
+            Parses a reply from fetch into what send_command returns.
+        """
+        if xml is None:
+            return None
+        if self.stream:
+            return xml.open()
         try:
-            xmldoc = minidom.parseString(xml)
+            with metrics.timer('juniper_conf.parse_xml'):
+                xmldoc = minidom.parse(xml.open())
         except ExpatError:
             logger.error('Malformed XML input from %s.' % self.host)
-            print(xml)
+            print(xml.decode())
             return None
         return xmldoc
 
-    def _strip_before(self, target, what):
-        out = ""
-        match = False
-        for line in target.splitlines(True):
-            if what in line:
-                match = True
-            elif match:
-                out += line
-        return out
+    def _timeout(self, seconds):
+        """
+            Returns seconds, shortened to what is left until the deadline.
+        """
+        if self.deadline is None:
+            return seconds
+        left = self.deadline - time.time()
+        if left <= 0:
+            raise pexpect.TIMEOUT('Host timeout reached.')
+        return min(seconds, left)
 
 
 class JunosRemoteSource(RemoteSource):
+    SHOW_VERSION = "show version | display xml | no-more"
+    SHOW_CONFIGURATION = "show configuration | display xml | no-more"
+    SHOW_INTERFACES = "show interfaces | display xml | no-more"
+    SHOW_HARDWARE = "show chassis hardware | display xml | no-more"
+    SHOW_ALL = [SHOW_VERSION, SHOW_CONFIGURATION, SHOW_INTERFACES, SHOW_HARDWARE]
+
+    def show_all(self):
+        """
+            Returns the version, configuration, interfaces and hardware replies.
+        """
+        return [self.parse_reply(xml) for xml in self.fetch_show_all()]
+
+    def fetch_show_all(self):
+        """
+            Returns the raw replies of show_all. Without reuse_session nothing
+            more is fetched once the configuration could not be.
+        """
+        if self.reuse_session:
+            return self.fetch_all(self.SHOW_ALL)
+        version = self.fetch(self.SHOW_VERSION)
+        configuration = self.fetch(self.SHOW_CONFIGURATION)
+        if configuration is None:
+            return [version, None, None, None]
+        return [version, configuration, self.fetch(self.SHOW_INTERFACES), self.fetch(self.SHOW_HARDWARE)]
+
     def show_configuration(self):
-        return self.send_command("show configuration | display xml | no-more")
+        return self.send_command(self.SHOW_CONFIGURATION)
 
     def show_interfaces(self):
-        return self.send_command("show interfaces | display xml | no-more")
+        return self.send_command(self.SHOW_INTERFACES)
 
     def show_hardware(self):
-        return self.send_command("show chassis hardware | display xml | no-more")
+        return self.send_command(self.SHOW_HARDWARE)
 
     def show_version(self):
-        return self.send_command("show version | display xml | no-more")
+        return self.send_command(self.SHOW_VERSION)
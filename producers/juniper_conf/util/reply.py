@@ -0,0 +1,65 @@
+import io
+
+
+class XmlReply:
+    """
+        Raw reply to a remote command, kept as a view into the bytes received.
+
+        The reply is the part of data from start on followed by tail, the end
+        tag pexpect consumed while waiting for it. Nothing is copied: open()
+        hands out readers over the view, and chunks() the pieces for hashing
+        or writing to disk.
+    """
+    def __init__(self, data, start=0, tail=b''):
+        self.view = memoryview(data)[start:]
+        self.tail = tail
+
+    @classmethod
+    def from_command_output(cls, data, command, tail=b''):
+        """
+            Returns the reply in data, the output of command, without the echoed
+            command line and everything printed before it. The reply is empty if
+            the command was not echoed.
+        """
+        echo = data.find(command.encode('utf-8'))
+        if echo < 0:
+            return cls(b'')
+        eol = data.find(b'\n', echo)
+        if eol < 0:
+            return cls(b'')
+        return cls(data, eol + 1, tail)
+
+    def __len__(self):
+        return len(self.view) + len(self.tail)
+
+    def chunks(self):
+        return [self.view, self.tail]
+
+    def open(self):
+        """
+            Returns a new binary file object reading the reply from the start.
+        """
+        return io.BufferedReader(_ReplyReader(self.chunks()))
+
+    def decode(self, encoding='utf-8'):
+        return b''.join(self.chunks()).decode(encoding)
+
+
+class _ReplyReader(io.RawIOBase):
+    def __init__(self, chunks):
+        self.chunks = [c for c in chunks if len(c)]
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks[0]
+        n = min(len(b), len(chunk))
+        b[:n] = chunk[:n]
+        if n < len(chunk):
+            self.chunks[0] = chunk[n:]
+        else:
+            self.chunks.pop(0)
+        return n
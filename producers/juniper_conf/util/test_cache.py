@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import juniper_conf
+from .cache import XmlCache
+from .reply import XmlReply
+from .test_remote_source import FakeJunosRemoteSource
+
+
+class InterfacesSource(FakeJunosRemoteSource):
+    """
+        Adds what is in after to every physical interface of the interfaces reply.
+    """
+    after = ''
+
+    def fetch_show_all(self):
+        replies = super().fetch_show_all()
+        xml = replies[2].decode().replace('</name></physical-interfaces>',
+                                          '</name>{}</physical-interfaces>'.format(self.after))
+        replies[2] = XmlReply(xml.encode('utf-8'))
+        return replies
+
+
+class XmlCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log = os.path.join(self.dir, 'logins')
+        self.cache = XmlCache(os.path.join(self.dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def collect(self, cache):
+        source = FakeJunosRemoteSource(self.log, reuse_session=True)
+        return juniper_conf.collect_remote(source, 'se-test', cache=cache)
+
+    def test_hit(self):
+        router = self.collect(self.cache)
+        self.assertFalse(getattr(router, 'cached', False))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        cached = self.collect(self.cache)
+        self.assertTrue(cached.cached)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(cached.name, router.name)
+        self.assertEqual(cached.to_json(), router.to_json())
+
+    def test_replies(self):
+        self.collect(self.cache)
+        xml = self.cache.reply('se-test', FakeJunosRemoteSource.SHOW_VERSION)
+        self.assertIn('<junos-version>12.3R6.6</junos-version>', xml.decode())
+        self.assertIsNone(self.cache.reply('se-other', FakeJunosRemoteSource.SHOW_VERSION))
+
+    def test_changed_reply(self):
+        def key(*replies):
+            replies = [XmlReply(r) if r is not None else None for r in replies]
+            return self.cache.key(self.cache.store_replies('se-test', ['a', 'b'], replies))
+        self.assertNotEqual(key(b'<a/>', None), key(b'<a/>', b'<b/>'))
+        self.assertEqual(key(b'<a/>', None), key(b'<a/>', None))
+
+    def test_interface_counters(self):
+        def collect(after):
+            source = InterfacesSource(self.log, reuse_session=True)
+            source.after = after
+            return juniper_conf.collect_remote(source, 'se-test', cache=self.cache)
+        collect('<traffic-statistics><input-bps>100</input-bps></traffic-statistics>')
+        objects = sorted(os.listdir(os.path.join(self.cache.path, 'objects')))
+        cached = collect('<traffic-statistics><input-bps>2000</input-bps></traffic-statistics>'
+                         '<interface-flapped>2016-01-01 00:00:00 UTC</interface-flapped>')
+        self.assertTrue(cached.cached)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.cache.path, 'objects'))), objects)
+        # A new physical interface is a new router
+        added = collect('</physical-interfaces><physical-interfaces><name>xe-0/0/1</name>')
+        self.assertFalse(getattr(added, 'cached', False))
+
+    def test_evict_size(self):
+        self.collect(self.cache)
+        self.cache.max_size = 0
+        self.cache.evict()
+        self.assertGreater(self.cache.evicted, 0)
+        self.assertFalse(getattr(self.collect(self.cache), 'cached', False))
+
+    def test_evict_age(self):
+        self.collect(self.cache)
+        old = time.time() - 3 * 86400
+        for d in ['objects', 'refs', 'routers']:
+            for name in os.listdir(os.path.join(self.cache.path, d)):
+                os.utime(os.path.join(self.cache.path, d, name), (old, old))
+        self.cache.max_age = 7
+        self.cache.evict()
+        self.assertEqual(self.cache.evicted, 0)
+        self.cache.max_age = 2
+        self.cache.evict()
+        self.assertIsNone(self.cache.reply('se-test', FakeJunosRemoteSource.SHOW_VERSION))
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+from .remote_source import JunosRemoteSource
+from parsers import RouterPaser
+
+FAKE_SHELL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_junos_shell.py')
+
+
+class FakeJunosRemoteSource(JunosRemoteSource):
+    def __init__(self, log, **kwargs):
+        super().__init__('se-test', 'user', 'secret', **kwargs)
+        self.log = log
+
+    def ssh_command(self):
+        return '{} {} {}'.format(sys.executable, FAKE_SHELL, self.log)
+
+
+class RemoteSourceTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.log = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.log)
+
+    def logins(self):
+        with open(self.log) as f:
+            return len(f.readlines())
+
+    def test_fetch(self):
+        xml = FakeJunosRemoteSource(self.log).fetch('show version | display xml | no-more').decode()
+        self.assertTrue(xml.strip().startswith('<rpc-reply'))
+        self.assertTrue(xml.strip().endswith('</rpc-reply>'))
+        self.assertIn('<junos-version>12.3R6.6</junos-version>', xml)
+
+    def test_single_session(self):
+        version, configuration, interfaces, hardware = FakeJunosRemoteSource(self.log, reuse_session=True).show_all()
+        self.assertEqual(self.logins(), 1)
+        router = RouterPaser().parse(configuration, version)
+        self.assertEqual(router.name, 'se-test.nordu.net')
+        self.assertEqual(router.model, 'mx480')
+        self.assertEqual(len(interfaces.getElementsByTagName('physical-interfaces')), 2)
+        self.assertEqual(len(hardware.getElementsByTagName('chassis-module')), 4)
+
+    def test_session_per_command(self):
+        replies = FakeJunosRemoteSource(self.log).show_all()
+        self.assertEqual(self.logins(), 4)
+        self.assertTrue(all(replies))
+
+    def test_same_replies(self):
+        source = FakeJunosRemoteSource(self.log)
+        commands = ['show version | display xml | no-more', 'show configuration | display xml | no-more']
+        shared = source.fetch_all(commands)
+        self.assertEqual([r.decode() for r in shared], [source.fetch(c).decode() for c in commands])
+
+    def test_stream(self):
+        version, configuration, interfaces, hardware = FakeJunosRemoteSource(
+            self.log, reuse_session=True, stream=True).show_all()
+        router = RouterPaser().parse_stream(configuration, version)
+        self.assertEqual(router.name, 'se-test.nordu.net')
+        self.assertEqual(router.version, '12.3R6.6')
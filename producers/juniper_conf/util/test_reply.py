@@ -0,0 +1,35 @@
+import unittest
+from xml.dom import minidom
+from .reply import XmlReply
+
+COMMAND = 'show version | display xml | no-more'
+OUTPUT = (
+    b'--- JUNOS 12.3R6.6\r\n{master}\r\nuser@se-test-re0> ' + COMMAND.encode('utf-8') + b'\r\n'
+    b'<rpc-reply>\r\n<software-information><host-name>se-test-re0</host-name></software-information>\r\n'
+)
+
+
+class XmlReplyTest(unittest.TestCase):
+    def test_strip_command(self):
+        reply = XmlReply.from_command_output(OUTPUT, COMMAND, b'</rpc-reply>')
+        self.assertTrue(reply.decode().startswith('<rpc-reply>'))
+        self.assertTrue(reply.decode().endswith('</software-information>\r\n</rpc-reply>'))
+        self.assertEqual(len(reply), len(reply.decode()))
+
+    def test_no_echo(self):
+        reply = XmlReply.from_command_output(OUTPUT, 'show interfaces', b'</rpc-reply>')
+        self.assertEqual(len(reply), 0)
+        self.assertEqual(reply.open().read(), b'')
+
+    def test_view(self):
+        data = bytearray(OUTPUT)
+        reply = XmlReply.from_command_output(data, COMMAND)
+        data[-3:-2] = b'X'
+        self.assertIn('X', reply.decode())
+
+    def test_read(self):
+        reply = XmlReply.from_command_output(OUTPUT, COMMAND, b'</rpc-reply>')
+        f = reply.open()
+        self.assertEqual(b''.join(iter(lambda: f.read(7), b'')).decode(), reply.decode())
+        doc = minidom.parse(reply.open())
+        self.assertEqual(doc.getElementsByTagName('host-name')[0].firstChild.data, 'se-test-re0')
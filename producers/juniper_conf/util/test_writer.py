@@ -0,0 +1,44 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from .writer import JsonWriter
+from nerds_utils.encoders import get_encoder
+from models import Router
+
+
+class JsonWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.router = Router()
+        self.router.name = 'R1.example.net'
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(os.path.join(self.dir, 'r1.example.net.json')) as f:
+            return f.read()
+
+    def test_default_pretty(self):
+        JsonWriter(out_dir=self.dir).write(self.router)
+        expected = {'host': {'name': 'r1.example.net', 'version': 1, 'juniper_conf': self.router.to_json()}}
+        self.assertEqual(self.read(), json.dumps(expected, indent=4))
+
+    def test_compact(self):
+        JsonWriter(out_dir=self.dir, encoder=get_encoder(compact=True, sort_keys=False)).write(self.router)
+        out = self.read()
+        self.assertNotIn(' ', out)
+        self.assertEqual(json.loads(out)['host']['juniper_conf']['name'], 'R1.example.net')
+
+    def test_invalid_logged(self):
+        with self.assertLogs('juniper_conf', 'ERROR'):
+            JsonWriter(out_dir=self.dir).write_json(self.router.name, {'name': self.router.name, 'interfaces': []})
+        self.assertEqual(os.listdir(self.dir), ['r1.example.net.json'])
+
+    def test_invalid_dropped(self):
+        writer = JsonWriter(out_dir=self.dir, drop_invalid=True)
+        with self.assertLogs('juniper_conf', 'ERROR'):
+            writer.write_json(self.router.name, {'name': self.router.name, 'interfaces': []})
+        self.assertEqual(os.listdir(self.dir), [])
@@ -1,33 +1,68 @@
-import json
+import logging
 import os
+from nerds_utils.encoders import get_encoder
+from nerds_utils.validate import validate
+from nerds_utils import metrics
+
+logger = logging.getLogger('juniper_conf')
 
 
 class JsonWriter:
-    def __init__(self, dry_run=False, out_dir="json"):
+    def __init__(self, dry_run=False, out_dir="json", encoder=None, validate=True, drop_invalid=False):
         self.dry_run = dry_run
+        # Invalid documents are logged, and only skipped with drop_invalid
+        self.validate = validate
+        self.drop_invalid = drop_invalid
         self.out_dir = out_dir
+        # Function from nerds_utils.encoders, pretty printed stdlib json by default
+        self.encoder = encoder or get_encoder(sort_keys=False)
         if not os.path.exists(out_dir):
             os.makedirs(out_dir)
 
     def write(self, router):
+        self.write_json(router.name, router.to_json())
+
+    def write_json(self, name, router_json):
+        """
+            Writes the JSON of a router, as returned by Router.to_json, named name.
+        """
         template = {
             'host': {
-                'name': router.name.lower(),
+                'name': name.lower(),
                 'version': 1,
-                'juniper_conf': router.to_json()
+                'juniper_conf': router_json
             }
         }
-        out = json.dumps(template, indent=4)
+        errors = validate(template) if self.validate else None
+        if errors:
+            logger.error('Invalid NERDS document for %s%s: %s', name, ' skipped' if self.drop_invalid else '',
+                         '; '.join(errors))
+            if self.drop_invalid:
+                return
+        with metrics.timer('juniper_conf.encode'):
+            out = self.encoder(template)
+        metrics.count('nerds.documents')
+        metrics.count('nerds.bytes', len(out))
         if self.dry_run:
-            print(out)
+            print(out.decode('utf-8'))
         else:
-            self.write_to_file(out, router.name.lower())
+            self.write_to_file(out, name.lower())
 
+    def exists(self, name):
+        """
+            Returns True if output for name has already been written to disk.
+        """
+        return not self.dry_run and os.path.exists(self._path(name))
+
+    @metrics.timed('juniper_conf.write_file')
     def write_to_file(self, out, name):
-        path = os.path.join(self.out_dir, name + ".json")
+        path = self._path(name)
         try:
-            with open(path, 'w') as f:
+            with open(path, 'wb') as f:
                 f.write(out)
         except IOError as e:
             # TODO: logging
             print("I/O error: {}".format(e))
+
+    def _path(self, name):
+        return os.path.join(self.out_dir, name + ".json")
@@ -9,7 +9,8 @@ import json
 import sys
 sys.path.append('../')
 
-from nerds_utils.file import save_to_json
+from nerds_utils.file import NerdsWriter
+from nerds_utils import metrics
 from nerds_utils.nerds import to_nerds
 
 logger = logging.getLogger('checkmk_livestatus')
@@ -87,24 +88,31 @@ def produce(conf, dry_run, out_dir):
 
     url = base_url+'/objects/servicestatus'
     params = {'apikey': api_key}
-    req = requests.get(url, params=params)
-
-    resp = req.json()
+    with metrics.timer('nagiosxi_api.get'):
+        req = requests.get(url, params=params)
+        resp = req.json()
+    metrics.count('nagiosxi_api.bytes', len(req.content))
     raw_services = resp.get("servicestatuslist", {}).get("servicestatus", [])
     services = [only_fields(service) for service in raw_services]
     nerds = nerds_format(services)
-    for nerds_dict in nerds:
-        write_json(nerds_dict, dry_run, out_dir)
+    if dry_run:
+        for nerds_dict in nerds:
+            write_json(nerds_dict, dry_run)
+    else:
+        with NerdsWriter(out_dir) as writer:
+            for nerds_dict in nerds:
+                write_json(nerds_dict, writer=writer)
+        metrics.save(out_dir, 'nagiosxi_api')
 
 
-def write_json(nerds_dict, dry_run=False, out_dir='./json'):
+def write_json(nerds_dict, dry_run=False, writer=None):
     """
-    Outputs nerds dict as json to either a file or std out.
+    Outputs nerds dict as json to either a NerdsWriter or std out.
     """
     if dry_run:
         print(json.dumps(nerds_dict, sort_keys=True, indent=4))
     else:
-        save_to_json(nerds_dict, out_dir)
+        writer.write(nerds_dict)
 
 
 def init_config(path):
@@ -1,2 +1,3 @@
 from .file import *
 from .nerds import *
+from .encoders import *
@@ -0,0 +1,53 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+ENCODERS = ['json', 'orjson', 'ujson']
+
+
+def available_encoders():
+    """
+    Returns the names of the encoders that can be used, the stdlib json first.
+    """
+    modules = {'json': json, 'orjson': orjson, 'ujson': ujson}
+    return [name for name in ENCODERS if modules[name]]
+
+
+def get_encoder(name='json', compact=False, sort_keys=True):
+    """
+    Returns a function encoding a document to JSON bytes.
+
+    name is json, orjson, ujson or auto for the fastest one installed. The
+    default pretty output (indent 4) of json is what the producers always
+    wrote. orjson only indents by 2, so use it compact or accept the diff.
+    compact leaves out all whitespace.
+    """
+    if name == 'auto':
+        name = next(n for n in ['orjson', 'ujson', 'json'] if n in available_encoders())
+    if name not in available_encoders():
+        raise ValueError('JSON encoder {} is not available, use one of {}.'.format(
+            name, ', '.join(available_encoders())))
+
+    if name == 'orjson':
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return lambda doc: orjson.dumps(doc, option=option)
+
+    if name == 'ujson':
+        indent = 0 if compact else 4
+        return lambda doc: ujson.dumps(
+            doc, indent=indent, sort_keys=sort_keys, escape_forward_slashes=False).encode('utf-8')
+
+    if compact:
+        return lambda doc: json.dumps(doc, separators=(',', ':'), sort_keys=sort_keys).encode('utf-8')
+    return lambda doc: json.dumps(doc, indent=4, sort_keys=sort_keys).encode('utf-8')
@@ -1,5 +1,12 @@
 import json
+import logging
 import os
+import stat
+from . import metrics
+from .encoders import get_encoder
+from .validate import validate as validate_nerds
+
+logger = logging.getLogger(__name__)
 
 
 def merge_nerds_file(current, new_nerds):
@@ -19,19 +26,217 @@ def load_nerds_file(file_name):
     return current
 
 
-def save_to_json(nerds, out_dir, merge=merge_nerds_file, sort_keys=True):
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
+class NerdsWriter:
+    """
+    Writes nerds documents to <host name>.json in out_dir, merged with the
+    document already there.
+
+    Files are written to a temporary file first and moved into place with
+    os.replace, so a crash never leaves a truncated document behind. New files
+    get the mode open() would give them, replaced files keep theirs. fsync
+    controls durability against power loss:
+
+        None      no fsync
+        'file'    fsync every file before it replaces the old one
+        'batch'   keep the files of the run aside and fsync and move them all
+                  in flush(), with a single fsync of the directory
+
+    With merge None existing files are replaced instead of merged. With
+    validate documents are checked against nerds_utils.validate before they
+    are written, invalid ones are logged and counted in invalid, and skipped
+    only with drop_invalid. Use it as a context manager to flush at the end of
+    a run.
+    """
+    FSYNC_MODES = [None, 'file', 'batch']
+
+    def __init__(self, out_dir, merge=merge_nerds_file, sort_keys=True, encoder=None, fsync=None, validate=True,
+                 drop_invalid=False):
+        if fsync not in self.FSYNC_MODES:
+            raise ValueError('Unknown fsync mode {}'.format(fsync))
+        self.out_dir = out_dir
+        self.merge = merge
+        self.encoder = encoder or get_encoder(sort_keys=sort_keys)
+        self.fsync = fsync
+        self.validate = validate
+        self.drop_invalid = drop_invalid
+        self.invalid = 0
+        # Final path -> temporary file waiting for flush in batch mode
+        self.pending = {}
+        os.makedirs(out_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
 
-    if nerds:
+    def path(self, host):
+        return os.path.join(self.out_dir, "{}.json".format(host.lower()))
+
+    @metrics.timed('nerds.write')
+    def write(self, nerds):
+        """
+        Merges nerds into the file of its host. Documents without a host name are ignored.
+        """
+        if not nerds:
+            return
         host = nerds.get('host', {}).get('name')
-        if host and nerds:
-            file_name = os.path.join(out_dir, "{}.json".format(host.lower()))
-            if os.path.isfile(file_name):
-                # Need to merge
-                current = load_nerds_file(file_name)
-                nerds = merge(current, nerds)
-            with open(file_name, 'w') as f:
-                json.dump(nerds, f, indent=4, sort_keys=sort_keys)
+        if not host or self._invalid(nerds):
+            return
+        file_name = self.path(host)
+        current = self._load(file_name) if self.merge else None
+        if current is not None:
+            # Need to merge
+            nerds = self.merge(current, nerds)
+        self._store(file_name, nerds)
+
+    @metrics.timed('nerds.flush')
+    def flush(self):
+        """
+        Moves the files held back in batch mode into place.
+        """
+        if not self.pending:
+            return
+        for tmp in self.pending.values():
+            with open(tmp, 'rb') as f:
+                os.fsync(f.fileno())
+        for file_name, tmp in self.pending.items():
+            os.replace(tmp, file_name)
+        self.pending = {}
+        self._fsync_dir()
+
+    def _invalid(self, nerds):
+        """
+        Logs and counts what is wrong with nerds, returns True if it is to be skipped.
+        """
+        if not self.validate:
+            return False
+        errors = validate_nerds(nerds)
+        if not errors:
+            return False
+        self.invalid += 1
+        metrics.count('nerds.invalid')
+        logger.error('Invalid NERDS document for %s%s: %s', nerds['host'].get('name'),
+                     ' skipped' if self.drop_invalid else '', '; '.join(errors))
+        return self.drop_invalid
+
+    def _load(self, file_name):
+        """
+        Returns the document the next write to file_name is merged with, None if there is no file.
+        """
+        current_file = self.pending.get(file_name, file_name)
+        if os.path.isfile(current_file):
+            return load_nerds_file(current_file)
+        return None
+
+    def _store(self, file_name, nerds):
+        with metrics.timer('nerds.encode'):
+            data = self.encoder(nerds)
+        metrics.count('nerds.documents')
+        metrics.count('nerds.bytes', len(data))
+        tmp = self._write_tmp(data, file_name)
+        if self.fsync == 'batch':
+            if file_name in self.pending:
+                os.remove(self.pending[file_name])
+            self.pending[file_name] = tmp
         else:
+            os.replace(tmp, file_name)
+
+    def _write_tmp(self, data, file_name):
+        # Keep the mode of the file being replaced, as writing it in place would
+        try:
+            mode = stat.S_IMODE(os.stat(file_name).st_mode)
+        except OSError:
+            mode = None
+        fd, tmp = self._open_tmp(file_name)
+        try:
+            if mode is not None:
+                os.fchmod(fd, mode)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                if self.fsync == 'file':
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return tmp
+
+    def _open_tmp(self, file_name):
+        # Unlike mkstemp, let the kernel apply the umask so new files get the usual mode
+        prefix = os.path.join(self.out_dir, '.' + os.path.basename(file_name))
+        while True:
+            tmp = '{}.{}.tmp'.format(prefix, os.urandom(4).hex())
+            try:
+                return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+            except FileExistsError:
+                continue
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(self.out_dir, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
             pass
+        finally:
+            os.close(fd)
+
+
+class BufferedNerdsWriter(NerdsWriter):
+    """
+    NerdsWriter keeping the documents of a run in memory, keyed by lower case
+    host name, until flush().
+
+    Documents for a host already in the buffer are merged in memory with the
+    same merge function, called just like it would be with the file on disk,
+    so each host file is read and written once per flush. With merge None the
+    last document of a host replaces the others and the file on disk. When more than
+    max_buffered hosts are held the buffer is flushed to disk early.
+    """
+    def __init__(self, out_dir, merge=merge_nerds_file, sort_keys=True, encoder=None, fsync=None,
+                 max_buffered=10000, validate=True, drop_invalid=False):
+        super().__init__(out_dir, merge, sort_keys, encoder, fsync, validate, drop_invalid)
+        self.max_buffered = max_buffered
+        self.buffer = {}
+
+    @metrics.timed('nerds.write')
+    def write(self, nerds):
+        if not nerds:
+            return
+        host = nerds.get('host', {}).get('name')
+        if not host or self._invalid(nerds):
+            return
+        key = host.lower()
+        if key in self.buffer:
+            self.buffer[key] = self.merge(self.buffer[key], nerds) if self.merge else nerds
+            return
+        if len(self.buffer) >= self.max_buffered:
+            self.flush()
+        current = self._load(self.path(key)) if self.merge else None
+        self.buffer[key] = nerds if current is None else self.merge(current, nerds)
+
+    def flush(self):
+        """
+        Writes every buffered host file.
+        """
+        buffer, self.buffer = self.buffer, {}
+        for key, nerds in buffer.items():
+            self._store(self.path(key), nerds)
+        super().flush()
+
+
+@metrics.timed('nerds.save_to_json')
+def save_to_json(nerds, out_dir, merge=merge_nerds_file, sort_keys=True, encoder=None, validate=True,
+                 drop_invalid=False):
+    """
+    Writes nerds to <host name>.json in out_dir, merged with the file already there.
+    Invalid documents are logged, and skipped with drop_invalid.
+
+    encoder is a function from nerds_utils.encoders.get_encoder, by default
+    pretty printed stdlib json. Use a NerdsWriter, or a PackWriter for the
+    packed store of nerds_utils.pack, to write many documents.
+    """
+    NerdsWriter(out_dir, merge, sort_keys, encoder, validate=validate, drop_invalid=drop_invalid).write(nerds)
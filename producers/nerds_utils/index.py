@@ -0,0 +1,218 @@
+"""
+SQLite index of NERDS repositories for consumers.
+
+    python -m nerds_utils.index -D nerds.db /path/to/repo
+    python -m nerds_utils.index -D nerds.db --port 443 --protocol tcp
+
+Every NERDS file is stored with its raw document, and the host names,
+addresses, services and checks found in it go to their own tables. Indexing
+again only reads the files whose mtime or size changed and drops the ones
+that are gone.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from .file import load_nerds_file
+from .merge import discover, nerds_files
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, producer TEXT, host TEXT, mtime INTEGER, size INTEGER, document TEXT);
+CREATE TABLE IF NOT EXISTS addresses (path TEXT, host TEXT, producer TEXT, address TEXT);
+CREATE TABLE IF NOT EXISTS services (
+    path TEXT, host TEXT, producer TEXT, address TEXT, protocol TEXT, port INTEGER, state TEXT, name TEXT,
+    product TEXT);
+CREATE TABLE IF NOT EXISTS checks (path TEXT, host TEXT, producer TEXT, description TEXT, command TEXT);
+CREATE INDEX IF NOT EXISTS files_host ON files (host);
+CREATE INDEX IF NOT EXISTS addresses_address ON addresses (address);
+CREATE INDEX IF NOT EXISTS addresses_path ON addresses (path);
+CREATE INDEX IF NOT EXISTS services_port ON services (port, protocol);
+CREATE INDEX IF NOT EXISTS services_name ON services (name);
+CREATE INDEX IF NOT EXISTS services_path ON services (path);
+CREATE INDEX IF NOT EXISTS checks_description ON checks (description);
+CREATE INDEX IF NOT EXISTS checks_path ON checks (path);
+'''
+
+
+def section_addresses(section):
+    """
+    Addresses of producers listing them like nmap_services_py and nunoc_cosmos
+    do, and the unit addresses of juniper_conf and nso interfaces.
+    """
+    addresses = list(section.get('addresses') or [])
+    for interface in section.get('interfaces') or []:
+        for unit in interface.get('units') or []:
+            addresses.extend(a.split('/')[0] for a in unit.get('address') or [])
+    return addresses
+
+
+def section_services(section):
+    """
+    Yields (address, protocol, port, state, name, product) of nmap_services_py style services.
+    """
+    for address, protocols in (section.get('services') or {}).items():
+        if not isinstance(protocols, dict):
+            continue
+        for protocol, ports in protocols.items():
+            if not isinstance(ports, dict):
+                continue
+            for port, service in ports.items():
+                try:
+                    port = int(port)
+                except ValueError:
+                    continue
+                service = service if isinstance(service, dict) else {}
+                yield address, protocol, port, service.get('state'), service.get('name'), service.get('product')
+
+
+def section_checks(section):
+    """
+    Yields (description, command) of nagiosxi_api style checks.
+    """
+    for check in section.get('checks') or []:
+        if isinstance(check, dict):
+            yield check.get('description'), check.get('check_command')
+
+
+class NerdsIndex:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def index(self, inputs):
+        """
+        Indexes the NERDS files of the input repositories, see nerds_utils.merge.discover.
+        Returns (files indexed, files removed).
+        """
+        known = {path: (mtime, size) for path, mtime, size in self.db.execute('SELECT path, mtime, size FROM files')}
+        seen = set()
+        indexed = 0
+        with self.db:
+            for producer, directory in discover(inputs):
+                for name in nerds_files(directory):
+                    path = os.path.join(directory, name)
+                    seen.add(path)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if known.get(path) == (st.st_mtime_ns, st.st_size):
+                        continue
+                    self._index_file(path, producer, st)
+                    indexed += 1
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                self._remove(path)
+        return indexed, len(removed)
+
+    def _remove(self, path):
+        for table in ['files', 'addresses', 'services', 'checks']:
+            self.db.execute('DELETE FROM {} WHERE path = ?'.format(table), (path,))
+
+    def _index_file(self, path, producer, st):
+        self._remove(path)
+        try:
+            nerds = load_nerds_file(path)
+        except IOError as e:
+            logger.error('Could not read %s: %s', path, e)
+            return
+        host = nerds.get('host') if isinstance(nerds, dict) else None
+        if not isinstance(host, dict) or not host.get('name'):
+            logger.error('No NERDS host in %s, skipped.', path)
+            # Kept without a host so it is not read again until it changes
+            self.db.execute(
+                'INSERT INTO files VALUES (?, ?, NULL, ?, ?, NULL)', (path, producer, st.st_mtime_ns, st.st_size))
+            return
+        name = host['name'].lower()
+        self.db.execute(
+            'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)',
+            (path, producer, name, st.st_mtime_ns, st.st_size, json.dumps(nerds)))
+        for section_name, section in host.items():
+            if not isinstance(section, dict):
+                continue
+            self.db.executemany(
+                'INSERT INTO addresses VALUES (?, ?, ?, ?)',
+                [(path, name, section_name, a) for a in section_addresses(section)])
+            self.db.executemany(
+                'INSERT INTO services VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(path, name, section_name) + s for s in section_services(section)])
+            self.db.executemany(
+                'INSERT INTO checks VALUES (?, ?, ?, ?, ?)',
+                [(path, name, section_name) + c for c in section_checks(section)])
+
+    def hosts(self):
+        return [row[0] for row in self.db.execute('SELECT DISTINCT host FROM files WHERE host IS NOT NULL ORDER BY host')]
+
+    def documents(self, host):
+        """
+        Returns the documents of host, one per producer file.
+        """
+        rows = self.db.execute('SELECT document FROM files WHERE host = ? ORDER BY producer', (host.lower(),))
+        return [json.loads(row[0]) for row in rows]
+
+    def hosts_with_address(self, address):
+        rows = self.db.execute('SELECT DISTINCT host FROM addresses WHERE address = ? ORDER BY host', (address,))
+        return [row[0] for row in rows]
+
+    def hosts_with_service(self, port=None, protocol=None, name=None, state='open'):
+        """
+        Returns the hosts with a service matching all the given arguments.
+        """
+        where, params = [], []
+        for column, value in [('port', port), ('protocol', protocol), ('name', name), ('state', state)]:
+            if value is not None:
+                where.append('{} = ?'.format(column))
+                params.append(value)
+        sql = 'SELECT DISTINCT host FROM services'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return [row[0] for row in self.db.execute(sql + ' ORDER BY host', params)]
+
+    def hosts_with_check(self, description):
+        rows = self.db.execute('SELECT DISTINCT host FROM checks WHERE description = ? ORDER BY host', (description,))
+        return [row[0] for row in rows]
+
+    def query(self, sql, params=()):
+        """
+        Runs any SQL on the index, for questions the helpers do not cover.
+        """
+        return self.db.execute(sql, params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-D', '--database', required=True, help='Path to the SQLite database.')
+    parser.add_argument('--port', type=int, help='List the hosts with a service on this port.')
+    parser.add_argument('--protocol', help='Protocol of the service, tcp or udp.')
+    parser.add_argument('--service', help='List the hosts with a service of this name.')
+    parser.add_argument('--address', help='List the hosts with this address.')
+    parser.add_argument('inputs', nargs='*', help='NERDS repositories or directories of NERDS files to index.')
+    args = parser.parse_args()
+    logging.basicConfig(format='%(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    with NerdsIndex(args.database) as index:
+        if args.inputs:
+            start = time.time()
+            indexed, removed = index.index(args.inputs)
+            logger.info('Indexed %d files, removed %d in %.1f s.', indexed, removed, time.time() - start)
+        if args.port or args.protocol or args.service:
+            print('\n'.join(index.hosts_with_service(args.port, args.protocol, args.service)))
+        if args.address:
+            print('\n'.join(index.hosts_with_address(args.address)))
+
+
+if __name__ == '__main__':
+    main()
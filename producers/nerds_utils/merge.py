@@ -0,0 +1,331 @@
+"""
+Merges the output of all producers into one document per host, like
+merge_nerds.pl.
+
+    python -m nerds_utils.merge -O repo [--policy deep] [--workers 4] [input ...]
+
+Each input is a NERDS repository with producers/<producer>/json/*.json, or a
+directory of NERDS files, by default the output repository itself. Hosts are
+merged in parallel worker processes and written to
+repo/producers/merge_nerds/json/<host>..json as soon as they are done, named
+like merge_nerds.pl names them for the consumers.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .file import NerdsWriter, load_nerds_file, merge_nerds_file
+
+logger = logging.getLogger(__name__)
+
+MERGE_PRODUCER = 'merge_nerds'
+# Inputs and outputs of the last incremental merge, kept in the output directory
+MANIFEST = '.manifest.json'
+MANIFEST_VERSION = 1
+
+
+def merge_deep(current, new):
+    """
+    Deep merge where new takes precedence, like Hash::Merge RIGHT_PRECEDENT in
+    merge_nerds.pl. Dicts are merged recursively and lists concatenated without
+    the items already present.
+    """
+    if current is None:
+        return new
+    if isinstance(current, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            current[key] = merge_deep(current[key], value) if key in current else value
+        return current
+    if isinstance(current, list) and isinstance(new, list):
+        return current + [item for item in new if item not in current]
+    return new
+
+
+MERGE_POLICIES = {
+    'right': merge_nerds_file,
+    'deep': merge_deep,
+}
+
+
+def host_key(file_name):
+    """
+    Returns the host a NERDS file name is for, host.json or host..json as merge_nerds.pl writes.
+    """
+    return file_name[:-len('.json')].rstrip('.').lower()
+
+
+def nerds_files(directory):
+    try:
+        names = os.listdir(directory)
+    except OSError as e:
+        logger.error('Could not list %s: %s', directory, e)
+        return []
+    return sorted(name for name in names if name.endswith('.json') and not name.startswith('.'))
+
+
+def discover(repos, skip=(MERGE_PRODUCER,)):
+    """
+    Returns a list of (producer, json directory) in the order they are merged.
+
+    Producers are taken in name order, skip names producers whose output is
+    not merged. A repo without producers is taken as a directory of NERDS files.
+    """
+    sources = []
+    for repo in repos:
+        producers_dir = os.path.join(repo, 'producers')
+        producers = []
+        if os.path.isdir(producers_dir):
+            producers = sorted(p for p in os.listdir(producers_dir) if not p.startswith('.') and p not in skip)
+        if not producers:
+            sources.append((None, repo))
+            continue
+        for producer in producers:
+            json_dir = os.path.join(producers_dir, producer, 'json')
+            if os.path.isdir(json_dir):
+                sources.append((producer, json_dir))
+    return sources
+
+
+def group_by_host(sources):
+    """
+    Returns {host: [(producer, path), ...]} of the NERDS files in sources, in merge order.
+    """
+    hosts = {}
+    for producer, directory in sources:
+        for name in nerds_files(directory):
+            hosts.setdefault(host_key(name), []).append((producer, os.path.join(directory, name)))
+    return hosts
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def merge_files(paths, policy='right'):
+    """
+    Loads and merges the files of one host, returns {lower case host name: document}.
+
+    Files normally agree on the host name, the result is keyed by it all the
+    same so that files named after another host are not merged into the wrong one.
+    Host names differing only in case are one host, as they are one output file.
+    """
+    merge = MERGE_POLICIES[policy]
+    merged = {}
+    for path in paths:
+        try:
+            nerds = load_nerds_file(path)
+        except IOError as e:
+            logger.error('Could not read %s: %s', path, e)
+            continue
+        if not isinstance(nerds, dict) or not isinstance(nerds.get('host'), dict) or not nerds['host'].get('name'):
+            logger.error('No NERDS host in %s, skipped.', path)
+            continue
+        host = nerds['host']['name'].lower()
+        version = nerds['host'].get('version')
+        if version != 1:
+            logger.error('Can\'t interpret NERDS data of version %s in %s, skipped.', version, path)
+            continue
+        merged[host] = merge(merged[host], nerds) if host in merged else nerds
+    return merged
+
+
+def merge_groups(groups, policy='right', digests=False):
+    """
+    merge_files for a batch of hosts, so that workers get enough work per task.
+    Returns (merged, digests of the files or None) for each host.
+    """
+    return [
+        (merge_files(paths, policy), [file_digest(path) for path in paths] if digests else None)
+        for paths in groups
+    ]
+
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def merge_hosts(hosts, writer, policy='right', workers=1, batch_size=64, digests=False):
+    """
+    Merges {host: [(producer, path), ...]} and writes every merged document with
+    writer as soon as its batch is done.
+
+    Returns {host: (names of the documents written, digests of the files)},
+    digests are only computed when asked for.
+    """
+    keys = sorted(hosts)
+    groups = [[path for producer, path in hosts[key]] for key in keys]
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(merge_groups, batches(groups, batch_size), repeat(policy), repeat(digests))
+    else:
+        executor = None
+        results = (merge_groups(batch, policy, digests) for batch in batches(groups, batch_size))
+    done = {}
+    try:
+        for batch in results:
+            for merged, host_digests in batch:
+                for nerds in merged.values():
+                    writer.write(nerds)
+                done[keys[len(done)]] = (list(merged), host_digests)
+    finally:
+        if executor:
+            executor.shutdown()
+    return done
+
+
+class MergeWriter(NerdsWriter):
+    """
+    NerdsWriter naming files <host>..json like merge_nerds.pl, the name
+    consumers such as nerds2nagios.pl look for.
+    """
+    def path(self, host):
+        return os.path.join(self.out_dir, '{}..json'.format(host.lower()))
+
+
+def output_dir(repo):
+    return os.path.join(repo, 'producers', MERGE_PRODUCER, 'json')
+
+
+def merge(inputs, out_dir, policy='right', workers=1, encoder=None):
+    """
+    Merges the producers of the input repositories into out_dir, returns the
+    number of hosts written.
+    """
+    start = time.time()
+    hosts = group_by_host(discover(inputs))
+    logger.info('Merging %d files for %d hosts.', sum(len(p) for p in hosts.values()), len(hosts))
+    with MergeWriter(out_dir, merge=None, encoder=encoder, validate=False) as writer:
+        written = sum(len(names) for names, digests in merge_hosts(hosts, writer, policy, workers).values())
+    logger.info('Wrote %d hosts in %.1f s.', written, time.time() - start)
+    return written
+
+
+def file_stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_manifest(out_dir, policy):
+    """
+    Returns the hosts of the manifest in out_dir, {} if there is none or it was
+    written for another merge policy.
+    """
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('policy') != policy:
+        return {}
+    return manifest['hosts']
+
+
+def save_manifest(out_dir, policy, hosts):
+    path = os.path.join(out_dir, MANIFEST)
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix='.manifest', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'policy': policy, 'hosts': hosts}, f)
+    os.replace(tmp, path)
+
+
+def unchanged(entry, stats, inputs):
+    """
+    Returns True if the inputs of a host are the ones recorded in its manifest entry.
+    Inputs with a new mtime or size are compared by content, and entry is
+    updated with their new stats when the content is the same.
+    """
+    recorded = entry['inputs']
+    if [[producer, path] for producer, path, mtime, size, digest in recorded] != inputs:
+        return False
+    for i, (producer, path, mtime, size, digest) in enumerate(recorded):
+        if (mtime, size) == stats[i]:
+            continue
+        if size != stats[i][1] or file_digest(path) != digest:
+            return False
+        recorded[i] = [producer, path, stats[i][0], size, digest]
+    return True
+
+
+def remove_outputs(writer, names):
+    for name in names:
+        try:
+            os.remove(writer.path(name))
+        except OSError:
+            pass
+
+
+def merge_incremental(inputs, out_dir, policy='right', workers=1, encoder=None):
+    """
+    Like merge, but only merges the hosts whose input files changed since the
+    last run according to the manifest kept in out_dir, and removes the output
+    of hosts whose inputs are gone. Returns the number of hosts merged.
+    """
+    start = time.time()
+    writer = MergeWriter(out_dir, merge=None, encoder=encoder, validate=False)
+    manifest = load_manifest(out_dir, policy)
+    hosts = group_by_host(discover(inputs))
+    changed = {}
+    stats = {}
+    for key, host_inputs in hosts.items():
+        try:
+            stats[key] = [file_stat(path) for producer, path in host_inputs]
+        except OSError as e:
+            logger.error('Could not stat input of %s: %s', key, e)
+            changed[key] = host_inputs
+            continue
+        entry = manifest.get(key)
+        if not entry or not unchanged(entry, stats[key], [list(i) for i in host_inputs]) or not all(
+                os.path.exists(writer.path(name)) for name in entry['outputs']):
+            changed[key] = host_inputs
+    logger.info('%d of %d hosts changed.', len(changed), len(hosts))
+
+    with writer:
+        for key in set(manifest) - set(hosts):
+            remove_outputs(writer, manifest.pop(key)['outputs'])
+        done = merge_hosts(changed, writer, policy, workers, digests=True)
+        for key, (names, digests) in done.items():
+            old = manifest.get(key, {}).get('outputs', [])
+            remove_outputs(writer, set(n.lower() for n in old) - set(n.lower() for n in names))
+            if key not in stats:
+                # Could not stat the inputs, merge them again next run
+                manifest.pop(key, None)
+                continue
+            manifest[key] = {
+                'inputs': [
+                    [producer, path, mtime, size, digest]
+                    for (producer, path), (mtime, size), digest in zip(hosts[key], stats[key], digests)
+                ],
+                'outputs': names,
+            }
+    save_manifest(out_dir, policy, manifest)
+    logger.info('Merged %d hosts in %.1f s.', len(done), time.time() - start)
+    return len(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-O', '--output-dir', required=True, help='NERDS repository to write merge_nerds output in.')
+    parser.add_argument('--policy', choices=sorted(MERGE_POLICIES), default='right',
+                        help='right replaces each producer section, deep merges them recursively.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of worker processes.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only merge hosts whose inputs changed since the last incremental merge.')
+    parser.add_argument('inputs', nargs='*', help='NERDS repositories or directories of NERDS files.')
+    args = parser.parse_args()
+    logging.basicConfig(format='%(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    run = merge_incremental if args.incremental else merge
+    run(args.inputs or [args.output_dir], output_dir(args.output_dir), args.policy, args.workers)
+
+
+if __name__ == '__main__':
+    main()
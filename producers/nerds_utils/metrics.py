@@ -0,0 +1,153 @@
+"""
+Timers, counters and peak memory of a producer run.
+
+    from nerds_utils import metrics
+
+    with metrics.timer('ssh.command'):
+        reply = fetch()
+    metrics.count('ssh.bytes', len(reply))
+    ...
+    metrics.save(out_dir, 'my_producer')
+
+save writes metrics.json next to the output directory, e.g.
+producers/my_producer/metrics.json for producers/my_producer/json:
+
+    {
+        "producer": "my_producer",
+        "started": "2018-01-01T00:00:00Z",
+        "seconds": 12.3,            wall clock time since the run started
+        "cpu_seconds": 4.5,
+        "peak_rss_kb": 81234,       of the producer process
+        "children_peak_rss_kb": 0,  of the largest child process waited for
+        "timers": {"ssh.command": {"count": 4, "seconds": 9.1, "max_seconds": 6.2, "rss_growth_kb": 30120}},
+        "counters": {"ssh.bytes": 31337}
+    }
+
+rss_growth_kb is how much the peak RSS of the process grew while the timer
+ran, so the phase that drives the peak stands out. Worker processes keep
+their own metrics, which are not included.
+"""
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+from functools import wraps
+
+METRICS_FILE = 'metrics.json'
+
+
+def peak_rss_kb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss
+
+
+class Timer:
+    __slots__ = ('metrics', 'name', 'start', 'rss')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.rss = peak_rss_kb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start, peak_rss_kb() - self.rss)
+
+
+class Metrics:
+    """
+    Metrics of one run, safe to update from several threads.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.start = time.perf_counter()
+            self.timers = {}
+            self.counters = {}
+
+    def timer(self, name):
+        """
+        Context manager adding the time spent in it to the timer name.
+        """
+        return Timer(self, name)
+
+    def timed(self, name):
+        """
+        Decorator timing every call of a function with the timer name.
+        """
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with Timer(self, name):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_time(self, name, seconds, rss_growth_kb=0):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds, rss_growth_kb]
+                return
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+            timer[3] += rss_growth_kb
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_json(self, producer=None):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        with self.lock:
+            return {
+                'producer': producer,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started)),
+                'seconds': round(time.perf_counter() - self.start, 3),
+                'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+                'peak_rss_kb': usage.ru_maxrss,
+                'children_peak_rss_kb': peak_rss_kb(resource.RUSAGE_CHILDREN),
+                'timers': {
+                    name: {
+                        'count': count,
+                        'seconds': round(seconds, 6),
+                        'max_seconds': round(max_seconds, 6),
+                        'rss_growth_kb': rss_growth_kb,
+                    } for name, (count, seconds, max_seconds, rss_growth_kb) in sorted(self.timers.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def save(self, out_dir, producer=None):
+        """
+        Writes the metrics to metrics.json in the parent of out_dir, returns its path.
+        """
+        directory = os.path.dirname(os.path.abspath(out_dir))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, METRICS_FILE)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + METRICS_FILE, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.to_json(producer), f, indent=4)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+        return path
+
+
+# Metrics of the running producer
+metrics = Metrics()
+timer = metrics.timer
+timed = metrics.timed
+count = metrics.count
+save = metrics.save
+reset = metrics.reset
+to_json = metrics.to_json
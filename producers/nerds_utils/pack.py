@@ -0,0 +1,293 @@
+"""
+Packed NERDS store, all hosts of a producer in one file instead of one file per host.
+
+    <dir>/nerds.jsonl   a header line with the generation of the file, then
+                        one compact JSON document per line, appended to
+    <dir>/nerds.idx     host name -> offset and length of its latest document
+
+Updating a host appends a new document and points the index at it, so the
+data file only grows until it is repacked. A reader memory maps the data file
+and fetches a host without scanning. The index records the generation of the
+data file it was written for, an index found with another data file, e.g.
+after a crash halfway through a repack, is ignored and the data file scanned
+instead. Convert to and from the directory layout with
+
+    python -m nerds_utils.pack pack json/ packed/
+    python -m nerds_utils.pack unpack packed/ json/
+"""
+import argparse
+import json
+import mmap
+import os
+import tempfile
+from . import metrics
+from .encoders import get_encoder
+from .file import NerdsWriter, load_nerds_file, merge_nerds_file
+
+DATA_FILE = 'nerds.jsonl'
+INDEX_FILE = 'nerds.idx'
+INDEX_VERSION = 2
+
+
+def read_generation(data):
+    """
+    Returns the generation in the header line of data, bytes or mmap, None without one.
+    """
+    end = data.find(b'\n')
+    try:
+        return json.loads(data[:end])['generation'] if end > 0 else None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def read_index(pack_dir, data):
+    """
+    Returns (size of data covered by the index, {host: [offset, length]}),
+    (0, {}) when the index is missing or was not written for data.
+    """
+    try:
+        with open(os.path.join(pack_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+    except (IOError, ValueError):
+        return 0, {}
+    if index.get('version') != INDEX_VERSION or index.get('generation') != read_generation(data):
+        return 0, {}
+    if index['size'] > len(data):
+        return 0, {}
+    return index['size'], index['hosts']
+
+
+def scan(data, start, hosts):
+    """
+    Indexes the complete documents in data, bytes or mmap, from start on.
+    Returns the end of the last complete document.
+    """
+    offset = start
+    while True:
+        end = data.find(b'\n', offset)
+        if end < 0:
+            return offset
+        try:
+            host = json.loads(data[offset:end])['host']['name'].lower()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            host = None
+        if host:
+            hosts[host] = [offset, end - offset]
+        offset = end + 1
+
+
+class PackWriter:
+    """
+    NerdsWriter counterpart for a packed store in pack_dir, same merge semantics.
+
+    Documents are appended as they are written, the index is saved by flush().
+    Documents appended after the last flush, e.g. before a crash, are indexed
+    again when the store is opened and a partly written one is cut off.
+    Invalid documents are logged, and skipped with drop_invalid, like NerdsWriter does.
+    """
+    _invalid = NerdsWriter._invalid
+
+    def __init__(self, pack_dir, merge=merge_nerds_file, sort_keys=True, encoder=None, fsync=False, validate=True,
+                 drop_invalid=False):
+        self.pack_dir = pack_dir
+        self.merge = merge
+        # Documents have to fit on one line
+        self.encoder = encoder or get_encoder(compact=True, sort_keys=sort_keys)
+        self.fsync = fsync
+        self.validate = validate
+        self.drop_invalid = drop_invalid
+        self.invalid = 0
+        os.makedirs(pack_dir, exist_ok=True)
+        self.data = open(os.path.join(pack_dir, DATA_FILE), 'a+b')
+        with mmap.mmap(self.data.fileno(), 0, access=mmap.ACCESS_READ) if self._size() else _Empty() as data:
+            self.generation = read_generation(data)
+            size, self.hosts = read_index(pack_dir, data)
+            end = scan(data, size, self.hosts)
+        if end < self._size():
+            self.data.truncate(end)
+        if not end:
+            # A new data file, or one cut off in its header
+            self.generation = os.urandom(8).hex()
+            self.data.write(json.dumps({'generation': self.generation}).encode('utf-8') + b'\n')
+        self.data.seek(0, os.SEEK_END)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, host):
+        """
+        Returns the latest document of host or None.
+        """
+        entry = self.hosts.get(host.lower())
+        if entry is None:
+            return None
+        self.data.flush()
+        return json.loads(os.pread(self.data.fileno(), entry[1], entry[0]))
+
+    @metrics.timed('nerds.write')
+    def write(self, nerds):
+        if not nerds:
+            return
+        host = nerds.get('host', {}).get('name')
+        if not host or self._invalid(nerds):
+            return
+        if self.merge:
+            current = self.get(host)
+            if current is not None:
+                nerds = self.merge(current, nerds)
+        with metrics.timer('nerds.encode'):
+            line = self.encoder(nerds)
+        metrics.count('nerds.documents')
+        metrics.count('nerds.bytes', len(line) + 1)
+        if b'\n' in line:
+            raise ValueError('Packed documents must be encoded on one line, use a compact encoder.')
+        offset = self.data.tell()
+        self.data.write(line + b'\n')
+        self.hosts[host.lower()] = [offset, len(line)]
+
+    @metrics.timed('nerds.flush')
+    def flush(self):
+        self.data.flush()
+        if self.fsync:
+            os.fsync(self.data.fileno())
+        fd, tmp = tempfile.mkstemp(dir=self.pack_dir, prefix='.' + INDEX_FILE, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'generation': self.generation,
+                'size': self.data.tell(),
+                'hosts': self.hosts,
+            }, f)
+        os.replace(tmp, os.path.join(self.pack_dir, INDEX_FILE))
+
+    def close(self):
+        self.flush()
+        self.data.close()
+
+    def _size(self):
+        return os.fstat(self.data.fileno()).st_size
+
+
+class PackReader:
+    """
+    Read only access to a packed store through a memory map of the data file.
+    """
+    def __init__(self, pack_dir):
+        self.file = open(os.path.join(pack_dir, DATA_FILE), 'rb')
+        length = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if length else _Empty()
+        size, self.hosts = read_index(pack_dir, self.data)
+        if size < length:
+            # Documents written since the index was saved
+            scan(self.data, size, self.hosts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, host):
+        return host.lower() in self.hosts
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def names(self):
+        return sorted(self.hosts)
+
+    def get(self, host):
+        """
+        Returns the document of host or None.
+        """
+        entry = self.hosts.get(host.lower())
+        if entry is None:
+            return None
+        offset, length = entry
+        return json.loads(self.data[offset:offset + length])
+
+    def __iter__(self):
+        for host in self.names():
+            yield self.get(host)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class _Empty(bytes):
+    """
+    Stands in for the mmap of an empty file, which mmap refuses.
+    """
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+def pack(json_dir, pack_dir, encoder=None):
+    """
+    Writes the NERDS files of json_dir to a new packed store in pack_dir.
+    """
+    with PackWriter(pack_dir, merge=None, encoder=encoder, validate=False) as writer:
+        for name in sorted(os.listdir(json_dir)):
+            if name.endswith('.json') and not name.startswith('.'):
+                writer.write(load_nerds_file(os.path.join(json_dir, name)))
+        return len(writer.hosts)
+
+
+def unpack(pack_dir, json_dir, encoder=None):
+    """
+    Writes the hosts of the packed store in pack_dir as NERDS files in json_dir.
+    """
+    with PackReader(pack_dir) as reader, NerdsWriter(json_dir, merge=None, encoder=encoder, validate=False) as writer:
+        for nerds in reader:
+            writer.write(nerds)
+        return len(reader)
+
+
+def repack(pack_dir):
+    """
+    Rewrites the packed store in pack_dir with only the latest document of each host.
+
+    The new data file gets a new generation, so a crash between replacing the
+    data file and the index leaves an index readers and writers ignore.
+    """
+    tmp = tempfile.mkdtemp(dir=pack_dir, prefix='.repack')
+    with PackReader(pack_dir) as reader, PackWriter(tmp, merge=None, validate=False) as writer:
+        for nerds in reader:
+            writer.write(nerds)
+    os.replace(os.path.join(tmp, DATA_FILE), os.path.join(pack_dir, DATA_FILE))
+    os.replace(os.path.join(tmp, INDEX_FILE), os.path.join(pack_dir, INDEX_FILE))
+    os.rmdir(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('pack', help='Directory of NERDS files to packed store.')
+    p.add_argument('json_dir')
+    p.add_argument('pack_dir')
+    p = sub.add_parser('unpack', help='Packed store to directory of NERDS files.')
+    p.add_argument('pack_dir')
+    p.add_argument('json_dir')
+    p = sub.add_parser('repack', help='Drop the old documents of a packed store.')
+    p.add_argument('pack_dir')
+    args = parser.parse_args()
+    if args.command == 'pack':
+        print('Packed {} hosts.'.format(pack(args.json_dir, args.pack_dir)))
+    elif args.command == 'unpack':
+        print('Unpacked {} hosts.'.format(unpack(args.pack_dir, args.json_dir)))
+    else:
+        repack(args.pack_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from .file import BufferedNerdsWriter, NerdsWriter, load_nerds_file
+
+
+def nerds(name, producer='a', **data):
+    return {'host': {'name': name, 'version': 1, producer: data}}
+
+
+class NerdsWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.umask = os.umask(0o022)
+
+    def tearDown(self):
+        os.umask(self.umask)
+        shutil.rmtree(self.dir)
+
+    def files(self):
+        return sorted(os.listdir(self.dir))
+
+    def test_write_merges(self):
+        writer = NerdsWriter(self.dir, validate=False)
+        writer.write(nerds('Host.example.net', 'a', x=1))
+        writer.write(nerds('host.example.net', 'b', y=2))
+        self.assertEqual(self.files(), ['host.example.net.json'])
+        host = load_nerds_file(writer.path('host.example.net'))['host']
+        self.assertEqual((host['a'], host['b']), ({'x': 1}, {'y': 2}))
+
+    def test_atomic_replace(self):
+        writer = NerdsWriter(self.dir, merge=None, validate=False)
+        writer.write(nerds('host.example.net', x=1))
+        path = writer.path('host.example.net')
+        with open(path) as old:
+            writer.write(nerds('host.example.net', x=2))
+            # The old file is replaced, not rewritten in place
+            self.assertEqual(load_nerds_file(old.name)['host']['a'], {'x': 2})
+            self.assertIn('"x": 1', old.read())
+        self.assertEqual(self.files(), ['host.example.net.json'])
+
+    def test_mode(self):
+        writer = NerdsWriter(self.dir, validate=False)
+        writer.write(nerds('new.example.net'))
+        self.assertEqual(os.stat(writer.path('new.example.net')).st_mode & 0o777, 0o644)
+        path = writer.path('kept.example.net')
+        writer.write(nerds('kept.example.net'))
+        os.chmod(path, 0o600)
+        writer.write(nerds('kept.example.net', 'b'))
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+    def test_umask_untouched(self):
+        # The umask is process wide, writers in other threads must not see it change
+        with mock.patch('os.umask') as umask:
+            NerdsWriter(self.dir, validate=False).write(nerds('a.example.net'))
+        umask.assert_not_called()
+
+    def test_batch_fsync_on_flush(self):
+        with mock.patch('os.fsync') as fsync:
+            with NerdsWriter(self.dir, fsync='batch', validate=False) as writer:
+                writer.write(nerds('a.example.net'))
+                writer.write(nerds('b.example.net'))
+                writer.write(nerds('a.example.net', 'b'))
+                # Held back as temporary files until the flush
+                self.assertEqual(len(self.files()), 2)
+                self.assertTrue(all(name.endswith('.tmp') for name in self.files()))
+                self.assertEqual(fsync.call_count, 0)
+            # One per file and one for the directory
+            self.assertEqual(fsync.call_count, 3)
+        self.assertEqual(self.files(), ['a.example.net.json', 'b.example.net.json'])
+        self.assertEqual(sorted(load_nerds_file(writer.path('a.example.net'))['host']), ['a', 'b', 'name', 'version'])
+
+    def test_file_fsync(self):
+        with mock.patch('os.fsync') as fsync:
+            writer = NerdsWriter(self.dir, fsync='file', validate=False)
+            writer.write(nerds('a.example.net'))
+            self.assertEqual(fsync.call_count, 1)
+        self.assertEqual(self.files(), ['a.example.net.json'])
+
+    def test_unknown_fsync(self):
+        with self.assertRaises(ValueError):
+            NerdsWriter(self.dir, fsync='always')
+
+    def test_encoder_failure(self):
+        writer = NerdsWriter(self.dir, validate=False)
+        writer.write(nerds('host.example.net', x=1))
+
+        def fail(document):
+            raise TypeError('not serializable')
+        writer.encoder = fail
+        with self.assertRaises(TypeError):
+            writer.write(nerds('host.example.net', x=2))
+        self.assertEqual(self.files(), ['host.example.net.json'])
+
+    def test_write_failure_removes_tmp(self):
+        # str instead of bytes fails in the middle of writing the temporary file
+        writer = NerdsWriter(self.dir, validate=False, encoder=lambda document: 'text')
+        with self.assertRaises(TypeError):
+            writer.write(nerds('host.example.net'))
+        self.assertEqual(self.files(), [])
+
+    def test_no_host(self):
+        writer = NerdsWriter(self.dir, validate=False)
+        writer.write({})
+        writer.write({'host': {'version': 1}})
+        self.assertEqual(self.files(), [])
+
+
+
+class BufferedNerdsWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self, writer, host):
+        return load_nerds_file(writer.path(host))['host']
+
+    def test_buffered_until_flush(self):
+        with BufferedNerdsWriter(self.dir, validate=False) as writer:
+            writer.write(nerds('Host.example.net', 'a', x=1))
+            writer.write(nerds('host.example.net', 'b', y=2))
+            self.assertEqual(os.listdir(self.dir), [])
+            self.assertEqual(list(writer.buffer), ['host.example.net'])
+        self.assertEqual(os.listdir(self.dir), ['host.example.net.json'])
+        host = self.load(writer, 'host.example.net')
+        self.assertEqual((host['a'], host['b']), ({'x': 1}, {'y': 2}))
+        self.assertEqual(writer.buffer, {})
+
+    def test_early_flush(self):
+        writer = BufferedNerdsWriter(self.dir, max_buffered=2, validate=False)
+        writer.write(nerds('a.example.net'))
+        writer.write(nerds('b.example.net'))
+        writer.write(nerds('a.example.net', 'b'))
+        self.assertEqual(os.listdir(self.dir), [])
+        writer.write(nerds('c.example.net'))
+        self.assertEqual(sorted(os.listdir(self.dir)), ['a.example.net.json', 'b.example.net.json'])
+        self.assertEqual(list(writer.buffer), ['c.example.net'])
+        # Merged with what the early flush wrote
+        writer.write(nerds('a.example.net', 'c'))
+        writer.flush()
+        self.assertEqual(sorted(self.load(writer, 'a.example.net')), ['a', 'b', 'c', 'name', 'version'])
+
+    def test_merge_callback(self):
+        calls = []
+
+        def merge(current, new):
+            calls.append((current['host']['a']['n'], new['host']['a']['n']))
+            current['host']['a']['n'] += new['host']['a']['n']
+            return current
+        NerdsWriter(self.dir, validate=False).write(nerds('host.example.net', n=1))
+        with BufferedNerdsWriter(self.dir, merge, validate=False) as writer:
+            writer.write(nerds('host.example.net', n=10))
+            writer.write(nerds('host.example.net', n=100))
+        self.assertEqual(calls, [(1, 10), (11, 100)])
+        self.assertEqual(self.load(writer, 'host.example.net')['a'], {'n': 111})
+
+    def test_no_merge(self):
+        NerdsWriter(self.dir, validate=False).write(nerds('host.example.net', 'old'))
+        with BufferedNerdsWriter(self.dir, merge=None, validate=False) as writer:
+            writer.write(nerds('host.example.net', 'a', n=1))
+            writer.write(nerds('host.example.net', 'b', n=2))
+        self.assertEqual(self.load(writer, 'host.example.net'), nerds('host.example.net', 'b', n=2)['host'])
@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from .index import NerdsIndex
+
+
+class NerdsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.index = NerdsIndex(os.path.join(self.repo, 'nerds.db'))
+        self.juniper = self.add('juniper_conf', 'R1.example.net', {
+            'interfaces': [{'name': 'xe-0/0/0', 'units': [{'address': ['10.0.0.1/31', '2001:db8::1/127']}]}],
+        })
+        self.nmap = self.add('nmap_services_py', 'host.example.net', {
+            'addresses': ['10.0.1.1'],
+            'services': {'10.0.1.1': {'tcp': {'443': {'state': 'open', 'name': 'https'}}}},
+        })
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.repo)
+
+    def add(self, producer, host, section, mtime=None):
+        json_dir = os.path.join(self.repo, 'producers', producer, 'json')
+        os.makedirs(json_dir, exist_ok=True)
+        path = os.path.join(json_dir, host.lower() + '.json')
+        with open(path, 'w') as f:
+            json.dump({'host': {'name': host, 'version': 1, producer: section}}, f)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_first_index(self):
+        self.assertEqual(self.index.index([self.repo]), (2, 0))
+        self.assertEqual(self.index.documents('r1.example.net')[0]['host']['name'], 'R1.example.net')
+        self.assertEqual(self.index.hosts_with_service(port=443, protocol='tcp'), ['host.example.net'])
+        self.assertEqual(self.index.hosts_with_service(port=443, state='closed'), [])
+
+    def test_unchanged(self):
+        self.index.index([self.repo])
+        self.assertEqual(self.index.index([self.repo]), (0, 0))
+
+    def test_unchanged_without_host(self):
+        path = os.path.join(self.repo, 'producers', 'nso', 'json', 'broken.json')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump({'host': {'version': 1}}, f)
+        with self.assertLogs('nerds_utils.index', 'ERROR'):
+            self.assertEqual(self.index.index([self.repo]), (3, 0))
+        self.assertEqual(self.index.index([self.repo]), (0, 0))
+        self.assertEqual(self.index.hosts(), ['host.example.net', 'r1.example.net'])
+
+    def test_changed_file(self):
+        self.index.index([self.repo])
+        mtime = os.stat(self.nmap).st_mtime_ns + 10 ** 9
+        self.add('nmap_services_py', 'host.example.net', {'addresses': ['10.0.1.2']}, mtime)
+        self.assertEqual(self.index.index([self.repo]), (1, 0))
+        self.assertEqual(self.index.hosts_with_address('10.0.1.1'), [])
+        self.assertEqual(self.index.hosts_with_address('10.0.1.2'), ['host.example.net'])
+        self.assertEqual(self.index.hosts_with_service(port=443), [])
+
+    def test_deleted_file(self):
+        self.index.index([self.repo])
+        os.remove(self.nmap)
+        self.assertEqual(self.index.index([self.repo]), (0, 1))
+        self.assertEqual(self.index.hosts(), ['r1.example.net'])
+        self.assertEqual(self.index.query('SELECT COUNT(*) FROM services'), [(0,)])
+
+    def test_hosts(self):
+        self.add('nso', 'r1.example.net', {'interfaces': []})
+        self.index.index([self.repo])
+        self.assertEqual(self.index.hosts(), ['host.example.net', 'r1.example.net'])
+        self.assertEqual(len(self.index.documents('R1.example.net')), 2)
+
+    def test_hosts_with_address(self):
+        self.index.index([self.repo])
+        self.assertEqual(self.index.hosts_with_address('10.0.0.1'), ['r1.example.net'])
+        self.assertEqual(self.index.hosts_with_address('2001:db8::1'), ['r1.example.net'])
+        self.assertEqual(self.index.hosts_with_address('10.0.1.1'), ['host.example.net'])
+        self.assertEqual(self.index.hosts_with_address('10.9.9.9'), [])
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from .file import load_nerds_file
+from .merge import MANIFEST, discover, group_by_host, merge, merge_deep, merge_files, merge_incremental, output_dir
+
+
+def nerds(name, producer, **data):
+    return {'host': {'name': name, 'version': 1, producer: data}}
+
+
+class RepoTest(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+
+    def add(self, producer, file_name, document):
+        json_dir = os.path.join(self.repo, 'producers', producer, 'json')
+        os.makedirs(json_dir, exist_ok=True)
+        path = os.path.join(json_dir, file_name)
+        with open(path, 'w') as f:
+            json.dump(document, f)
+        return path
+
+    def outputs(self):
+        return sorted(name for name in os.listdir(output_dir(self.repo)) if not name.startswith('.'))
+
+    def output(self, host):
+        return load_nerds_file(os.path.join(output_dir(self.repo), host + '..json'))
+
+
+class MergeTest(RepoTest):
+    def test_discover(self):
+        self.add('b', 'h.json', nerds('h', 'b'))
+        self.add('a', 'h.json', nerds('h', 'a'))
+        self.add('merge_nerds', 'h..json', nerds('h', 'merged'))
+        os.makedirs(os.path.join(self.repo, 'producers', 'no_output'))
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+        producers = os.path.join(self.repo, 'producers')
+        self.assertEqual(discover([self.repo, other]), [
+            ('a', os.path.join(producers, 'a', 'json')),
+            ('b', os.path.join(producers, 'b', 'json')),
+            (None, other),
+        ])
+
+    def test_group_by_host(self):
+        a = self.add('a', 'Host.example.net.json', nerds('Host.example.net', 'a'))
+        b = self.add('b', 'host.example.net..json', nerds('host.example.net', 'b'))
+        other = self.add('b', 'other.example.net.json', nerds('other.example.net', 'b'))
+        self.add('b', '.hidden.json', {})
+        self.add('b', 'notes.txt', {})
+        self.assertEqual(group_by_host(discover([self.repo])), {
+            'host.example.net': [('a', a), ('b', b)],
+            'other.example.net': [('b', other)],
+        })
+
+    def test_merge_files(self):
+        paths = [
+            self.add('a', 'h.json', nerds('Host1.example.net', 'a', x=1)),
+            self.add('b', 'h.json', nerds('host1.example.net', 'b', y=2)),
+            self.add('c', 'h.json', nerds('host2.example.net', 'c')),
+            self.add('d', 'h.json', {'host': {'name': 'host1.example.net', 'version': 2}}),
+            self.add('e', 'h.json', {'no': 'host'}),
+        ]
+        merged = merge_files(paths)
+        self.assertEqual(sorted(merged), ['host1.example.net', 'host2.example.net'])
+        host = merged['host1.example.net']['host']
+        self.assertEqual((host['name'], host['a'], host['b']), ('host1.example.net', {'x': 1}, {'y': 2}))
+
+    def test_merge_deep(self):
+        current = {'a': {'x': 1, 'l': [1, 2]}, 'b': 1}
+        new = {'a': {'y': 2, 'l': [2, 3]}, 'b': {'z': 3}, 'c': None}
+        self.assertEqual(merge_deep(current, new), {'a': {'x': 1, 'y': 2, 'l': [1, 2, 3]}, 'b': {'z': 3}, 'c': None})
+        self.assertEqual(merge_deep(None, {'a': 1}), {'a': 1})
+
+    def test_policies(self):
+        self.add('a', 'h.json', nerds('h.example.net', 'shared', addresses=['10.0.0.1'], model='mx'))
+        self.add('b', 'h.json', nerds('h.example.net', 'shared', addresses=['10.0.0.2']))
+        merge([self.repo], output_dir(self.repo), policy='right')
+        self.assertEqual(self.output('h.example.net')['host']['shared'], {'addresses': ['10.0.0.2']})
+        merge([self.repo], output_dir(self.repo), policy='deep')
+        self.assertEqual(self.output('h.example.net')['host']['shared'],
+                         {'addresses': ['10.0.0.1', '10.0.0.2'], 'model': 'mx'})
+
+    def test_merge(self):
+        self.add('a', 'host1.example.net.json', nerds('Host1.example.net', 'a'))
+        self.add('b', 'host1.example.net.json', nerds('host1.example.net', 'b'))
+        self.add('b', 'host2.example.net.json', nerds('host2.example.net', 'b'))
+        # Named like merge_nerds.pl names them, for nerds2nagios.pl
+        self.assertEqual(merge([self.repo], output_dir(self.repo), workers=2), 2)
+        self.assertEqual(self.outputs(), ['host1.example.net..json', 'host2.example.net..json'])
+        self.assertEqual(sorted(self.output('host1.example.net')['host']), ['a', 'b', 'name', 'version'])
+        # The output of an earlier merge is not an input
+        self.assertEqual(merge([self.repo], output_dir(self.repo)), 2)
+        self.assertEqual(sorted(self.output('host1.example.net')['host']), ['a', 'b', 'name', 'version'])
+
+
+class IncrementalMergeTest(RepoTest):
+    def setUp(self):
+        super().setUp()
+        self.a = self.add('a', 'h1.example.net.json', nerds('h1.example.net', 'a', n=1))
+        self.add('b', 'h1.example.net.json', nerds('h1.example.net', 'b'))
+        self.h2 = self.add('b', 'h2.example.net.json', nerds('h2.example.net', 'b'))
+        self.assertEqual(self.merge(), 2)
+
+    def merge(self, policy='right'):
+        return merge_incremental([self.repo], output_dir(self.repo), policy)
+
+    def manifest(self):
+        with open(os.path.join(output_dir(self.repo), MANIFEST)) as f:
+            return json.load(f)
+
+    def test_unchanged(self):
+        self.assertEqual(self.merge(), 0)
+        self.assertEqual(self.outputs(), ['h1.example.net..json', 'h2.example.net..json'])
+
+    def test_touched(self):
+        mtime = os.stat(self.a).st_mtime_ns + 10 ** 9
+        os.utime(self.a, ns=(mtime, mtime))
+        self.assertEqual(self.merge(), 0)
+        # The new mtime is recorded, the file is not read again next time
+        self.assertEqual(self.manifest()['hosts']['h1.example.net']['inputs'][0][2], mtime)
+
+    def test_changed(self):
+        with open(self.a, 'w') as f:
+            json.dump(nerds('h1.example.net', 'a', n=2), f)
+        self.assertEqual(self.merge(), 1)
+        self.assertEqual(self.output('h1.example.net')['host']['a'], {'n': 2})
+
+    def test_input_removed(self):
+        os.remove(self.h2)
+        self.assertEqual(self.merge(), 0)
+        self.assertEqual(self.outputs(), ['h1.example.net..json'])
+        self.assertNotIn('h2.example.net', self.manifest()['hosts'])
+
+    def test_output_removed(self):
+        os.remove(os.path.join(output_dir(self.repo), 'h2.example.net..json'))
+        self.assertEqual(self.merge(), 1)
+        self.assertEqual(self.outputs(), ['h1.example.net..json', 'h2.example.net..json'])
+
+    def test_policy_changed(self):
+        self.assertEqual(self.merge('deep'), 2)
+        self.assertEqual(self.manifest()['policy'], 'deep')
+        self.assertEqual(self.merge('deep'), 0)
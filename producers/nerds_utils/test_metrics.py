@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from . import metrics
+from .metrics import METRICS_FILE, Metrics
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_count(self):
+        self.metrics.count('a')
+        self.metrics.count('a', 10)
+        self.metrics.count('b', 0)
+        self.assertEqual(self.metrics.to_json()['counters'], {'a': 11, 'b': 0})
+
+    def test_count_threads(self):
+        def count():
+            for _ in range(1000):
+                self.metrics.count('a')
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.metrics.counters['a'], 4000)
+
+    def test_timer(self):
+        with mock.patch('time.perf_counter', side_effect=[0.0, 2.0, 10.0, 10.5]):
+            for _ in range(2):
+                with self.metrics.timer('fetch'):
+                    pass
+        timer = self.metrics.to_json()['timers']['fetch']
+        self.assertEqual((timer['count'], timer['seconds'], timer['max_seconds']), (2, 2.5, 2.0))
+        self.assertGreaterEqual(timer['rss_growth_kb'], 0)
+
+    def test_timer_exception(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.timer('fetch'):
+                raise ValueError()
+        self.assertEqual(self.metrics.timers['fetch'][0], 1)
+
+    def test_timed(self):
+        @self.metrics.timed('parse')
+        def parse(text, upper=False):
+            """Parses text."""
+            return text.upper() if upper else text
+        self.assertEqual(parse('a', upper=True), 'A')
+        self.assertEqual(parse('b'), 'b')
+        self.assertEqual(parse.__name__, 'parse')
+        self.assertEqual(parse.__doc__, 'Parses text.')
+        self.assertEqual(self.metrics.timers['parse'][0], 2)
+
+    def test_reset(self):
+        self.metrics.count('a')
+        self.metrics.add_time('b', 1.0)
+        self.metrics.reset()
+        self.assertEqual((self.metrics.timers, self.metrics.counters), ({}, {}))
+
+    def test_to_json(self):
+        data = self.metrics.to_json('producer')
+        self.assertEqual(data['producer'], 'producer')
+        self.assertRegex(data['started'], r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$')
+        self.assertGreater(data['peak_rss_kb'], 0)
+        for key in ['seconds', 'cpu_seconds', 'children_peak_rss_kb']:
+            self.assertGreaterEqual(data[key], 0)
+
+    def test_save(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        out_dir = os.path.join(directory, 'producers', 'my_producer', 'json')
+        self.metrics.count('nerds.documents', 3)
+        self.metrics.add_time('nerds.write', 0.25, 12)
+        path = self.metrics.save(out_dir, 'my_producer')
+        # Next to json/, not in it
+        self.assertEqual(path, os.path.join(directory, 'producers', 'my_producer', METRICS_FILE))
+        self.assertEqual(os.listdir(os.path.dirname(path)), [METRICS_FILE])
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+        with open(path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved['producer'], 'my_producer')
+        self.assertEqual(saved['counters'], {'nerds.documents': 3})
+        self.assertEqual(saved['timers'], {
+            'nerds.write': {'count': 1, 'seconds': 0.25, 'max_seconds': 0.25, 'rss_growth_kb': 12}})
+        # Saved again, replaced
+        self.metrics.count('nerds.documents')
+        self.metrics.save(out_dir, 'my_producer')
+        with open(path) as f:
+            self.assertEqual(json.load(f)['counters'], {'nerds.documents': 4})
+        self.assertEqual(os.listdir(os.path.dirname(path)), [METRICS_FILE])
+
+    def test_module_functions(self):
+        self.addCleanup(metrics.reset)
+        metrics.reset()
+        metrics.count('a')
+        with metrics.timer('b'):
+            pass
+        data = metrics.to_json()
+        self.assertEqual(data['counters'], {'a': 1})
+        self.assertEqual(list(data['timers']), ['b'])
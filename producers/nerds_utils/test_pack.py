@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from .file import NerdsWriter, load_nerds_file
+from .pack import DATA_FILE, INDEX_FILE, PackReader, PackWriter, pack, repack, unpack
+
+
+def nerds(name, producer='a', **data):
+    return {'host': {'name': name, 'version': 1, producer: data}}
+
+
+class PackTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pack_dir = os.path.join(self.dir, 'packed')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def data_size(self):
+        return os.path.getsize(os.path.join(self.pack_dir, DATA_FILE))
+
+    def test_write_get(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('Host1.example.net', x=1))
+            writer.write(nerds('host2.example.net', x=2))
+            self.assertEqual(writer.get('host1.example.net'), nerds('Host1.example.net', x=1))
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net', 'host2.example.net'])
+            self.assertIn('HOST2.example.net', reader)
+            self.assertEqual(reader.get('host2.example.net'), nerds('host2.example.net', x=2))
+            self.assertIsNone(reader.get('host3.example.net'))
+            self.assertEqual([n['host']['a'] for n in reader], [{'x': 1}, {'x': 2}])
+
+    def test_merge_on_rewrite(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('host.example.net', 'a', x=1))
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('host.example.net', 'b', y=2))
+        with PackWriter(self.pack_dir, merge=None, validate=False) as writer:
+            writer.write(nerds('other.example.net', 'a', x=1))
+            writer.write(nerds('other.example.net', 'b', y=2))
+        with PackReader(self.pack_dir) as reader:
+            host = reader.get('host.example.net')['host']
+            self.assertEqual((host['a'], host['b']), ({'x': 1}, {'y': 2}))
+            self.assertNotIn('a', reader.get('other.example.net')['host'])
+
+    def test_documents_after_index(self):
+        writer = PackWriter(self.pack_dir, validate=False)
+        writer.write(nerds('host1.example.net'))
+        writer.flush()
+        writer.write(nerds('host2.example.net'))
+        writer.data.flush()
+        # Not in the index yet, found by scanning past its end
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net', 'host2.example.net'])
+        writer.close()
+
+    def test_truncated_tail(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('host1.example.net'))
+        size = self.data_size()
+        # Half a document written when the producer crashed
+        with open(os.path.join(self.pack_dir, DATA_FILE), 'ab') as f:
+            f.write(b'{"host": {"name": "host2.exam')
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net'])
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            self.assertEqual(self.data_size(), size)
+            writer.write(nerds('host2.example.net'))
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net', 'host2.example.net'])
+
+    def test_repack(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            for i in range(3):
+                writer.write(nerds('host1.example.net', x=i))
+            writer.write(nerds('host2.example.net'))
+        size = self.data_size()
+        repack(self.pack_dir)
+        self.assertLess(self.data_size(), size)
+        self.assertEqual(sorted(os.listdir(self.pack_dir)), sorted([DATA_FILE, INDEX_FILE]))
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net', 'host2.example.net'])
+            self.assertEqual(reader.get('host1.example.net')['host']['a'], {'x': 2})
+
+    def test_repack_crash(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('host1.example.net', x=1))
+            writer.write(nerds('host2.example.net', x=1))
+            writer.write(nerds('host1.example.net', x=2))
+        real_replace = os.replace
+
+        def crash(src, dst):
+            if dst.endswith(INDEX_FILE):
+                raise OSError('crashed')
+            real_replace(src, dst)
+        with mock.patch('os.replace', crash), self.assertRaises(OSError):
+            repack(self.pack_dir)
+        # New data file, old index: the offsets of the index do not apply
+        for store in [PackReader, PackWriter]:
+            with store(self.pack_dir) as s:
+                self.assertEqual(s.get('host1.example.net')['host']['a'], {'x': 2})
+                self.assertEqual(s.get('host2.example.net')['host']['a'], {'x': 1})
+
+    def test_old_index(self):
+        with PackWriter(self.pack_dir, validate=False) as writer:
+            writer.write(nerds('host1.example.net'))
+        with open(os.path.join(self.pack_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        index['generation'] = 'other'
+        index['hosts'] = {'host1.example.net': [1, 2], 'gone.example.net': [3, 4]}
+        with open(os.path.join(self.pack_dir, INDEX_FILE), 'w') as f:
+            json.dump(index, f)
+        with PackReader(self.pack_dir) as reader:
+            self.assertEqual(reader.names(), ['host1.example.net'])
+            self.assertEqual(reader.get('host1.example.net'), nerds('host1.example.net'))
+
+    def test_pack_unpack(self):
+        json_dir = os.path.join(self.dir, 'json')
+        with NerdsWriter(json_dir, validate=False) as writer:
+            writer.write(nerds('Host1.example.net', x=1, names=['ü']))
+            writer.write(nerds('host2.example.net', x=2))
+        self.assertEqual(pack(json_dir, self.pack_dir), 2)
+        out_dir = os.path.join(self.dir, 'unpacked')
+        self.assertEqual(unpack(self.pack_dir, out_dir), 2)
+        self.assertEqual(sorted(os.listdir(out_dir)), sorted(os.listdir(json_dir)))
+        for name in os.listdir(json_dir):
+            self.assertEqual(load_nerds_file(os.path.join(out_dir, name)),
+                             load_nerds_file(os.path.join(json_dir, name)))
+
+    def test_multiline_encoder(self):
+        with PackWriter(self.pack_dir, encoder=lambda n: b'{\n}', validate=False) as writer:
+            with self.assertRaises(ValueError):
+                writer.write(nerds('host.example.net'))
@@ -0,0 +1,130 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from .file import NerdsWriter
+from .validate import SCHEMAS, Any, Optional, compile_schema, register_schema, validate, validator
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+
+
+def fixture(producer):
+    with open(os.path.join(TEST_DATA, producer + '.json')) as f:
+        return json.load(f)
+
+
+class CompileSchemaTest(unittest.TestCase):
+    def test_types(self):
+        check = compile_schema(str)
+        self.assertIsNone(check('a'))
+        self.assertEqual(check(1), 'expected str')
+        self.assertIsNone(compile_schema(Any)(object()))
+
+    def test_int_is_not_bool(self):
+        check = compile_schema(int)
+        self.assertIsNone(check(1))
+        self.assertEqual(check(True), 'expected int')
+        self.assertEqual(compile_schema([int])([1, False]), '[1]: expected int')
+        self.assertIsNone(compile_schema(bool)(False))
+
+    def test_union(self):
+        check = compile_schema((str, None))
+        self.assertIsNone(check('a'))
+        self.assertIsNone(check(None))
+        self.assertEqual(check(1), 'expected str or null')
+        mixed = compile_schema((int, [str]))
+        self.assertIsNone(mixed(1))
+        self.assertIsNone(mixed(['a']))
+        self.assertEqual(mixed(True), 'expected int or expected list')
+
+    def test_list(self):
+        check = compile_schema([{'name': str}])
+        self.assertIsNone(check([]))
+        self.assertIsNone(check([{'name': 'a', 'other': 1}]))
+        self.assertEqual(check([{'name': 'a'}, {'name': 1}]), '[1].name: expected str')
+        self.assertEqual(check({}), 'expected list')
+
+    def test_dict(self):
+        check = compile_schema({'name': str, 'comment': Optional((str, None))})
+        self.assertIsNone(check({'name': 'a'}))
+        self.assertIsNone(check({'name': 'a', 'comment': None}))
+        self.assertEqual(check({'comment': 'a'}), '.name: missing')
+        self.assertEqual(check({'name': 'a', 'comment': 1}), '.comment: expected str or null')
+        self.assertEqual(check([]), 'expected dict')
+
+    def test_mapping(self):
+        check = compile_schema({str: {str: dict}})
+        self.assertIsNone(check({'10.0.0.1': {'tcp': {}}}))
+        self.assertEqual(check({'10.0.0.1': {'tcp': []}}), '.10.0.0.1.tcp: expected dict')
+        self.assertEqual(check({'10.0.0.1': []}), '.10.0.0.1: expected dict')
+
+    def test_not_a_schema(self):
+        with self.assertRaises(TypeError):
+            compile_schema(object())
+
+
+class ValidateTest(unittest.TestCase):
+    def test_fixtures(self):
+        for producer in SCHEMAS:
+            with self.subTest(producer=producer):
+                nerds = fixture(producer)
+                self.assertIn(producer, nerds['host'])
+                self.assertEqual(validate(nerds), [])
+
+    def test_invalid_section(self):
+        nerds = fixture('raritan')
+        nerds['host']['raritan']['ports'][2]['description'] = None
+        self.assertEqual(validate(nerds), ['host.raritan.ports[2].description: expected str'])
+
+    def test_interface_without_name(self):
+        for producer in ['juniper_conf', 'nso_juniper']:
+            nerds = fixture(producer)
+            nerds['host'][producer]['interfaces'][0]['name'] = None
+            self.assertEqual(validate(nerds), [])
+
+    def test_host(self):
+        self.assertEqual(validate([]), ['document: expected dict'])
+        self.assertEqual(validate({'host': None}), ['host: expected dict'])
+        self.assertEqual(validate({'host': {'version': 2}}),
+                         ['host.name: expected a host name', 'host.version: expected 1'])
+        for name in ['192.0.2.1', '2001:db8::1']:
+            self.assertEqual(validate({'host': {'name': name, 'version': 1}}),
+                             ['host.name: {} is an IP address'.format(name)])
+        for name in ['host.example.net', 'db1', 'host:8080', '300.1.2.3']:
+            self.assertEqual(validate({'host': {'name': name, 'version': 1}}), [])
+
+    def test_unknown_producer(self):
+        self.assertEqual(validate({'host': {'name': 'a', 'version': 1, 'unknown': [1]}}), [])
+
+    def test_register_schema(self):
+        self.addCleanup(register_schema, 'nunoc_cosmos', SCHEMAS['nunoc_cosmos'])
+        nerds = fixture('nunoc_cosmos')
+        register_schema('nunoc_cosmos', {'addresses': [int]})
+        self.assertEqual(validate(nerds), ['host.nunoc_cosmos.addresses[0]: expected int'])
+        self.assertIs(validator('nunoc_cosmos'), validator('nunoc_cosmos'))
+
+
+class ValidatingWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.nerds = fixture('raritan')
+        self.nerds['host']['raritan']['ports'] = 'none'
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_invalid_written(self):
+        writer = NerdsWriter(self.dir)
+        with self.assertLogs('nerds_utils.file', 'ERROR'):
+            writer.write(copy.deepcopy(self.nerds))
+        self.assertEqual(writer.invalid, 1)
+        self.assertEqual(os.listdir(self.dir), ['pdu1.example.net.json'])
+
+    def test_invalid_dropped(self):
+        writer = NerdsWriter(self.dir, drop_invalid=True)
+        with self.assertLogs('nerds_utils.file', 'ERROR'):
+            writer.write(copy.deepcopy(self.nerds))
+        self.assertEqual(writer.invalid, 1)
+        self.assertEqual(os.listdir(self.dir), [])
@@ -0,0 +1,236 @@
+"""
+Validation of NERDS documents against per-producer schemas.
+
+A schema is written with plain Python values:
+
+    str, int, bool, dict, list    value of that type
+    Any                           anything
+    (str, None)                   one of the alternatives, None for null
+    [schema]                      list of items matching schema
+    {'key': schema}               dict with these keys, others are allowed
+    {'key': Optional(schema)}     ... where key may be left out
+    {str: schema}                 dict of any keys with values matching schema
+
+Schemas are compiled to nested closures once per producer, so checking a
+document is cheap enough to do for every document written.
+"""
+import ipaddress
+from functools import lru_cache
+
+
+class Any:
+    pass
+
+
+class Optional:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+INTERFACE = {
+    # Interfaces only known from a unit or a logical system may have no name
+    'name': (str, None),
+    'description': (str, None),
+    'units': [dict],
+    'tunnels': [dict],
+}
+
+ROUTER = {
+    'name': str,
+    'version': (str, None),
+    'model': (str, None),
+    'interfaces': [INTERFACE],
+    'bgp_peerings': Optional([dict]),
+}
+
+SCHEMAS = {
+    'juniper_conf': ROUTER,
+    'nso_juniper': ROUTER,
+    'nso_arista': {
+        'name': str,
+        'interfaces': [INTERFACE],
+    },
+    'nmap_services_py': {
+        'hostnames': [str],
+        'addresses': [str],
+        'os': dict,
+        'uptime': Optional(dict),
+        'services': {str: {str: dict}},
+    },
+    'raritan': {
+        'ports': [{'name': str, 'description': str}],
+    },
+    'nagiosxi_api': {
+        'host_name': str,
+        'host_address': (str, None),
+        'host_alias': (str, None),
+        'checks': [dict],
+    },
+    'nunoc_cosmos': {
+        'addresses': [str],
+        'sunet_iaas': bool,
+        'managed_by': str,
+    },
+}
+
+
+def is_ip_address(name):
+    try:
+        ipaddress.ip_address(name)
+    except ValueError:
+        return False
+    return True
+
+
+def register_schema(producer, schema):
+    """
+    Declares the schema of the section a producer writes, replacing any earlier one.
+    """
+    SCHEMAS[producer] = schema
+    validator.cache_clear()
+
+
+def _at(step, error):
+    return step + error if error[0] in '.[' else '{}: {}'.format(step, error)
+
+
+def _types(schema):
+    """
+    Returns the types of a schema isinstance can check by itself, None for other schemas.
+    """
+    if schema is None:
+        return (type(None),)
+    if isinstance(schema, type) and schema not in (int, Any):
+        return (schema,)
+    if isinstance(schema, tuple):
+        types = [_types(s) for s in schema]
+        if all(types):
+            return sum(types, ())
+    return None
+
+
+def compile_schema(schema):
+    """
+    Returns a function returning None for a valid value or a description of what is wrong.
+
+    Values of plain types are checked with isinstance by their list or dict
+    instead of a function of their own, that is where most of the time goes.
+    """
+    types = _types(schema)
+    if types:
+        expected = 'expected ' + ' or '.join('null' if t is type(None) else t.__name__ for t in types)
+        return lambda value: None if isinstance(value, types) else expected
+    if schema is Any:
+        return lambda value: None
+    if schema is int:
+        # bool is an int, but not a valid one
+        return lambda value: None if type(value) is int else 'expected int'
+    if isinstance(schema, tuple):
+        alternatives = [compile_schema(s) for s in schema]
+
+        def check_union(value):
+            errors = []
+            for check in alternatives:
+                error = check(value)
+                if error is None:
+                    return None
+                errors.append(error)
+            return ' or '.join(errors)
+        return check_union
+    if isinstance(schema, list):
+        item_types = _types(schema[0]) or ()
+        check_item = compile_schema(schema[0])
+
+        def check_list(value):
+            if not isinstance(value, list):
+                return 'expected list'
+            for i, item in enumerate(value):
+                if isinstance(item, item_types):
+                    continue
+                error = check_item(item)
+                if error is not None:
+                    return _at('[{}]'.format(i), error)
+            return None
+        return check_list
+    if isinstance(schema, dict) and len(schema) == 1 and isinstance(next(iter(schema)), type):
+        value_types = _types(next(iter(schema.values()))) or ()
+        check_value = compile_schema(next(iter(schema.values())))
+
+        def check_mapping(value):
+            if not isinstance(value, dict):
+                return 'expected dict'
+            for key, item in value.items():
+                if isinstance(item, value_types):
+                    continue
+                error = check_value(item)
+                if error is not None:
+                    return _at('.{}'.format(key), error)
+            return None
+        return check_mapping
+    if isinstance(schema, dict):
+        fields = []
+        for key, field in schema.items():
+            optional = isinstance(field, Optional)
+            if optional:
+                field = field.schema
+            fields.append((key, optional, _types(field) or (), compile_schema(field)))
+
+        def check_dict(value):
+            if not isinstance(value, dict):
+                return 'expected dict'
+            for key, optional, field_types, check in fields:
+                try:
+                    item = value[key]
+                except KeyError:
+                    if optional:
+                        continue
+                    return '.{}: missing'.format(key)
+                if isinstance(item, field_types):
+                    continue
+                error = check(item)
+                if error is not None:
+                    return _at('.{}'.format(key), error)
+            return None
+        return check_dict
+    raise TypeError('Not a schema: {!r}'.format(schema))
+
+
+@lru_cache(maxsize=None)
+def validator(producer):
+    """
+    Returns the compiled schema of producer, None for producers without one.
+    """
+    schema = SCHEMAS.get(producer)
+    return compile_schema(schema) if schema is not None else None
+
+
+def validate(nerds):
+    """
+    Returns a list of what is wrong with a NERDS document, empty if it is valid.
+
+    The host must have a name that is not an IP address and version 1, and the
+    section of every producer with a schema must match it.
+    """
+    if not isinstance(nerds, dict):
+        return ['document: expected dict']
+    host = nerds.get('host')
+    if not isinstance(host, dict):
+        return ['host: expected dict']
+    errors = []
+    name = host.get('name')
+    if not isinstance(name, str) or not name:
+        errors.append('host.name: expected a host name')
+    elif is_ip_address(name):
+        errors.append('host.name: {} is an IP address'.format(name))
+    if host.get('version') != 1:
+        errors.append('host.version: expected 1')
+    for producer, section in host.items():
+        if producer in ('name', 'version'):
+            continue
+        check = validator(producer)
+        if check is None:
+            continue
+        error = check(section)
+        if error is not None:
+            errors.append(_at('host.{}'.format(producer), error))
+    return errors
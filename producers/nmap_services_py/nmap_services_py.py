@@ -5,11 +5,15 @@ import os
 import json
 import nmap
 import logging
+import multiprocessing
+import queue
 import time
 import gc
 import sys
 sys.path.append('../')
-from nerds_utils.file import save_to_json
+from nerds_utils.file import BufferedNerdsWriter
+from nerds_utils.pack import PackWriter
+from nerds_utils import metrics
 from nerds_utils.nerds import to_nerds
 
 logger = logging.getLogger('nmap_services_py')
@@ -25,22 +29,43 @@ logger.addHandler(ch)
 # Rewrite of nmap_services producer in Python for the NERDS project
 # (http://github.com/fredrikt/nerds/).
 #
-# Requires Python 2.7.
+# Requires Python 3.
 
 VERBOSE = False
 
 
-def scan(target, nmap_arguments, ports, output_arguments, sudo=False):
-    def callback_result(host, scan_result):
-        if VERBOSE:
-            logger.info('Finished scanning %s.' % host)
-        d = nerds_format(host, scan_result)
-        if d:
-            output(d, output_arguments['out_dir'], output_arguments['no_write'])
+def scan_progressive(results, target, nmap_arguments, ports, sudo=False):
+    """
+    Scans the hosts of target one by one, like nmap.PortScannerAsync, and puts
+    (host, scan_result) on the results queue for each of them.
+    """
+    nm = nmap.PortScanner()
+    for host in nm.listscan(target):
+        try:
+            scan_result = nm.scan(host, ports=ports, arguments=nmap_arguments, sudo=sudo)
+        except nmap.PortScannerError:
+            scan_result = None
+        results.put((host, scan_result))
 
-    nma = nmap.PortScannerAsync()
-    nma.scan(hosts=target, ports=ports, arguments=nmap_arguments, callback=callback_result, sudo=sudo)
-    return nma
+
+def scan(target, nmap_arguments, ports, results, sudo=False):
+    """
+    Starts scanning target in a child process, the results are sent back to
+    the main process so that all output is merged and written there.
+    """
+    scanner = multiprocessing.Process(
+        target=scan_progressive, args=(results, target, nmap_arguments, ports, sudo))
+    scanner.daemon = True
+    scanner.start()
+    return scanner
+
+
+def handle_result(host, scan_result, writer, no_write=False):
+    if VERBOSE:
+        logger.info('Finished scanning %s.' % host)
+    d = nerds_format(host, scan_result)
+    if d:
+        output(d, writer, no_write)
 
 
 def nerds_format(host, data):
@@ -115,22 +140,26 @@ def merge_nmap_services(d1, d2):
     return d2
 
 
-def output(d, out_dir, no_write=False):
+def output(d, writer, no_write=False):
     if no_write:
         print(json.dumps(d, sort_keys=True, indent=4))
     else:
-        save_to_json(d, out_dir, merge_nmap_services)
+        writer.write(d)
 
 
 def main():
     # User friendly usage output
     parser = argparse.ArgumentParser()
     parser.add_argument('-O', nargs='?', default='./json/', help='Path to output directory.')
+    parser.add_argument('--out-format', choices=['json', 'packed'], default='json',
+                        help='One JSON file per host, or a packed store in the output directory.')
     parser.add_argument('-N', action='store_true', default=False, help='Don\'t write output to disk.')
     parser.add_argument('--verbose', '-v', action='store_true', default=False)
     parser.add_argument('--sudo', action='store_true', default=False)
     parser.add_argument('--known', '-k', action='store_true', default=False,
                         help='Takes a list of known hosts with specified ports.')
+    parser.add_argument('--max-buffered', type=int, default=10000,
+                        help='Write host files early when more hosts than this are buffered.')
     parser.add_argument('--nmap-args', default='-PE -sV -sS -sU -O --osscan-guess --host-timeout 5m')
     parser.add_argument(
         '--list',
@@ -147,16 +176,19 @@ def main():
     if args.verbose:
         global VERBOSE
         VERBOSE = True
-    output_arguments = {
-        'out_dir': args.O,
-        'no_write': args.N
-    }
+    # All addresses of a host are merged in memory and its file written once at the end
+    writer = None
+    if not args.N and args.out_format == 'packed':
+        writer = PackWriter(args.O, merge_nmap_services)
+    elif not args.N:
+        writer = BufferedNerdsWriter(args.O, merge_nmap_services, max_buffered=args.max_buffered)
+    results = multiprocessing.Queue()
     nmap_arguments = os.environ.get('NMAP_ARGS', args.nmap_args)
     # nmap_arguments = '-PE -sV --host-timeout 10m'
     scanners = []
     if args.target:
         ports = None
-        scanners.append(scan(args.target, nmap_arguments, ports, output_arguments, args.sudo))
+        scanners.append(scan(args.target, nmap_arguments, ports, results, args.sudo))
     elif args.list:
         for target in args.list:
             if not args.known:
@@ -173,20 +205,41 @@ def main():
                     logger.info('http://nmap.org/book/man-port-specification.html')
                     continue
             if target and not target.startswith('#'):
-                scanners.append(scan(target, nmap_arguments, ports, output_arguments, args.sudo))
+                scanners.append(scan(target, nmap_arguments, ports, results, args.sudo))
                 time.sleep(10)  # Wait 10 seconds for a scanner to start
+                handle_results(results, writer, args.N)
     gc.collect()
     # Wait for the scanners to finish
     last_count = len(scanners)
     while scanners:
-        time.sleep(5)  # Check if scanners are done every minute
-        for scanner in scanners:
-            if not scanner.still_scanning():
-                scanners.remove(scanner)
-            time.sleep(1)  # Check a scanner every 1 seconds
+        handle_results(results, writer, args.N, timeout=5)
+        scanners = [scanner for scanner in scanners if scanner.is_alive()]
         if len(scanners) < last_count:
+            last_count = len(scanners)
             logger.info('%d scanners still scanning.' % len(scanners))
         gc.collect()
+    handle_results(results, writer, args.N)
+    if writer:
+        if args.out_format == 'packed':
+            writer.close()
+        else:
+            writer.flush()
+        metrics.save(args.O, 'nmap_services_py')
+
+
+def handle_results(results, writer, no_write=False, timeout=0):
+    """
+    Handles the scan results waiting in the queue, waiting at most timeout
+    seconds for the first one.
+    """
+    try:
+        host, scan_result = results.get(timeout=timeout) if timeout else results.get_nowait()
+        while True:
+            metrics.count('nmap.hosts')
+            handle_result(host, scan_result, writer, no_write)
+            host, scan_result = results.get_nowait()
+    except queue.Empty:
+        pass
 
 
 if __name__ == '__main__':
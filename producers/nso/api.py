@@ -1,44 +1,194 @@
 import base64
+import http.client
 import json
-from urllib.request import Request, urlopen
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nerds_utils import metrics  # noqa: E402
+from stream import iter_items  # noqa: E402
+
+# Statuses of a busy or restarting NSO, worth asking again
+RETRY_STATUSES = {502, 503, 504}
+# Bytes read from a response at a time
+CHUNK_SIZE = 64 * 1024
 
 
 class Api(object):
-    def __init__(self, url, user, password):
+    """
+    Client of the NSO REST api keeping its connections open between requests.
+
+    Connections are pooled so that threads sharing an Api each use one of
+    their own. Requests failing with a connection error or a status in
+    RETRY_STATUSES are retried retries times, backoff, 2 * backoff, ...
+    seconds apart. Other error statuses raise HTTPError, as urlopen did.
+    """
+    def __init__(self, url, user, password, max_requests=None, retries=2, backoff=0.5, timeout=None):
         self.url = url
         self.user = user
         self.password = password
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.authorization = self.auth()
+        # Idle connections, the last one used is the most likely to still be open
+        self.pool = queue.LifoQueue()
+        # Limits the requests in flight when the api is shared by threads
+        self.in_flight = threading.BoundedSemaphore(max_requests) if max_requests else nullcontext()
 
+    @metrics.timed('nso.get')
     def get(self, path, collection=False):
-        url = '{}{}'.format(self.url, path)
         accept = 'application/vnd.yang.data+json'
         if collection:
             accept = 'application/vnd.yang.collection+json'
-        headers = {
-            'Authorization': self.auth(),
-            'Accept': accept
-        }
-        with urlopen(Request(url, headers=headers)) as r:
-            try:
-                result = json.load(r)
-            except json.decoder.JSONDecodeError:
-                # Ignore
-                result = {}
-        return result
+        return self.request('GET', path, accept)[0]
 
+    @metrics.timed('nso.post')
     def post(self, path, data=None):
-        url = '{}{}'.format(self.url, path)
-        headers = {
-            'Authorization': self.auth(),
-            'Accept': 'application/vnd.yang.data+json',
-        }
-        with urlopen(Request(url, headers=headers, method='POST'), data=data) as r:
+        return self.request('POST', path, 'application/vnd.yang.data+json', data)[0]
+
+    @metrics.timed('nso.get')
+    def get_if_changed(self, path, validators=None):
+        """
+        GET with the If-None-Match and If-Modified-Since headers in validators.
+        Returns (reply, its ETag, its Last-Modified), reply None when NSO
+        answers 304 Not Modified.
+        """
+        result, response = self.request('GET', path, 'application/vnd.yang.data+json', headers=validators)
+        if response.status == 304:
+            return None, None, None
+        return result, response.getheader('ETag'), response.getheader('Last-Modified')
+
+    def get_items(self, path, items, collection=False):
+        """
+        Yields the items of the list at items, dotted keys into the reply, as
+        the reply is read, see stream.iter_items. Keeps memory down to one
+        item for replies too large to decode at once.
+        """
+        accept = 'application/vnd.yang.data+json'
+        if collection:
+            accept = 'application/vnd.yang.collection+json'
+        with metrics.timer('nso.stream'), self.in_flight:
+            connection, response = self.open('GET', path, accept)
+            try:
+                yield from iter_items(self.chunks(response), items)
+            finally:
+                self.release(connection, response)
+
+    def request(self, method, path, accept, data=None, headers=None):
+        """
+        Returns the decoded reply to a request and the response it came with.
+        """
+        with self.in_flight:
+            connection, response = self.open(method, path, accept, data, headers)
+            try:
+                body = b''.join(self.chunks(response))
+            finally:
+                self.release(connection, response)
+        try:
+            result = json.loads(body)
+        except json.decoder.JSONDecodeError:
+            # Ignore
+            result = {}
+        return result, response
+
+    def open(self, method, path, accept, data=None, headers=None):
+        """
+        Sends a request, retrying as needed, and returns the connection and
+        the response to read the body from. Give them back with release.
+        """
+        url = self.base_path + path
+        headers = dict(headers or {}, **{
+            'Authorization': self.authorization,
+            'Accept': accept,
+            'Accept-Encoding': 'gzip',
+        })
+        attempt = 0
+        while True:
+            try:
+                connection, response = self.send(method, url, data, headers)
+            except (http.client.HTTPException, OSError) as e:
+                error = e
+            else:
+                if response.status < 400:
+                    return connection, response
+                response.read()
+                self.release(connection, response)
+                error = HTTPError(self.url + path, response.status, response.reason, response.headers, None)
+                if response.status not in RETRY_STATUSES:
+                    raise error
+            if attempt >= self.retries:
+                raise error
+            metrics.count('nso.retries')
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    def chunks(self, response):
+        """
+        Yields the body of a response, decompressed, a chunk at a time.
+        """
+        gunzip = None
+        if response.getheader('Content-Encoding') == 'gzip':
+            gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            metrics.count('nso.bytes', len(chunk))
+            yield gunzip.decompress(chunk) if gunzip else chunk
+        if gunzip:
+            yield gunzip.flush()
+
+    def send(self, method, url, data, headers):
+        """
+        Sends a request on a pooled connection, returns the connection and its response.
+        """
+        while True:
+            try:
+                connection = self.pool.get_nowait()
+                reused = True
+            except queue.Empty:
+                connection = self.connection_class(self.netloc, timeout=self.timeout)
+                metrics.count('nso.connections')
+                reused = False
+            try:
+                connection.request(method, url, data, headers)
+                return connection, connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if reused:
+                    # NSO closed the connection while it was idle, not a failed request
+                    continue
+                raise
+
+    def release(self, connection, response):
+        """
+        Puts a connection back in the pool, unless its response was left unread.
+        """
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            self.pool.put(connection)
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+        while True:
             try:
-                result = json.load(r)
-            except json.decoder.JSONDecodeError:
-                # Ignore
-                result = {}
-        return result
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
 
     def auth(self):
         basic = '{}:{}'.format(self.user, self.password).encode('UTF-8')
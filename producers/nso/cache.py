@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('nso')
+
+# Bump when the parsers change what they produce from the same configuration,
+# so that output cached by an older version is fetched and parsed again.
+CACHE_VERSION = 1
+
+
+class CachedNerds(dict):
+    """
+    NERDS output found unchanged in the cache.
+    """
+    cached = True
+
+
+class PartialNerds(dict):
+    """
+    NERDS output missing data that could not be fetched, never cached.
+    """
+    partial = True
+
+
+class DeviceCache:
+    """
+    On-disk cache of the ETag and Last-Modified NSO sent with a device and the
+    output parsed from it, one <device>.json per device.
+
+    Devices are fetched with If-None-Match and If-Modified-Since, and a 304
+    Not Modified answer means the cached output is still good. Entries older
+    than max_age days are fetched in full again, the chassis inventory is not
+    part of the device configuration the validators cover.
+    """
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def lookup(self, device):
+        """
+        Returns the entry of device, None without one usable.
+        """
+        try:
+            with open(self._path(device)) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if entry.get('version') != CACHE_VERSION:
+            return None
+        if self.max_age is not None and time.time() - entry.get('stored', 0) > self.max_age * 86400:
+            return None
+        return entry
+
+    def validators(self, entry):
+        """
+        Returns the headers of a conditional request for the device of entry.
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, entry):
+        """
+        Returns the cached output of a device NSO found not modified, counting a hit.
+        """
+        self._count(hit=True)
+        return CachedNerds(entry['nerds'])
+
+    def store(self, device, etag, last_modified, nerds):
+        """
+        Stores the output parsed from a device fetched in full, counting a miss.
+        Partial output is not stored, it would be kept until the device changes.
+        """
+        self._count(hit=False)
+        if not (etag or last_modified) or not nerds or getattr(nerds, 'partial', False):
+            return
+        entry = {
+            'version': CACHE_VERSION,
+            'stored': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'nerds': nerds,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(device))
+        except IOError as e:
+            logger.error('Could not cache %s: %s', device, e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return 'Cache: {} hits, {} misses, {:.0%} hit rate.'.format(self.hits, self.misses, self.hit_rate())
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _path(self, device):
+        return os.path.join(self.path, device.replace('/', '_') + '.json')
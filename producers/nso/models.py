@@ -1,4 +1,6 @@
 class Equipment:
+    __slots__ = ('name', 'version', 'model', 'interfaces')
+
     def __init__(self):
         self.name = ''
         self.version = ''
@@ -6,31 +8,36 @@ class Equipment:
         self.interfaces = []
 
     def to_json(self):
-        j = vars(self).copy()
-        j['interfaces'] = [i.to_json() for i in self.interfaces]
-        return j
+        return {
+            'name': self.name,
+            'version': self.version,
+            'model': self.model,
+            'interfaces': [i.to_json() for i in self.interfaces],
+        }
 
 
 class Switch(Equipment):
-    pass
+    __slots__ = ()
 
 
 class Router(Equipment):
+    __slots__ = ('bgp_peerings', 'hardware')
+
     def __init__(self):
         super().__init__()
         self.bgp_peerings = []
         self.hardware = {}
 
     def to_json(self):
-        j = vars(self).copy()
-        j['interfaces'] = [i.to_json() for i in self.interfaces]
+        j = super().to_json()
         j['bgp_peerings'] = [p.to_json() for p in self.bgp_peerings]
-        if self.hardware:
-            j['hardware'] = self.hardware
+        j['hardware'] = self.hardware
         return j
 
 
 class Interface:
+    __slots__ = ('name', 'bundle', 'description', 'vlantagging', 'tunneldict', 'inactive', 'unitdict')
+
     def __init__(self):
         self.name = ''
         self.bundle = ''
@@ -38,9 +45,7 @@ class Interface:
         self.vlantagging = ''
         self.tunneldict = []
         self.inactive = False
-        # Unit dict is a list of dictionaries containing units to
-        # interfaces, should be index like {'unit': 'name',
-        # 'description': 'foo', 'vlanid': 'bar', 'address': 'xyz'}
+        # List of the Units of the interface
         self.unitdict = []
 
     def to_json(self):
@@ -50,12 +55,51 @@ class Interface:
             'description': self.description,
             'vlantagging': self.vlantagging,
             'tunnels': self.tunneldict,
-            'units': self.unitdict,
+            'units': [u.to_json() for u in self.unitdict],
             'inactive': self.inactive,
         }
 
 
+class Unit:
+    """
+    Logical unit of an Interface, readable like the dicts units used to be.
+    logical_system is only part of the JSON when set.
+    """
+    __slots__ = ('unit', 'description', 'vlanid', 'address', 'logical_system')
+
+    def __init__(self, unit=None, description=None, vlanid=None, address=None, logical_system=None):
+        self.unit = unit
+        self.description = description
+        self.vlanid = vlanid
+        self.address = address if address is not None else []
+        self.logical_system = logical_system
+
+    def __getitem__(self, key):
+        if key not in self.__slots__ or (key == 'logical_system' and not self.logical_system):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_json(self):
+        j = {
+            'unit': self.unit,
+            'description': self.description,
+            'vlanid': self.vlanid,
+            'address': self.address,
+        }
+        if self.logical_system:
+            j['logical_system'] = self.logical_system
+        return j
+
+
 class BgpPeering:
+    __slots__ = ('type', 'remote_address', 'description', 'local_address', 'group', 'as_number')
+
     def __init__(self):
         self.type = None
         self.remote_address = None
@@ -65,4 +109,11 @@ class BgpPeering:
         self.as_number = None
 
     def to_json(self):
-        return vars(self).copy()
+        return {
+            'type': self.type,
+            'remote_address': self.remote_address,
+            'description': self.description,
+            'local_address': self.local_address,
+            'group': self.group,
+            'as_number': self.as_number,
+        }
@@ -6,13 +6,17 @@ import logging
 import argparse
 import configparser
 import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from api import Api
+from cache import DeviceCache, PartialNerds
 from utils import find
 from parser import junos, arista
 import json
+import os
 import sys
 sys.path.append('../')
-from nerds_utils import to_nerds, save_to_json  # noqa: E402
+from nerds_utils import metrics, to_nerds, save_to_json  # noqa: E402
 
 logger = logging.getLogger('nso')
 logger.setLevel(logging.INFO)
@@ -22,42 +26,148 @@ formatter = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
 ch.setFormatter(formatter)
 logger.addHandler(ch)
 
+# What bulk mode selects of every device, see bulk_devices
+BULK_SELECT = ';'.join([
+    'name',
+    'address',
+    'config/junos:configuration/version',
+    'config/junos:configuration/interfaces(*)',
+    'config/junos:configuration/protocols/bgp(*)',
+    'config/junos:configuration/logical-systems(name;interfaces(*);protocols/bgp(*))',
+    'config/tailf-ned-arista-dcs:boot/system',
+    'config/tailf-ned-arista-dcs:interface/Ethernet(*)',
+])
 
-def junos_device_to_nerds(device, device_data, api):
-    chassis_data = None
+
+def fetch_all(calls, executor=None):
+    """
+    Runs independent api calls, {key: (function, arguments...)}, in parallel
+    on executor or one after the other without it.
+
+    Returns {key: result}, the exception of a call that failed is raised once all are done.
+    """
+    if executor is None:
+        return {key: call[0](*call[1:]) for key, call in calls.items()}
+    futures = {key: executor.submit(*call) for key, call in calls.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
+def get_chassis(api, device):
     try:
-        chassis_data = api.post('/devices/device/{}/rpc/jrpc:rpc-get-chassis-inventory/_operations/get-chassis-inventory'.format(device))
+        return api.post('/devices/device/{}/rpc/jrpc:rpc-get-chassis-inventory/_operations/get-chassis-inventory'.format(device))
     except Exception as e:
         logger.warning('Could not get chassis inventory for %s. Error: %s', device, e)
+    return None
+
 
-    router = junos.parse_router(device_data, chassis_data)
-    ifdata = api.get('/devices/device/{}/config/configuration/interfaces?deep'.format(device))
-    router.interfaces = junos.parse_interfaces(ifdata)
+def junos_device_to_nerds(device, device_data, api, executor=None):
+    data = fetch_all({
+        'chassis': (get_chassis, api, device),
+        'interfaces': (get_interfaces, api, device),
+        'bgp': (get_bgp_sessions, api, device),
+        # logical systems
+        'logical_interfaces': (api.get, '/devices/device/{}/config/configuration/logical-systems?select=name;interfaces(*)'.format(device), True),
+        'logical_bgp': (api.get, '/devices/device/{}/config/configuration/logical-systems?select=name;protocols/bgp(*)'.format(device), True),
+    }, executor)
+    out = junos_to_nerds(device, device_data, data)
+    # get_chassis logged the failure, the output is still written but not cached
+    return PartialNerds(out) if data['chassis'] is None else out
 
-    bgpdata = api.get('/devices/device/{}/config/configuration/protocols/bgp?deep'.format(device))
-    router.bgp_peerings = junos.parse_bgp_sessions(bgpdata)
 
-    # logical systems
-    logical_ifdata = api.get('/devices/device/{}/config/configuration/logical-systems?select=name;interfaces(*)'.format(device), collection=True)
-    junos.parse_logical_interfaces(logical_ifdata, router.interfaces)
+def get_interfaces(api, device):
+    # Interfaces are parsed as they are read, the reply can be tens of MB
+    items = api.get_items('/devices/device/{}/config/configuration/interfaces?deep'.format(device), 'junos:interfaces.interface')
+    return [junos.parse_interface(item) for item in items]
 
-    logical_bgpdata = api.get('/devices/device/{}/config/configuration/logical-systems?select=name;protocols/bgp(*)'.format(device), collection=True)
-    router.bgp_peerings += junos.parse_logical_bgp_sessions(logical_bgpdata)
 
+def get_bgp_sessions(api, device):
+    groups = api.get_items('/devices/device/{}/config/configuration/protocols/bgp?deep'.format(device), 'junos:bgp.group')
+    return junos.parse_bgp_groups(groups)
+
+
+def junos_to_nerds(device, device_data, data):
+    """
+    Builds the output of a router from its device data and data with the
+    chassis inventory, parsed interfaces and bgp peerings and logical systems.
+    """
+    router = junos.parse_router(device_data, data['chassis'])
+    router.interfaces = data['interfaces']
+    router.bgp_peerings = data['bgp']
+    junos.parse_logical_interfaces(data['logical_interfaces'], router.interfaces)
+    router.bgp_peerings += junos.parse_logical_bgp_sessions(data['logical_bgp'])
 
     if device not in router.name:
         logger.warning('%s ==> %s', device, router.name)
     return to_nerds(router.name, 'nso_juniper', router.to_json())
 
 
-def arista_device_to_nerds(device, device_data, api):
-    switch = arista.parse_switch(device_data)
+def arista_device_to_nerds(device, device_data, api, executor=None):
     ifdata = api.get('/devices/device/{}/config/interface?deep'.format(device))
+    return arista_to_nerds(device_data, ifdata)
+
+
+def arista_to_nerds(device_data, ifdata):
+    switch = arista.parse_switch(device_data)
     switch.interfaces = arista.parse_interfaces(ifdata)
 
     return to_nerds(switch.name, 'nso_arista', switch.to_json())
 
 
+def bulk_devices(api, devices, page_size):
+    """
+    Pages through the device collection of NSO, page_size devices per
+    request with only what the parsers need, and yields (device, entry) for
+    the devices asked for. Stops once all of them are found.
+    """
+    wanted = set(devices)
+    offset = 0
+    while wanted:
+        page = api.get('/devices/device?select={}&offset={}&limit={}'.format(BULK_SELECT, offset, page_size), collection=True)
+        entries = find('collection.tailf-ncs:device', page, default=[])
+        for entry in entries:
+            if entry.get('name') in wanted:
+                wanted.remove(entry['name'])
+                yield entry['name'], entry
+        if len(entries) < page_size:
+            break
+        offset += page_size
+
+
+def bulk_jobs(api, devices, page_size, paging_failed):
+    """
+    Yields (device, job) of the devices bulk_devices finds. A failing page
+    request is logged and ends the paging, with the error added to paging_failed.
+    """
+    try:
+        for device, entry in bulk_devices(api, devices, page_size):
+            yield device, partial(bulk_device_to_nerds, api, device, entry)
+    except Exception as e:
+        logger.error('Could not page through the devices of NSO: %s', e)
+        paging_failed.append(e)
+
+
+def bulk_device_to_nerds(api, device, entry, executor=None):
+    """
+    Converts a device of the device collection, in the shapes the per device
+    requests return. Only the chassis inventory, an rpc, is asked for per device.
+    """
+    device_data = {'tailf-ncs:device': entry}
+    if junos.is_junos(device_data):
+        configuration = find('config.junos:configuration', entry)
+        logical_systems = {'collection': {'junos:logical-systems': configuration.get('logical-systems', [])}}
+        return junos_to_nerds(device, device_data, {
+            'chassis': get_chassis(api, device),
+            'interfaces': [junos.parse_interface(item) for item in find('interfaces.interface', configuration, default=[])],
+            'bgp': junos.parse_bgp_groups(find('protocols.bgp.group', configuration, default=[])),
+            'logical_interfaces': logical_systems,
+            'logical_bgp': logical_systems,
+        })
+    elif arista.is_arista(device_data):
+        ifdata = {'tailf-ned-arista-dcs:interface': find('config.tailf-ned-arista-dcs:interface', entry, default={})}
+        return arista_to_nerds(device_data, ifdata)
+    return None
+
+
 def is_ipaddr(name):
     result = True
     try:
@@ -74,24 +184,97 @@ def out_nerds(nerds, out_dir, not_to_disk):
         save_to_json(nerds, out_dir, sort_keys=False)
 
 
-def process_devices(api, out_dir, not_to_disk, devices):
-    for device in devices:
-        # check if juniper
-        logger.info('Processing: %s', device)
+def device_to_nerds(api, device, executor=None, cache=None):
+    """
+    Fetches and converts a single device, safe to run in a worker thread.
+    Returns None for devices that are neither Junos nor Arista.
+
+    With a cache the device is fetched conditionally, and the CachedNerds of
+    a device NSO found not modified are returned without any further request.
+    """
+    if cache is None:
         device_data = api.get('/devices/device/' + device)
-        out = None
-        if junos.is_junos(device_data):
-            out = junos_device_to_nerds(device, device_data, api)
-        elif arista.is_arista(device_data):
-            out = arista_device_to_nerds(device, device_data, api)
-
-        if out:
-            if is_ipaddr(out['host']['name']):
-                logger.warning('Skipping - %s device name is an ip address (%s).', device, out['host']['name'])
+    else:
+        entry = cache.lookup(device)
+        validators = cache.validators(entry) if entry else None
+        device_data, etag, last_modified = api.get_if_changed('/devices/device/' + device, validators)
+        if device_data is None:
+            metrics.count('nso.cache_hits')
+            return cache.hit(entry)
+        metrics.count('nso.cache_misses')
+    out = None
+    if junos.is_junos(device_data):
+        out = junos_device_to_nerds(device, device_data, api, executor)
+    elif arista.is_arista(device_data):
+        out = arista_device_to_nerds(device, device_data, api, executor)
+    if cache is not None:
+        cache.store(device, etag, last_modified, out)
+    return out
+
+
+def process_devices(api, out_dir, not_to_disk, devices, workers=1, page_size=None, cache=None):
+    """
+    Fetches devices, workers at a time, with the requests of each device in
+    parallel as well when workers is above 1. With page_size the devices come
+    from paged requests of the device collection instead, see bulk_devices,
+    and the devices not found before a page request fails count as failed.
+    Output is written in the order the devices are fetched, from the calling
+    thread. A device failing is logged and does not stop the others. Returns
+    the devices that failed.
+
+    With a cache, see DeviceCache, devices NSO has not modified are neither
+    parsed nor written again if their output is still there. The cache is
+    not used for bulk requests.
+    """
+    devices = list(devices)
+    failed = []
+    paging_failed = []
+    device_executor = request_executor = None
+    if workers > 1:
+        device_executor = ThreadPoolExecutor(max_workers=workers)
+        # Every device waits on at most five requests of its own
+        request_executor = ThreadPoolExecutor(max_workers=workers * 5)
+    if page_size:
+        jobs = bulk_jobs(api, devices, page_size, paging_failed)
+    else:
+        jobs = ((device, partial(device_to_nerds, api, device, request_executor, cache)) for device in devices)
+    done = set()
+    try:
+        if device_executor:
+            jobs = [(device, device_executor.submit(job).result) for device, job in jobs]
+        for device, result in jobs:
+            logger.info('Processing: %s', device)
+            done.add(device)
+            try:
+                out = result()
+            except Exception as e:
+                logger.error('Could not process %s: %s', device, e)
+                failed.append(device)
                 continue
-            out_nerds(out, out_dir, not_to_disk)
-        else:
-            print('-', device)
+            if getattr(out, 'cached', False) and not not_to_disk and \
+                    os.path.exists(os.path.join(out_dir, out['host']['name'].lower() + '.json')):
+                logger.info('%s unchanged.', device)
+            elif out:
+                if is_ipaddr(out['host']['name']):
+                    logger.warning('Skipping - %s device name is an ip address (%s).', device, out['host']['name'])
+                    continue
+                out_nerds(out, out_dir, not_to_disk)
+            else:
+                print('-', device)
+    finally:
+        if device_executor:
+            device_executor.shutdown()
+            request_executor.shutdown()
+    for device in devices:
+        if device in done:
+            continue
+        # The paging failure is logged once, not for every device it left out
+        if not paging_failed:
+            logger.error('Could not process %s: not found in NSO', device)
+        failed.append(device)
+    if failed:
+        logger.warning('Failed devices: %s', ' '.join(failed))
+    return failed
 
 
 def get_devices(section, device_groups):
@@ -104,21 +287,26 @@ def get_devices(section, device_groups):
     return devices
 
 
-def main(config, section, out_dir, not_to_disk):
+def main(config, section, out_dir, not_to_disk, workers=1, max_requests=None, page_size=None, cache=None):
     base_url = config['nso']['url']
     api_user = config['nso']['user']
     api_password = config['nso']['password']
 
-    api = Api(base_url, api_user, api_password)
+    api = Api(base_url, api_user, api_password, max_requests,
+              retries=config['nso'].getint('retries', 2), backoff=config['nso'].getfloat('backoff', 0.5))
     device_groups = api.get('/devices/device-group?shallow', collection=True)
     device_groups = {dg['name']: dg['device-name'] for dg in find('collection.tailf-ncs:device-group', device_groups, default=[])}
 
     if config.has_section(section):
         devices = get_devices(config[section], device_groups)
         logger.debug('Processing %s: %s', section, devices)
-        process_devices(api, out_dir, not_to_disk, devices)
+        process_devices(api, out_dir, not_to_disk, devices, workers, page_size, cache)
     else:
         logger.error('Configuration does not have a %s section', section)
+    if cache:
+        logger.info(cache.summary())
+    if not not_to_disk:
+        metrics.save(out_dir, 'nso')
 
 
 if __name__ == '__main__':
@@ -140,6 +328,35 @@ if __name__ == '__main__':
         '--section',
         default='routers',
         help='What configuration section to use')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of devices to fetch in parallel, their requests run in parallel too.')
+    parser.add_argument(
+        '--max-requests',
+        type=int,
+        help='Maximum number of requests to NSO in flight at once.')
+
+    parser.add_argument(
+        '--bulk',
+        action='store_true',
+        help='Fetch the devices from the device collection, a page at a time, instead of one by one.')
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=100,
+        help='Devices per request in bulk mode.')
+
+    parser.add_argument(
+        '--cache-dir',
+        help='Cache the ETag of every device and its output in this directory, and fetch conditionally.')
+    parser.add_argument(
+        '--cache-max-age',
+        type=float,
+        default=7,
+        help='Fetch devices cached more than this many days ago in full, to refresh their chassis inventory '
+             '(default: 7).')
 
     args = parser.parse_args()
 
@@ -149,4 +366,6 @@ if __name__ == '__main__':
 
     if args.out:
         out_dir = args.out
-    main(config, args.section, out_dir, args.N)
+    cache = DeviceCache(args.cache_dir, args.cache_max_age) if args.cache_dir else None
+    main(config, args.section, out_dir, args.N, args.workers, args.max_requests, args.page_size if args.bulk else None,
+         cache)
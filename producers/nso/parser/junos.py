@@ -1,4 +1,4 @@
-from models import Interface, BgpPeering, Router
+from models import Interface, Unit, BgpPeering, Router
 from utils import find, find_first, find_all, hostname_clean
 
 
@@ -19,15 +19,13 @@ def parse_interface(item, logical_system=None):
 
 
 def parse_unit(item, logical_system=None):
-    unit = {
-        'unit': item['name'],
-        'description': item.get('description'),
-        'vlanid': item.get('vlan-id'),
-        'address': find_all('name', find_all('address', item)),
-    }
-    if logical_system:
-        unit['logical_system'] = logical_system
-    return unit
+    return Unit(
+        item['name'],
+        item.get('description'),
+        item.get('vlan-id'),
+        find_all('name', find_all('address', item)),
+        logical_system,
+    )
 
 
 def parse_interfaces(data):
@@ -64,14 +62,18 @@ def parse_bgp_group(group, peerings):
             peerings.append(peering)
 
 
-def parse_bgp_sessions(data):
+def parse_bgp_groups(groups):
     peerings = []
 
-    for group in find('junos:bgp.group', data, default=[]):
+    for group in groups:
         parse_bgp_group(group, peerings)
     return peerings
 
 
+def parse_bgp_sessions(data):
+    return parse_bgp_groups(find('junos:bgp.group', data, default=[]))
+
+
 def parse_logical_bgp_sessions(data):
     peerings = []
 
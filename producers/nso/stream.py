@@ -0,0 +1,145 @@
+"""
+Decodes the items of one list of a JSON document as it is read.
+
+    for interface in iter_items(chunks, 'junos:interfaces.interface'):
+        ...
+
+chunks is an iterable of bytes, e.g. the body of an HTTP response read a
+piece at a time. Only the item being decoded and the values passed over on
+the way to the list are held in memory, never the whole document. ijson is
+used when it is installed, json.JSONDecoder.raw_decode on a sliding buffer
+otherwise.
+"""
+import codecs
+import json
+import re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+decoder = json.JSONDecoder()
+
+
+def iter_items(chunks, path):
+    """
+    Yields the items of the list at path, dotted keys of nested objects.
+    Nothing is yielded when the document is empty, the path is missing or
+    does not lead to a list.
+    """
+    if ijson is not None:
+        return _ijson_items(chunks, path)
+    return _items(chunks, path.split('.'))
+
+
+def _ijson_items(chunks, path):
+    items = ijson.sendable_list()
+    coro = ijson.items_coro(items, path + '.item', use_float=True)
+    for chunk in chunks:
+        coro.send(chunk)
+        yield from items
+        del items[:]
+    coro.close()
+    yield from items
+
+
+class _Buffer:
+    """
+    Text decoded so far and where decoding is at, read on demand from chunks.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self, at_least=1):
+        """
+        Reads until at least at_least more characters are buffered or the
+        chunks run out, returns False if there was nothing more to read.
+        """
+        # Drops what has been decoded already
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        size = len(self.text)
+        while len(self.text) < size + at_least:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.text += self.utf8.decode(b'', final=True)
+                self.eof = True
+                break
+            self.text += self.utf8.decode(chunk)
+        return len(self.text) > size
+
+    def peek(self):
+        """
+        Returns the next character that is not whitespace, '' at the end.
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, characters):
+        c = self.peek()
+        if c not in characters or not c:
+            raise json.JSONDecodeError('Expecting one of ' + characters, self.text, self.pos)
+        self.pos += 1
+        return c
+
+    def value(self):
+        """
+        Decodes the next value, reading more while it is incomplete.
+
+        The buffer at least doubles on every read, so a large value costs a
+        few decode attempts rather than one per chunk.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.more(max(len(self.text) - self.pos, 1)):
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next chunk
+            if not self.eof and NUMBER_TAIL.match(self.text, end).end() == len(self.text) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def _items(chunks, keys):
+    buf = _Buffer(chunks)
+    if not buf.peek():
+        return
+    for key in keys:
+        if buf.peek() != '{':
+            return
+        buf.pos += 1
+        if buf.peek() == '}':
+            return
+        while True:
+            if buf.value() == key:
+                buf.expect(':')
+                break
+            buf.expect(':')
+            buf.value()
+            if buf.expect(',}') == '}':
+                return
+    if buf.peek() != '[':
+        return
+    buf.pos += 1
+    if buf.peek() == ']':
+        return
+    while True:
+        yield buf.value()
+        if buf.expect(',]') == ']':
+            return
@@ -0,0 +1,163 @@
+import gzip
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+from api import Api
+
+
+class StubNso(BaseHTTPRequestHandler):
+    """
+    Answers /api/running/<anything> with the path, the auth header and how
+    many requests came before on the same connection. fail_first requests
+    answer 503 first, /gzip answers compressed, /missing 404, /hangup
+    closes the connection after answering, /items answers a list and /etag
+    answers 304 to If-None-Match: "v1".
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes, do not let them wait for an ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            fail = server.fail_first > 0
+            server.fail_first -= 1
+        try:
+            time.sleep(server.delay)
+            self.requests_on_connection = getattr(self, 'requests_on_connection', 0) + 1
+            if fail:
+                return self.reply(503, b'')
+            if self.path.endswith('/missing'):
+                return self.reply(404, b'')
+            if self.path.endswith('/etag'):
+                if self.headers.get('If-None-Match') == '"v1"':
+                    return self.reply(304, b'')
+                return self.reply(200, b'{"device": 1}', {'ETag': '"v1"'})
+            if '/items' in self.path:
+                body = json.dumps({'data': {'item': [{'n': i} for i in range(20000)]}}).encode()
+                if self.path.endswith('/gzip'):
+                    return self.reply(200, gzip.compress(body), {'Content-Encoding': 'gzip'})
+                return self.reply(200, body)
+            body = json.dumps({
+                'path': self.path,
+                'auth': self.headers['Authorization'],
+                'on_connection': self.requests_on_connection,
+            }).encode()
+            if self.path.endswith('/gzip') and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                return self.reply(200, gzip.compress(body), {'Content-Encoding': 'gzip'})
+            self.reply(200, body)
+            if self.path.endswith('/hangup'):
+                # Like an idle timeout, without telling the client
+                self.close_connection = True
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    do_POST = do_GET
+
+    def reply(self, status, body, headers={}):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ApiTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubNso)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.fail_first = 0
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        url = 'http://127.0.0.1:{}/api/running'.format(self.server.server_address[1])
+        self.api = Api(url, 'user', 'password', backoff=0)
+
+    def tearDown(self):
+        self.api.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get(self):
+        result = self.api.get('/devices/device/r1')
+        self.assertEqual(result['path'], '/api/running/devices/device/r1')
+        self.assertEqual(result['auth'], 'Basic dXNlcjpwYXNzd29yZA==')
+
+    def test_connection_kept_alive(self):
+        self.api.get('/a')
+        self.api.post('/b')
+        self.assertEqual(self.api.get('/c')['on_connection'], 3)
+
+    def test_gzip(self):
+        self.assertEqual(self.api.get('/gzip')['path'], '/api/running/gzip')
+
+    def test_retry(self):
+        self.server.fail_first = 2
+        self.assertEqual(self.api.get('/a')['path'], '/api/running/a')
+        self.assertEqual(self.server.requests, 3)
+
+    def test_retries_exhausted(self):
+        self.server.fail_first = 3
+        with self.assertRaises(HTTPError) as e:
+            self.api.get('/a')
+        self.assertEqual(e.exception.code, 503)
+
+    def test_no_retry_for_client_errors(self):
+        with self.assertRaises(HTTPError) as e:
+            self.api.get('/missing')
+        self.assertEqual(e.exception.code, 404)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_idle_connection_closed_by_server(self):
+        self.api.get('/hangup')
+        self.assertEqual(self.api.get('/b')['on_connection'], 1)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_get_items(self):
+        for path in ['/items', '/items/gzip']:
+            items = list(self.api.get_items(path, 'data.item'))
+            self.assertEqual(items, [{'n': i} for i in range(20000)])
+        # Connections of replies read to the end are kept
+        self.assertEqual(self.api.get('/a')['on_connection'], 3)
+
+    def test_get_items_left_unread(self):
+        items = self.api.get_items('/items', 'data.item')
+        self.assertEqual(next(items), {'n': 0})
+        items.close()
+        self.assertEqual(self.api.get('/a')['on_connection'], 1)
+
+    def test_get_if_changed(self):
+        self.assertEqual(self.api.get_if_changed('/etag'), ({'device': 1}, '"v1"', None))
+        self.assertEqual(self.api.get_if_changed('/etag', {'If-None-Match': '"v1"'}), (None, None, None))
+        self.assertEqual(self.api.get_if_changed('/etag', {'If-None-Match': '"v0"'})[1], '"v1"')
+        # A 304 leaves the connection usable
+        self.assertEqual(self.api.get('/a')['on_connection'], 4)
+
+    def test_max_requests(self):
+        self.server.delay = 0.01
+        api = Api(self.api.url, 'user', 'password', max_requests=2)
+        threads = [threading.Thread(target=api.get, args=('/x',)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        api.close()
+        self.assertEqual(self.server.requests, 6)
+        self.assertEqual(self.server.max_in_flight, 2)
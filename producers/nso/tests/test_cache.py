@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import nso
+from cache import DeviceCache
+from tests.test_process_devices import FakeNso, arista_entry, junos_entry
+
+
+class ConditionalNso(FakeNso):
+    """
+    FakeNso answering device requests with an ETag per device, 304 when it matches.
+    """
+    def __init__(self, entries):
+        super().__init__(entries)
+        self.etags = {e['name']: '"1"' for e in entries}
+
+    def get_if_changed(self, path, validators=None):
+        device = path.split('/')[3]
+        if validators and validators.get('If-None-Match') == self.etags[device]:
+            self.requests += 1
+            return None, None, None
+        return self.get(path), self.etags[device], None
+
+
+class DeviceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out_dir = os.path.join(self.dir, 'json')
+        self.cache = DeviceCache(os.path.join(self.dir, 'cache'))
+        self.api = ConditionalNso([junos_entry('r1', 1), junos_entry('r2', 2), arista_entry('s1')])
+        self.devices = ['r1', 'r2', 's1']
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_devices(self, not_to_disk=False):
+        self.api.requests = 0
+        out = io.StringIO()
+        with redirect_stdout(out):
+            failed = nso.process_devices(self.api, self.out_dir, not_to_disk, self.devices, cache=self.cache)
+        self.assertEqual(failed, [])
+        return out.getvalue()
+
+    def output(self, name):
+        return os.path.join(self.out_dir, name + '.nordu.net.json')
+
+    def test_unchanged(self):
+        self.run_devices()
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 3))
+        os.utime(self.output('r1'), (0, 0))
+
+        self.run_devices()
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 3))
+        # One conditional request per device and nothing written
+        self.assertEqual(self.api.requests, 3)
+        self.assertEqual(os.stat(self.output('r1')).st_mtime, 0)
+        self.assertEqual(self.cache.summary(), 'Cache: 3 hits, 3 misses, 50% hit rate.')
+
+    def test_changed(self):
+        self.run_devices()
+        self.api.etags['r2'] = '"2"'
+        self.run_devices()
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+        # r2 in full, with its chassis inventory
+        self.assertEqual(self.api.requests, 2 + 6)
+
+    def test_output_missing(self):
+        self.run_devices()
+        os.remove(self.output('r1'))
+        self.run_devices()
+        self.assertEqual(self.cache.hits, 3)
+        self.assertTrue(os.path.exists(self.output('r1')))
+
+    def test_not_to_disk(self):
+        printed = self.run_devices(not_to_disk=True)
+        self.assertEqual(self.run_devices(not_to_disk=True), printed)
+        self.assertEqual(self.cache.hits, 3)
+
+    def model(self, name):
+        with open(self.output(name)) as f:
+            return json.load(f)['host']['nso_juniper']['model']
+
+    def test_chassis_failure_not_cached(self):
+        with mock.patch.object(self.api, 'post', side_effect=IOError('rpc failed')):
+            with self.assertLogs('nso', 'WARNING'):
+                self.run_devices()
+        self.assertEqual(self.model('r1'), '')
+        self.run_devices()
+        # The routers are fetched in full again, the switch is a hit
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.model('r1'), 'MX480')
+
+    def test_max_age(self):
+        self.run_devices()
+        self.cache.max_age = 0
+        self.run_devices()
+        self.assertEqual(self.cache.hits, 0)
@@ -36,3 +36,13 @@ class FindTest(unittest.TestCase):
         data = {}
 
         self.assertEqual(find('test.hest', data), None)
+
+    def test_not_a_dict(self):
+        data = {
+            'test': ['hest'],
+            'best': 'hest',
+        }
+
+        self.assertEqual(find('test.hest', data), None)
+        self.assertEqual(find('best.hest', data, default='-'), '-')
+        self.assertEqual(find('best.hest.test', {'best': None}), None)
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import unittest
-from utils import find_all
+import random
+import sys
+import utils
+from utils import find_all, find_first, iter_all
 
 
 class FindAllTest(unittest.TestCase):
@@ -20,3 +23,88 @@ class FindAllTest(unittest.TestCase):
             'hest': 3,
         }
         self.assertEqual(set(find_all('hest', data)), set([1, 2, 3]))
+
+    def test_order(self):
+        def recursive(what, data, result):
+            # find_all as it was before it stopped recursing
+            if isinstance(data, list):
+                for v in data:
+                    recursive(what, v, result)
+            if isinstance(data, dict):
+                for k, v in data.items():
+                    if k == what:
+                        result.append(v)
+                    else:
+                        recursive(what, v, result)
+            return result
+
+        rnd = random.Random(1)
+
+        def payload(depth):
+            if depth == 0 or rnd.random() < 0.2:
+                return rnd.randint(0, 100)
+            if rnd.random() < 0.3:
+                return [payload(depth - 1) for _ in range(rnd.randint(0, 4))]
+            return {rnd.choice('abcdef'): payload(depth - 1) for _ in range(rnd.randint(0, 4))}
+
+        for _ in range(50):
+            data = payload(8)
+            self.assertEqual(find_all('a', data), recursive('a', data, []))
+
+    def test_deep(self):
+        depth = sys.getrecursionlimit() * 2
+        data = {'name': 'bottom'}
+        for i in range(depth):
+            data = {'name': i, 'unit': [data]} if i % 2 else {'family': data}
+        self.assertEqual(len(find_all('name', data)), depth // 2 + 1)
+        self.assertEqual(find_first('name', data), depth - 1)
+
+    def test_max_depth(self):
+        data = {'a': 1, 'b': {'a': 2, 'c': [{'a': 3}]}}
+        self.assertEqual(find_all('a', data, max_depth=1), [1])
+        self.assertEqual(find_all('a', data, max_depth=2), [1, 2])
+        self.assertEqual(find_all('a', data, max_depth=4), [1, 2, 3])
+        self.assertEqual(find_first('a', data['b']['c'], max_depth=1), None)
+        for max_depth in [0, -1]:
+            with self.assertRaises(ValueError):
+                find_all('a', data, max_depth=max_depth)
+            with self.assertRaises(ValueError):
+                find_first('a', data, max_depth=max_depth)
+            with self.assertRaises(ValueError):
+                list(iter_all('a', data, max_depth))
+
+    def test_past_recursion_depth(self):
+        # Across the switch from recursion to iter_all
+        depth = utils.RECURSION_DEPTH * 2
+        data = {'a': 'bottom'}
+        for i in range(depth):
+            data = [{'a': i}, data] if i % 2 else {'b': data, 'a': -i}
+        expected = list(iter_all('a', data))
+        self.assertEqual(find_all('a', data), expected)
+        self.assertEqual(find_first('a', data[1]), expected[1])
+        for max_depth in [1, depth // 2, utils.RECURSION_DEPTH + 1, depth + 1]:
+            self.assertEqual(find_all('a', data, max_depth=max_depth), list(iter_all('a', data, max_depth)))
+        self.assertEqual(find_first('a', data[1]['b']), next(iter_all('a', data[1]['b'])))
+        # Only found past the switch
+        data = {'a': 'bottom'}
+        for i in range(depth):
+            data = {'b': data}
+        self.assertEqual(find_first('a', data), 'bottom')
+        self.assertEqual(find_first('a', data, max_depth=depth + 1), 'bottom')
+        self.assertEqual(find_first('a', data, max_depth=depth, default='-'), '-')
+
+    def test_result(self):
+        result = ['x']
+        self.assertIs(find_all('a', {'a': 1, 'b': [{'a': 2}]}, result), result)
+        self.assertEqual(result, ['x', 1, 2])
+
+    def test_find_first_stops(self):
+        class Poison(dict):
+            def items(self):
+                raise AssertionError('looked past the first match')
+
+        data = {'x': {'bundle': 'ae0'}, 'y': Poison(bundle='ae1')}
+        self.assertEqual(find_first('bundle', data), 'ae0')
+        self.assertEqual(find_first('missing', {'x': 1}, default='-'), '-')
+        # Falsy values are found too
+        self.assertEqual(find_first('bundle', {'bundle': ''}, default=None), '')
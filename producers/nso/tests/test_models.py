@@ -0,0 +1,43 @@
+import json
+import unittest
+from models import Router, Switch, Interface, BgpPeering
+from parser import junos
+
+
+class ModelsTest(unittest.TestCase):
+    def test_router_json(self):
+        router = Router()
+        router.name = 'r1'
+        router.interfaces = [Interface()]
+        router.bgp_peerings = [BgpPeering()]
+        j = router.to_json()
+        self.assertEqual(list(j), ['name', 'version', 'model', 'interfaces', 'bgp_peerings', 'hardware'])
+        self.assertEqual(list(j['interfaces'][0]), [
+            'name', 'bundle', 'description', 'vlantagging', 'tunnels', 'units', 'inactive'])
+        self.assertEqual(list(j['bgp_peerings'][0]), [
+            'type', 'remote_address', 'description', 'local_address', 'group', 'as_number'])
+        self.assertEqual(j['hardware'], {})
+
+    def test_switch_json(self):
+        self.assertEqual(list(Switch().to_json()), ['name', 'version', 'model', 'interfaces'])
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Router().typo = 'x'
+
+    def test_unit(self):
+        item = {'name': '10', 'vlan-id': '10', 'family': {'inet': unit_addr('10.0.0.1/31')}}
+        unit = junos.parse_unit(item)
+        self.assertEqual(unit['vlanid'], '10')
+        self.assertEqual(unit.get('logical_system'), None)
+        self.assertRaises(KeyError, lambda: unit['logical_system'])
+        self.assertEqual(json.dumps(unit.to_json()), json.dumps({
+            'unit': '10', 'description': None, 'vlanid': '10', 'address': ['10.0.0.1/31']}))
+
+        unit = junos.parse_unit(item, logical_system='ls1')
+        self.assertEqual(unit['logical_system'], 'ls1')
+        self.assertEqual(unit.to_json()['logical_system'], 'ls1')
+
+
+def unit_addr(*cidr):
+    return {'address': [{'name': a} for a in cidr]}
@@ -0,0 +1,223 @@
+import io
+import json
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+
+import nso
+from utils import find
+
+
+def junos_device(name):
+    return {
+        'tailf-ncs:device': {
+            'name': name,
+            'address': name + '.nordu.net',
+            'config': {'junos:configuration': {}},
+        }
+    }
+
+
+class FakeApi(object):
+    """
+    Answers every device as Junos with a delay, fails for the devices in failing.
+    """
+    def __init__(self, failing=(), delay=0.01):
+        self.failing = set(failing)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, path):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            device = path.split('/')[3]
+            if device in self.failing:
+                raise IOError('HTTP Error 500')
+            if path.count('/') == 3:
+                return junos_device(device)
+            return {}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def get(self, path, collection=False):
+        return self.request(path)
+
+    def get_items(self, path, items, collection=False):
+        return iter(find(items, self.request(path), default=[]))
+
+    def post(self, path, data=None):
+        return self.request(path)
+
+
+def run(api, devices, workers):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        failed = nso.process_devices(api, None, True, devices, workers)
+    decoder = json.JSONDecoder()
+    text = out.getvalue().strip()
+    names = []
+    while text:
+        nerds, end = decoder.raw_decode(text)
+        names.append(nerds['host']['name'])
+        text = text[end:].strip()
+    return names, failed
+
+
+class ProcessDevicesTest(unittest.TestCase):
+    devices = ['r{}'.format(i) for i in range(8)]
+
+    def test_same_output_as_sequential(self):
+        sequential = run(FakeApi(), self.devices, workers=1)
+        concurrent = run(FakeApi(), self.devices, workers=4)
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual(concurrent[0], [d + '.nordu.net' for d in self.devices])
+
+    def test_requests_run_in_parallel(self):
+        api = FakeApi()
+        run(api, self.devices, workers=4)
+        # The sub-requests of a device are in flight together
+        self.assertGreater(api.max_in_flight, 4)
+
+    def test_failing_device_isolated(self):
+        with self.assertLogs('nso', 'ERROR'):
+            names, failed = run(FakeApi(failing=['r3']), self.devices, workers=4)
+        self.assertEqual(failed, ['r3'])
+        self.assertEqual(len(names), 7)
+        self.assertNotIn('r3.nordu.net', names)
+
+
+def junos_entry(name, i):
+    return {
+        'name': name,
+        'address': name + '.nordu.net',
+        'config': {'junos:configuration': {
+            'version': '18.1R3',
+            'interfaces': {'interface': [
+                {'name': 'xe-0/0/{}'.format(i), 'description': 'to ' + name, 'unit': [
+                    {'name': '0', 'family': {'inet': {'address': [{'name': '10.0.{}.1/31'.format(i)}]}}},
+                ]},
+            ]},
+            'protocols': {'bgp': {'group': [
+                {'name': 'peers', 'type': 'external', 'neighbor': [{'name': '10.0.{}.0'.format(i), 'peer-as': 65000 + i}]},
+            ]}},
+            'logical-systems': [
+                {'name': 'ls1', 'interfaces': {'interface': [{'name': 'ae0', 'unit': [{'name': '{}'.format(i)}]}]},
+                 'protocols': {'bgp': {'group': [{'name': 'ls-peers', 'neighbor': [{'name': '10.1.{}.0'.format(i)}]}]}}},
+            ],
+        }},
+    }
+
+
+def arista_entry(name):
+    return {
+        'name': name,
+        'address': name + '.nordu.net',
+        'config': {
+            'tailf-ned-arista-dcs:boot': {'system': 'flash:/EOS-4.20.5F-INT.swi'},
+            'tailf-ned-arista-dcs:interface': {'Ethernet': [{'name': '1', 'description': 'uplink'}]},
+        },
+    }
+
+
+class FakeNso(object):
+    """
+    Answers the per device requests and the paged device collection from the same devices.
+    """
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_name = {e['name']: e for e in entries}
+        self.requests = 0
+
+    def get(self, path, collection=False):
+        self.requests += 1
+        if path.startswith('/devices/device?'):
+            query = dict(p.split('=', 1) for p in path.split('?', 1)[1].split('&'))
+            offset, limit = int(query['offset']), int(query['limit'])
+            return {'collection': {'tailf-ncs:device': self.entries[offset:offset + limit]}}
+        parts = path.split('?')[0].split('/')
+        entry = self.by_name[parts[3]]
+        if len(parts) == 4:
+            return {'tailf-ncs:device': entry}
+        configuration = entry['config'].get('junos:configuration', {})
+        if parts[-1] == 'bgp':
+            return {'junos:bgp': configuration['protocols']['bgp']}
+        if parts[-1] == 'logical-systems':
+            return {'collection': {'junos:logical-systems': configuration['logical-systems']}}
+        if parts[-2] == 'configuration':
+            return {'junos:interfaces': configuration['interfaces']}
+        return {'tailf-ned-arista-dcs:interface': entry['config']['tailf-ned-arista-dcs:interface']}
+
+    def get_items(self, path, items, collection=False):
+        return iter(find(items, self.get(path), default=[]))
+
+    def post(self, path, data=None):
+        self.requests += 1
+        return {'junos-rpc:output': {'chassis-inventory': {'chassis': {'description': 'MX480'}}}}
+
+
+def run_nerds(api, devices, workers=1, page_size=None):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        failed = nso.process_devices(api, None, True, devices, workers, page_size)
+    decoder = json.JSONDecoder()
+    text = out.getvalue().strip()
+    nerds = {}
+    while text:
+        doc, end = decoder.raw_decode(text)
+        nerds[doc['host']['name']] = doc
+        text = text[end:].strip()
+    return nerds, failed
+
+
+class BulkTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [junos_entry('r{}'.format(i), i) for i in range(10)] + [arista_entry('s1')]
+        self.devices = ['r{}'.format(i) for i in range(0, 10, 2)] + ['s1']
+
+    def test_same_output_as_per_device(self):
+        per_device, _ = run_nerds(FakeNso(self.entries), self.devices)
+        bulk, failed = run_nerds(FakeNso(self.entries), self.devices, page_size=4)
+        self.assertEqual(failed, [])
+        self.assertEqual(bulk, per_device)
+        router = bulk['r2.nordu.net']['host']['nso_juniper']
+        self.assertEqual(router['model'], 'MX480')
+        self.assertEqual(len(router['bgp_peerings']), 2)
+        self.assertEqual([i['name'] for i in router['interfaces']], ['xe-0/0/2', 'ae0'])
+
+    def test_request_count(self):
+        api = FakeNso(self.entries)
+        run_nerds(api, self.devices, page_size=4)
+        # Three pages and a chassis inventory per router
+        self.assertEqual(api.requests, 3 + 5)
+
+    def test_stops_when_all_found(self):
+        api = FakeNso(self.entries)
+        run_nerds(api, ['r1'], page_size=4)
+        self.assertEqual(api.requests, 1 + 1)
+
+    def test_missing_device(self):
+        with self.assertLogs('nso', 'ERROR'):
+            nerds, failed = run_nerds(FakeNso(self.entries), ['r1', 'gone'], workers=2, page_size=4)
+        self.assertEqual(list(nerds), ['r1.nordu.net'])
+        self.assertEqual(failed, ['gone'])
+
+    def test_page_failure(self):
+        class FailingPage(FakeNso):
+            def get(self, path, collection=False):
+                if 'offset=4&' in path:
+                    raise IOError('page failed')
+                return FakeNso.get(self, path, collection)
+
+        for workers in [1, 2]:
+            with self.assertLogs('nso', 'ERROR') as logs:
+                nerds, failed = run_nerds(FailingPage(self.entries), self.devices, workers=workers, page_size=4)
+            self.assertEqual(sorted(nerds), ['r0.nordu.net', 'r2.nordu.net'])
+            self.assertEqual(failed, ['r4', 'r6', 'r8', 's1'])
+            self.assertEqual(len([r for r in logs.records if r.levelname == 'ERROR']), 1)
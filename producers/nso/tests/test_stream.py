@@ -0,0 +1,60 @@
+import json
+import unittest
+from unittest import mock
+
+import stream
+from stream import iter_items
+
+
+def chunked(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterItemsTest(unittest.TestCase):
+    document = {
+        'junos:interfaces': {
+            'comment': 'a "quoted" }{][ string with \\ and ünïcödé',
+            'count': 123456789,
+            'skipped': {'interface': [{'name': 'not this one'}], 'numbers': [1.5, -2e10, True, None]},
+            'interface': [
+                {'name': 'xe-0/0/{}'.format(i), 'description': 'link {} – ”{}”'.format(i, i), 'mtu': 9000 + i}
+                for i in range(20)
+            ],
+            'after': [1, 2, 3],
+        }
+    }
+
+    def items(self, document, path, size):
+        with mock.patch.object(stream, 'ijson', None):
+            return list(iter_items(chunked(document, size), path))
+
+    def test_chunk_sizes(self):
+        expected = self.document['junos:interfaces']['interface']
+        for indent in [None, 2]:
+            text = json.dumps(self.document, indent=indent, ensure_ascii=False)
+            for size in [1, 3, 7, 64, 100000]:
+                self.assertEqual(self.items(text, 'junos:interfaces.interface', size), expected, (indent, size))
+
+    def test_numbers(self):
+        text = json.dumps({'list': [123456789, 1.25e-7, -1, 0]})
+        for size in [1, 2, 5]:
+            self.assertEqual(self.items(text, 'list', size), [123456789, 1.25e-7, -1, 0])
+
+    def test_missing(self):
+        self.assertEqual(self.items('', 'a.b', 4), [])
+        self.assertEqual(self.items('{}', 'a.b', 4), [])
+        self.assertEqual(self.items('{"a": {"c": [1]}}', 'a.b', 4), [])
+        self.assertEqual(self.items('{"a": {"b": {"c": 1}}}', 'a.b', 4), [])
+        self.assertEqual(self.items('{"a": {"b": []}}', 'a.b', 4), [])
+
+    def test_lazy(self):
+        chunks = iter(chunked(json.dumps({'a': [{'n': i} for i in range(1000)]}), 16))
+        with mock.patch.object(stream, 'ijson', None):
+            items = iter_items(chunks, 'a')
+            self.assertEqual(next(items), {'n': 0})
+        self.assertTrue(next(chunks, None))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.items('{"a": [{"n": 1}, {"n": }]}', 'a', 4)
@@ -1,35 +1,145 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def compile_path(what, delimiter='.'):
+    """
+    Returns the keys of a path like 'config.junos:configuration.version',
+    split once per path and delimiter.
+    """
+    return tuple(what.split(delimiter))
+
+
 def find(what, data, delimiter='.', default=None):
-    paths = what.split(delimiter)
     elm = data
-    for p in paths:
-        if p not in elm:
-            elm = default
-            break
-        elm = elm[p]
+    for p in compile_path(what, delimiter):
+        try:
+            elm = elm[p]
+        except (KeyError, TypeError, IndexError):
+            return default
     return elm
 
 
-def find_first(what, data, default=None):
-    result = find_all(what, data)
-    if result:
-        return result[0]
-    else:
+# How many dicts and lists deep find_all and find_first recurse before
+# handing the rest of the walk to iter_all
+RECURSION_DEPTH = 50
+_MISSING = object()
+
+
+def find_first(what, data, default=None, max_depth=None):
+    """
+    Returns the first value find_all would, without looking any further.
+    """
+    levels = -1 if max_depth is None else _levels(max_depth)
+    if not (isinstance(data, dict) or isinstance(data, list)):
         return default
+    found = _find_first(what, data, levels, RECURSION_DEPTH)
+    return default if found is _MISSING else found
 
 
-def find_all(what, data, result=None):
+def find_all(what, data, result=None, max_depth=None):
+    """
+    Returns the values of every what key in data, depth first in the order of
+    data, appended to result if given. See iter_all.
+    """
+    levels = -1 if max_depth is None else _levels(max_depth)
     if result is None:
         result = []
-    if isinstance(data, list):
-        for v in data:
-            find_all(what, v, result)
+    if isinstance(data, dict) or isinstance(data, list):
+        _find_all(what, data, result, levels, RECURSION_DEPTH)
+    return result
+
+
+def _levels(max_depth):
+    # Levels left to look into, counting down from -1 never reaches 0
+    if max_depth is None:
+        return -1
+    if max_depth < 1:
+        raise ValueError('max_depth must be at least 1, not {}'.format(max_depth))
+    return max_depth
+
+
+def _find_all(what, data, result, levels, budget):
+    if not budget:
+        result.extend(iter_all(what, data, levels if levels > 0 else None))
+        return
+    levels -= 1
+    # Two isinstance calls are faster than one with a tuple of types
     if isinstance(data, dict):
         for k, v in data.items():
             if k == what:
                 result.append(v)
+            elif levels and (isinstance(v, dict) or isinstance(v, list)):
+                _find_all(what, v, result, levels, budget - 1)
+    else:
+        for v in data:
+            if levels and (isinstance(v, dict) or isinstance(v, list)):
+                _find_all(what, v, result, levels, budget - 1)
+
+
+def _find_first(what, data, levels, budget):
+    if not budget:
+        return next(iter_all(what, data, levels if levels > 0 else None), _MISSING)
+    levels -= 1
+    if isinstance(data, dict):
+        for k, v in data.items():
+            if k == what:
+                return v
+            if levels and (isinstance(v, dict) or isinstance(v, list)):
+                found = _find_first(what, v, levels, budget - 1)
+                if found is not _MISSING:
+                    return found
+    else:
+        for v in data:
+            if levels and (isinstance(v, dict) or isinstance(v, list)):
+                found = _find_first(what, v, levels, budget - 1)
+                if found is not _MISSING:
+                    return found
+    return _MISSING
+
+
+def iter_all(what, data, max_depth=None):
+    """
+    Yields the values of every what key in data, depth first in the order of
+    data. Values of what keys are not looked into. max_depth limits how many
+    dicts and lists deep to look, 1 for the keys of data only.
+
+    Walks data with a stack of iterators instead of recursion, so deep data
+    can not hit the recursion limit. find_all and find_first recurse, which
+    is faster, and only walk what is nested deeper than RECURSION_DEPTH this way.
+    """
+    limit = _levels(max_depth) - 1
+    if isinstance(data, dict):
+        it, keyed = iter(data.items()), True
+    elif isinstance(data, list):
+        it, keyed = iter(data), False
+    else:
+        return
+    stack = []
+    while True:
+        child = None
+        if keyed:
+            for k, v in it:
+                if k == what:
+                    yield v
+                elif isinstance(v, (dict, list)) and len(stack) != limit:
+                    child = v
+                    break
+        else:
+            for v in it:
+                if isinstance(v, (dict, list)) and len(stack) != limit:
+                    child = v
+                    break
+        if child is None:
+            if not stack:
+                return
+            it, keyed = stack.pop()
+        else:
+            stack.append((it, keyed))
+            if isinstance(child, dict):
+                it, keyed = iter(child.items()), True
             else:
-                find_all(what, v, result)
-    return result
+                it, keyed = iter(child), False
 
 
 def hostname_clean(host):
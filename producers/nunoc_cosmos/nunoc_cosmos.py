@@ -6,7 +6,8 @@ import subprocess
 import sys
 sys.path.append('../')
 from nerds_utils.nerds import to_nerds
-from nerds_utils.file import save_to_json
+from nerds_utils.file import NerdsWriter
+from nerds_utils import metrics
 # Input nunco_repo_path
 #   Globs dirs in root
 
@@ -37,29 +38,32 @@ def main(nunoc_path, out_path):
             if 'sunet_iaas_cloud' in v:
                 hosts.update([clean_name(host) for host in regex_check(k, potential_hosts)])
     # for each host lookup ip
-    for host in hosts:
-        try:
-            out = subprocess.check_output(['host', host]).decode('utf-8')
-        except subprocess.CalledProcessError:
-            out = ''
+    with NerdsWriter(out_path) as writer:
+        for host in hosts:
+            try:
+                with metrics.timer('dns.lookup'):
+                    out = subprocess.check_output(['host', host]).decode('utf-8')
+            except subprocess.CalledProcessError:
+                out = ''
 
-        ipv4_match = ipv4_re.search(out)
-        ipv6_match = ipv6_re.search(out)
-        addresses = []
-        if ipv4_match:
-            addresses.append(ipv4_match.group(1))
-        if ipv6_match:
-            addresses.append(ipv6_match.group(1))
+            ipv4_match = ipv4_re.search(out)
+            ipv6_match = ipv6_re.search(out)
+            addresses = []
+            if ipv4_match:
+                addresses.append(ipv4_match.group(1))
+            if ipv6_match:
+                addresses.append(ipv6_match.group(1))
 
-        nerds = to_nerds(
-            host,
-            'nunoc_cosmos',
-            {
-                'addresses': addresses,
-                'sunet_iaas': True,
-                'managed_by': 'Puppet',
-            })
-        save_to_json(nerds, out_path)
+            nerds = to_nerds(
+                host,
+                'nunoc_cosmos',
+                {
+                    'addresses': addresses,
+                    'sunet_iaas': True,
+                    'managed_by': 'Puppet',
+                })
+            writer.write(nerds)
+    metrics.save(out_path, 'nunoc_cosmos')
 
 
 def cli():
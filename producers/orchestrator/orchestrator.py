@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Runs the NERDS producers of a run, the independent ones in parallel, and
+merges their output.
+
+    orchestrator.py -C orchestrator.conf [-O /path/to/repo] [producer ...]
+
+Producers are the directories next to this one with a run.sh, or sections of
+the configuration with a command. Every configured producer runs once, as soon
+as the producers it comes after are done and a slot of its resource class
+(ssh, snmp, http, scan or local) is free. Producers running past their timeout
+are killed. The output of each producer goes to <log dir>/<producer>.log.
+"""
+import argparse
+import logging
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from configparser import ConfigParser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nerds_utils import merge as nerds_merge  # noqa: E402
+
+logger = logging.getLogger('orchestrator')
+logger.setLevel(logging.INFO)
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatter = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
+ch.setFormatter(formatter)
+logger.addHandler(ch)
+
+PRODUCERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a producer mostly waits on, unless its section says otherwise
+RESOURCE_CLASSES = {
+    'juniper_conf': 'ssh',
+    'ssh_cmd': 'ssh',
+    'alcatel_isis': 'ssh',
+    'raritan_snmp': 'snmp',
+    'SU_CiscoSNMP': 'snmp',
+    'nso': 'http',
+    'nagiosxi_api': 'http',
+    'checkmk_livestatus': 'http',
+    'nmap_services': 'scan',
+    'nmap_services_py': 'scan',
+}
+DEFAULT_CLASS = 'local'
+DEFAULT_LIMITS = {'ssh': 4, 'snmp': 8, 'http': 4, 'scan': 1, 'local': 4}
+DEFAULT_TIMEOUT = 3600
+# Seconds between SIGTERM and SIGKILL of a producer past its timeout
+KILL_GRACE = 10
+NOT_PRODUCERS = {'orchestrator', 'merge_nerds'}
+
+
+class Producer:
+    __slots__ = ('name', 'command', 'cwd', 'resource', 'timeout', 'after')
+
+    def __init__(self, name, command, cwd, resource=DEFAULT_CLASS, timeout=DEFAULT_TIMEOUT, after=()):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.resource = resource
+        self.timeout = timeout
+        self.after = list(after)
+
+
+class Result:
+    __slots__ = ('name', 'status', 'returncode', 'seconds', 'log')
+
+    def __init__(self, name, status, returncode=None, seconds=0.0, log=None):
+        self.name = name
+        # ok, failed, timeout or error when it could not be started
+        self.status = status
+        self.returncode = returncode
+        self.seconds = seconds
+        self.log = log
+
+
+def discover(producers_dir=PRODUCERS_DIR):
+    """
+    Returns {producer name: path of its run.sh}.
+    """
+    found = {}
+    for name in sorted(os.listdir(producers_dir)):
+        run_sh = os.path.join(producers_dir, name, 'run.sh')
+        if name not in NOT_PRODUCERS and os.path.isfile(run_sh):
+            found[name] = run_sh
+    return found
+
+
+def run_sh_command(run_sh):
+    if os.access(run_sh, os.X_OK):
+        return [run_sh]
+    return ['/bin/sh', run_sh]
+
+
+def load_producers(config, repo, producers_dir=PRODUCERS_DIR):
+    """
+    Returns the producers configured in config, in configuration order.
+
+    A section is a producer, with args for its run.sh (by default -O {repo}),
+    or a command replacing run.sh and args. {repo} is replaced by the output
+    repository in both.
+    """
+    found = discover(producers_dir)
+    producers = []
+    for name in config.sections():
+        if name in ('orchestrator', 'limits'):
+            continue
+        section = config[name]
+        if not section.getboolean('enabled', True):
+            continue
+        if 'command' in section:
+            command = shlex.split(section['command'])
+        elif name in found:
+            command = run_sh_command(found[name]) + shlex.split(section.get('args', '-O {repo}'))
+        else:
+            raise ValueError('No run.sh found for producer {} and no command configured.'.format(name))
+        command = [arg.replace('{repo}', repo) for arg in command]
+        producers.append(Producer(
+            name, command,
+            cwd=section.get('cwd', os.path.join(producers_dir, name)),
+            resource=section.get('resource', RESOURCE_CLASSES.get(name, DEFAULT_CLASS)),
+            timeout=section.getfloat('timeout', DEFAULT_TIMEOUT),
+            after=section.get('after', '').split()))
+    names = {p.name for p in producers}
+    for p in producers:
+        unknown = [a for a in p.after if a not in names]
+        if unknown:
+            raise ValueError('{} comes after {}, which is not configured.'.format(p.name, ', '.join(unknown)))
+    return producers
+
+
+def load_limits(config):
+    limits = dict(DEFAULT_LIMITS)
+    if config.has_section('limits'):
+        limits.update({resource: int(value) for resource, value in config['limits'].items()})
+    return limits
+
+
+class Scheduler:
+    """
+    Starts producers as their dependencies and resource limits allow and
+    waits for all of them, see run().
+    """
+    def __init__(self, producers, limits, log_dir, max_parallel=None, poll_interval=0.2):
+        self.producers = producers
+        self.limits = limits
+        self.log_dir = log_dir
+        self.max_parallel = max_parallel
+        self.poll_interval = poll_interval
+        self.results = {}
+        # name -> (producer, Popen, log file, start time, time SIGTERM was sent or None)
+        self.running = {}
+
+    def run(self):
+        """
+        Runs all producers, returns {name: Result} in the order they finished.
+        """
+        os.makedirs(self.log_dir, exist_ok=True)
+        pending = list(self.producers)
+        while pending or self.running:
+            for producer in list(pending):
+                if self._can_start(producer):
+                    pending.remove(producer)
+                    self._start(producer)
+            if not self.running and pending:
+                # Only reachable through a cycle in after
+                for producer in pending:
+                    logger.error('%s never became ready, check its after option.', producer.name)
+                    self.results[producer.name] = Result(producer.name, 'error')
+                break
+            time.sleep(self.poll_interval)
+            self._poll()
+        return self.results
+
+    def _can_start(self, producer):
+        if any(a not in self.results for a in producer.after):
+            return False
+        if self.max_parallel and len(self.running) >= self.max_parallel:
+            return False
+        busy = sum(1 for p, _, _, _, _ in self.running.values() if p.resource == producer.resource)
+        return busy < self.limits.get(producer.resource, DEFAULT_LIMITS[DEFAULT_CLASS])
+
+    def _start(self, producer):
+        path = os.path.join(self.log_dir, producer.name + '.log')
+        log = open(path, 'wb')
+        logger.info('Starting %s (%s).', producer.name, producer.resource)
+        try:
+            # Own session so that a timeout kills everything run.sh started
+            proc = subprocess.Popen(
+                producer.command, cwd=producer.cwd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True)
+        except OSError as e:
+            log.close()
+            logger.error('Could not start %s: %s', producer.name, e)
+            self.results[producer.name] = Result(producer.name, 'error', log=path)
+            return
+        self.running[producer.name] = (producer, proc, log, time.monotonic(), None)
+
+    def _poll(self):
+        now = time.monotonic()
+        for name, (producer, proc, log, start, terminated) in list(self.running.items()):
+            returncode = proc.poll()
+            if returncode is None:
+                if terminated is None and now - start > producer.timeout:
+                    logger.error('%s timed out after %.0f s, terminating.', name, now - start)
+                    self._signal(proc, signal.SIGTERM)
+                    self.running[name] = (producer, proc, log, start, now)
+                elif terminated is not None and now - terminated > KILL_GRACE:
+                    self._signal(proc, signal.SIGKILL)
+                continue
+            log.close()
+            del self.running[name]
+            status = 'timeout' if terminated is not None else 'ok' if returncode == 0 else 'failed'
+            result = Result(name, status, returncode, now - start, log.name)
+            self.results[name] = result
+            if status == 'ok':
+                logger.info('%s done in %.1f s.', name, result.seconds)
+            else:
+                logger.error('%s %s with exit code %s after %.1f s, see %s.', name, status, returncode,
+                             result.seconds, log.name)
+
+    def _signal(self, proc, sig):
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError:
+            pass
+
+
+def run_merge(config, repo, log_dir):
+    """
+    Merges the output of the run as configured by merge in [orchestrator]:
+    python with nerds_utils.merge, perl with merge_nerds/run.sh or none.
+    """
+    options = config['orchestrator'] if config.has_section('orchestrator') else {}
+    how = options.get('merge', 'python')
+    start = time.time()
+    if how == 'none':
+        return True
+    if how == 'perl':
+        run_sh = os.path.join(PRODUCERS_DIR, 'merge_nerds', 'run.sh')
+        with open(os.path.join(log_dir, 'merge_nerds.log'), 'wb') as log:
+            returncode = subprocess.call(
+                run_sh_command(run_sh) + ['-O', repo], cwd=os.path.dirname(run_sh), stdin=subprocess.DEVNULL,
+                stdout=log, stderr=subprocess.STDOUT)
+        ok = returncode == 0
+    elif how == 'python':
+        run = nerds_merge.merge_incremental if options.get('incremental', 'yes') == 'yes' else nerds_merge.merge
+        workers = int(options.get('merge_workers', os.cpu_count() or 1))
+        run([repo], nerds_merge.output_dir(repo), options.get('merge_policy', 'right'), workers)
+        ok = True
+    else:
+        raise ValueError('Unknown merge {}, use python, perl or none.'.format(how))
+    logger.info('Merge %s in %.1f s.', 'done' if ok else 'failed', time.time() - start)
+    return ok
+
+
+def summary(results):
+    lines = ['{:<24}{:<9}{:>6}{:>10}'.format('producer', 'status', 'exit', 'seconds')]
+    for r in results.values():
+        lines.append('{:<24}{:<9}{:>6}{:>10.1f}'.format(
+            r.name, r.status, '' if r.returncode is None else r.returncode, r.seconds))
+    return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-C', required=True, help='Path to configuration file')
+    parser.add_argument('-O', help='Path to the NERDS repository, overrides repo in the configuration')
+    parser.add_argument('--log-dir', help='Directory for the producer logs, overrides log_dir')
+    parser.add_argument('--list', action='store_true', help='List the producers and exit')
+    parser.add_argument('--no-merge', action='store_true', help='Do not merge after the producers')
+    parser.add_argument('producers', nargs='*', help='Only run these producers')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The python merge runs in this process, show what it logs too
+    logging.getLogger('nerds_utils').setLevel(logging.INFO)
+    logging.getLogger('nerds_utils').addHandler(ch)
+    config = ConfigParser(interpolation=None)
+    if not config.read(args.C):
+        logger.error('Could not read configuration %s', args.C)
+        sys.exit(2)
+    options = config['orchestrator'] if config.has_section('orchestrator') else {}
+    repo = os.path.abspath(args.O or options.get('repo', '.'))
+    log_dir = os.path.abspath(args.log_dir or options.get('log_dir', 'logs'))
+    try:
+        producers = load_producers(config, repo)
+    except ValueError as e:
+        logger.error(e)
+        sys.exit(2)
+    if args.producers:
+        producers = [p for p in producers if p.name in args.producers]
+        for p in producers:
+            p.after = [a for a in p.after if a in args.producers]
+    limits = load_limits(config)
+
+    if args.list:
+        for p in producers:
+            print('{:<24}{:<7}{:>7.0f} s  {}'.format(p.name, p.resource, p.timeout, ' '.join(p.command)))
+        return
+
+    start = time.time()
+    max_parallel = int(options.get('max_parallel', 0)) or None
+    results = Scheduler(producers, limits, log_dir, max_parallel).run()
+    logger.info('Producers done in %.1f s:\n%s', time.time() - start, summary(results))
+    merged = args.no_merge or run_merge(config, repo, log_dir)
+    logger.info('Run done in %.1f s.', time.time() - start)
+    if not merged or any(r.status != 'ok' for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+from configparser import ConfigParser
+
+import orchestrator
+from orchestrator import Producer, Scheduler, load_producers
+
+
+class OrchestratorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.producers_dir = os.path.join(self.dir, 'producers')
+        self.log_dir = os.path.join(self.dir, 'logs')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def producer(self, name, script, **kwargs):
+        """
+        A producer running script, which gets its start time in $START.
+        """
+        path = os.path.join(self.producers_dir, name)
+        os.makedirs(path)
+        run_sh = os.path.join(path, 'run.sh')
+        with open(run_sh, 'w') as f:
+            f.write('#!/bin/sh\necho start $(date +%s.%N)\n' + script + '\necho end $(date +%s.%N)\n')
+        os.chmod(run_sh, os.stat(run_sh).st_mode | stat.S_IXUSR)
+        return Producer(name, [run_sh], path, **kwargs)
+
+    def times(self, name):
+        with open(os.path.join(self.log_dir, name + '.log')) as f:
+            return dict(line.split() for line in f if line.startswith(('start', 'end')))
+
+    def run_all(self, producers, limits):
+        return Scheduler(producers, limits, self.log_dir, poll_interval=0.01).run()
+
+    def test_resource_limit(self):
+        producers = [self.producer('p{}'.format(i), 'sleep 0.2', resource='ssh') for i in range(3)]
+        producers.append(self.producer('snmp', 'sleep 0.2', resource='snmp'))
+        results = self.run_all(producers, {'ssh': 2, 'snmp': 1})
+        self.assertEqual(sorted(r.status for r in results.values()), ['ok'] * 4)
+        p0, p1, p2, snmp = [self.times(p.name) for p in producers]
+        # Third ssh producer waits for a slot, snmp has its own
+        self.assertGreaterEqual(float(p2['start']), min(float(p0['end']), float(p1['end'])))
+        self.assertLess(float(snmp['start']), float(p0['end']))
+
+    def test_after(self):
+        first = self.producer('first', 'sleep 0.1')
+        second = self.producer('second', 'true', after=['first'])
+        results = self.run_all([second, first], {'local': 4})
+        self.assertEqual(list(results), ['first', 'second'])
+        self.assertGreaterEqual(float(self.times('second')['start']), float(self.times('first')['end']))
+
+    def test_timeout_and_failure(self):
+        self.addCleanup(setattr, orchestrator, 'KILL_GRACE', orchestrator.KILL_GRACE)
+        orchestrator.KILL_GRACE = 0
+        producers = [self.producer('slow', 'sleep 30', timeout=0.2), self.producer('broken', 'exit 3')]
+        start = time.monotonic()
+        results = self.run_all(producers, {'local': 4})
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(results['slow'].status, 'timeout')
+        self.assertEqual((results['broken'].status, results['broken'].returncode), ('failed', 3))
+
+    def test_load_producers(self):
+        self.producer('juniper_conf', 'true')
+        config = ConfigParser(interpolation=None)
+        config.read_string('''
+[orchestrator]
+merge = none
+[juniper_conf]
+args = -C juniper.conf -O {repo}/producers/juniper_conf/json
+[nso]
+command = python3 nso.py -O {repo}/producers/nso/json
+after = juniper_conf
+timeout = 60
+[disabled]
+enabled = no
+''')
+        juniper_conf, nso = load_producers(config, '/repo', self.producers_dir)
+        self.assertEqual(juniper_conf.command[1:], ['-C', 'juniper.conf', '-O', '/repo/producers/juniper_conf/json'])
+        self.assertEqual(juniper_conf.resource, 'ssh')
+        self.assertEqual(nso.command, ['python3', 'nso.py', '-O', '/repo/producers/nso/json'])
+        self.assertEqual((nso.resource, nso.timeout, nso.after), ('http', 60, ['juniper_conf']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ import sys
 sys.path.append('../')
 
 from nerds_utils.file import save_to_json
+from nerds_utils import metrics
 from nerds_utils import nerds as _nerds
 
 logger = logging.getLogger('raritan_snmp')
@@ -58,7 +59,9 @@ def hostname(host):
 def snmpwalk(host):
     output = u''
     try:
-        output = check_output(['snmpwalk', '-v2c', '-c', 'public', host, SNMP_RARITAN_PORTS])
+        with metrics.timer('snmp.walk'):
+            output = check_output(['snmpwalk', '-v2c', '-c', 'public', host, SNMP_RARITAN_PORTS])
+        metrics.count('snmp.bytes', len(output))
     except Exception as e:
         logger.error('Unable to snmpwalk %s. Got error: %s', host, e)
 
@@ -124,6 +127,9 @@ def main():
             else:
                 save_to_json(nerds, out_dir)
 
+    if not dry_run:
+        metrics.save(out_dir, 'raritan_snmp')
+
 
 if __name__ == '__main__':
     main()